@@ -1,13 +1,34 @@
-from finance import get_cash_flow_df
 import pandas as pd
 
+from connections import get_connection
+from data_cache import cached_loader
+from finance import DB_PATH, init_finance
+from migrations import bump_table_versions, rebuild_pl_monthly
+
+# pl_monthly веде тригер на cash_flow (migrations.py) — тут лише десятки рядків
+PL_MONTHLY_SQL = """
+    SELECT month, income, expense, income - expense AS profit
+    FROM pl_monthly
+    WHERE entries > 0
+    ORDER BY month
+"""
+
+@cached_loader("cash_flow")
 def calculate_profit_loss():
-    df = get_cash_flow_df()
+    df = pd.read_sql_query(PL_MONTHLY_SQL, get_connection(DB_PATH))
     if df.empty:
         return pd.DataFrame()
-    df["month"] = df["date"].dt.to_period("M").astype(str)
-    summary = df.groupby(["month", "type"])["amount"].sum().unstack(fill_value=0)
-    summary["income"] = summary.get("income", 0)
-    summary["expense"] = summary.get("expense", 0)
-    summary["profit"] = summary["income"] - summary["expense"]
-    return summary.reset_index()[["month", "income", "expense", "profit"]]
+    return df
+
+def rebuild_profit_loss() -> int:
+    """Перераховує pl_monthly з cash_flow; повертає кількість місяців."""
+    init_finance()
+    conn = get_connection(DB_PATH)
+    with conn:
+        months = rebuild_pl_monthly(conn)
+        bump_table_versions(conn, ["cash_flow"])
+    return months
+
+if __name__ == "__main__":
+    # python accounting.py — перебудувати помісячний P&L
+    print(f"pl_monthly: {rebuild_profit_loss()} міс.")
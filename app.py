@@ -1,19 +1,42 @@
 # app.py — ПОВНИЙ, ОПТИМІЗОВАНИЙ, ГОТОВИЙ ДО ДЕПЛОЮ
 import streamlit as st
 import pandas as pd
+import sqlite3
+import uuid
+from collections.abc import Mapping
 from datetime import datetime, timedelta
 from io import BytesIO
+from typing import Any, Callable, Dict
 
 # --- ІМПОРТИ МОДУЛІВ ---
-from warehouse_calculator import calculate_warehouse_cost
-from warehouse import init_warehouse, get_inventory
-from clients import init_clients, get_clients
-from suppliers import init_suppliers, get_suppliers, get_purchase_orders
-from finance import init_finance, get_cash_flow_df
+from mesh_core import CalculationError
+from price_matrix import price_roll
+from warehouse import (
+    init_warehouse, get_inventory, export_inventory_to_excel,
+    get_stock_movements, get_consumption,
+)
+from clients import init_clients
+from suppliers import init_suppliers, get_suppliers
+from finance import (
+    init_finance, query_cash_flow, cash_flow_summary, get_cash_flow_categories,
+    export_cash_flow_to_excel
+)
 from accounting import calculate_profit_loss
-from logistics import calculate_optimized_logistics
-from procurement import recommend_procurement, create_purchase_order, get_active_orders
 from utils.reports_finance import export_pl_to_excel
+from logistics import calculate_optimized_logistics, plan_consolidation
+from procurement import (
+    recommend_procurement, create_purchase_order, get_active_orders,
+    get_stock_targets, save_stock_targets,
+    create_purchase_orders, orders_from_recommendations, PurchaseOrderError,
+    FALLBACK_PRICE_PER_UNIT,
+)
+from crossdomain import get_stock_position
+from connections import connection_stats
+from query_stats import query_stats, dump_query_stats
+from snapshots import snapshot_stats
+from data_cache import invalidate_all
+from reports import REPORTS, ReportJobs
+from utils.export import write_excel
 
 # --- ІНІЦІАЛІЗАЦІЯ ---
 st.set_page_config(
@@ -27,18 +50,34 @@ st.set_page_config(
 for init_func in [init_warehouse, init_clients, init_suppliers, init_finance]:
     init_func()
 
-# --- КЕШУВАННЯ ДАНИХ ---
-@st.cache_data(ttl=300, show_spinner="Завантаження даних...")
-def load_all_data():
-    return {
-        "inventory": get_inventory(),
-        "clients": get_clients(),
-        "orders": get_purchase_orders(),
-        "active_orders": get_active_orders(),
-        "cash_flow": get_cash_flow_df(),
-        "pl": calculate_profit_loss(),
-        "recommendations": recommend_procurement()
-    }
+CASH_FLOW_WINDOW_DAYS = 30
+CASH_FLOW_PAGE_SIZE = 100
+CASH_FLOW_GROUP_LABELS = {"day": "По днях", "week": "По тижнях", "category": "По категоріях"}
+
+# --- ЛІНИВІ ДАНІ ---
+class LazyData(Mapping):
+    """
+    Набір даних завантажується при першому зверненні з вкладки чи віджета
+    і перевикористовується до кінця прогону скрипта. Між прогонами
+    результати тримають кешовані завантажувачі (data_cache).
+    """
+
+    def __init__(self, loaders: Dict[str, Callable[[], Any]]):
+        self._loaders = loaders
+        self._values: Dict[str, Any] = {}
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._values:
+            loader = self._loaders[key]
+            with st.spinner("Завантаження даних..."):
+                self._values[key] = loader()
+        return self._values[key]
+
+    def __iter__(self):
+        return iter(self._loaders)
+
+    def __len__(self) -> int:
+        return len(self._loaders)
 
 # --- САЙДБАР ---
 with st.sidebar:
@@ -47,10 +86,27 @@ with st.sidebar:
     st.caption("Система управління сіткою-рябицею")
 
     if st.button("Оновити дані", use_container_width=True):
-        st.cache_data.clear()
+        invalidate_all()
         st.success("Кеш очищено!")
         st.rerun()
 
+    with st.expander("Діагностика SQL"):
+        stats_df = query_stats()
+        if stats_df.empty:
+            st.caption("Запитів ще не було")
+        else:
+            st.dataframe(
+                stats_df[["query", "callers", "calls", "rows", "p50_ms", "p95_ms", "p99_ms"]],
+                use_container_width=True
+            )
+        st.caption(f"З'єднання: {connection_stats()}")
+        snapshots_df = snapshot_stats()
+        if not snapshots_df.empty:
+            st.caption(f"Спільні знімки даних: {snapshots_df['memory_mb'].sum():.2f} МБ")
+            st.dataframe(snapshots_df, use_container_width=True)
+        if st.button("Зберегти дамп", use_container_width=True):
+            st.success(f"Збережено: {dump_query_stats()}")
+
     st.divider()
     st.caption("© 2025 MeshGrid")
 
@@ -58,8 +114,72 @@ with st.sidebar:
 st.title("MeshGrid WMS Pro")
 st.caption("Професійна система для виробництва та логістики сітки-рябиці")
 
-# --- ЗАВАНТАЖЕННЯ ДАНИХ ---
-data = load_all_data()
+def full_export_button(key: str, label: str, export: Callable[[], BytesIO]) -> None:
+    """Повна таблиця в Excel: файл будується потоково лише після натискання."""
+    state_key = f"export_{key}"
+    if st.button(f"Підготувати: {label}", key=f"prepare_{key}"):
+        with st.spinner("Формування файлу..."):
+            st.session_state[state_key] = export()
+    if state_key in st.session_state:
+        st.download_button(
+            label,
+            st.session_state[state_key],
+            f"{key}_{datetime.now().strftime('%Y%m%d')}.xlsx",
+            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            key=f"download_{key}"
+        )
+
+# --- ФОНОВІ ЗВІТИ ---
+@st.cache_resource
+def get_report_jobs() -> ReportJobs:
+    """Один пул процесів і реєстр задач на процес застосунку."""
+    return ReportJobs()
+
+@st.cache_resource(max_entries=8)
+def report_bytes(path: str) -> bytes:
+    # Файл під ключем версії даних не змінюється — читаємо один раз
+    with open(path, "rb") as f:
+        return f.read()
+
+def reports_panel() -> None:
+    jobs = get_report_jobs()
+    for name, report in REPORTS.items():
+        status = jobs.status(name)
+        col1, col2 = st.columns([3, 1])
+        col1.write(f"**{report.title}**")
+        if status.state == "done":
+            col2.download_button(
+                "Завантажити",
+                report_bytes(status.path),
+                f"{name}_{datetime.now().strftime('%Y%m%d')}.xlsx",
+                "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                key=f"report_download_{name}",
+                use_container_width=True
+            )
+        elif status.state == "running":
+            col1.progress(status.fraction, text=f"{status.stage}: {status.fraction:.0%}")
+        else:
+            if status.state == "failed":
+                col1.error(f"Помилка формування: {status.error}")
+            if col2.button("Сформувати", key=f"report_build_{name}", use_container_width=True):
+                jobs.request(name)
+                st.rerun()
+
+@st.fragment(run_every=1.0)
+def reports_panel_live() -> None:
+    """Поки є активні задачі — оновлює прогрес щосекунди, потім повний rerun."""
+    if not get_report_jobs().running():
+        st.rerun()
+    reports_panel()
+
+# --- ДАНІ (завантажуються вкладками на вимогу) ---
+data = LazyData({
+    "inventory": get_inventory,
+    "active_orders": get_active_orders,
+    "pl": calculate_profit_loss,
+    "recommendations": recommend_procurement,
+    "stock_position": get_stock_position,
+})
 
 # --- ВКЛАДКИ ---
 tab_calc, tab_warehouse, tab_procurement, tab_logistics, tab_finance = st.tabs([
@@ -83,10 +203,14 @@ with tab_calc:
         custom_price = st.number_input("Ціна за кг (0 = стандарт)", 0.0, 1000.0, 0.0, step=5.0)
 
     if st.button("Розрахувати", type="primary", use_container_width=True):
-        results, details_df = calculate_warehouse_cost(
-            cell_size, wire_thick, roll_len, roll_height, material,
-            custom_price if custom_price > 0 else None
-        )
+        try:
+            results, details_df = price_roll(
+                cell_size, wire_thick, roll_len, roll_height, material,
+                custom_price if custom_price > 0 else None
+            )
+        except CalculationError as e:
+            st.error(f"Помилка розрахунку: {e}")
+            results = {}
 
         if results:
             area = roll_len * roll_height
@@ -102,17 +226,13 @@ with tab_calc:
             st.dataframe(details_df, use_container_width=True)
 
             # Експорт
-            buffer = BytesIO()
-            details_df.to_excel(buffer, index=False, engine='openpyxl')
-            buffer.seek(0)
+            buffer = write_excel({"Деталі": details_df})
             st.download_button(
                 "Експорт в Excel",
                 buffer,
                 f"ситка_{cell_size}x{wire_thick}_{material}.xlsx",
                 "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
             )
-        else:
-            st.error("Помилка розрахунку")
 
 # ===================================================================
 # 2. СКЛАД
@@ -131,9 +251,20 @@ with tab_warehouse:
             }),
             use_container_width=True
         )
+        full_export_button("inventory", "Уся інвентаризація (Excel)", export_inventory_to_excel)
     else:
         st.info("Склад порожній")
 
+    st.subheader("Запас з урахуванням замовлень")
+    st.dataframe(data["stock_position"], use_container_width=True)
+
+    with st.expander("Рух запасів"):
+        st.caption("Списання за 30 днів")
+        st.dataframe(get_consumption(30), use_container_width=True)
+        if not data["stock_position"].empty:
+            material = st.selectbox("Матеріал", data["stock_position"]["material"], key="movements_material")
+            st.dataframe(get_stock_movements(material), use_container_width=True)
+
 # ===================================================================
 # 3. ЗАКУПІВЛІ
 # ===================================================================
@@ -142,16 +273,61 @@ with tab_procurement:
     if not data["recommendations"].empty:
         st.dataframe(data["recommendations"], use_container_width=True)
 
+        suppliers_df = get_suppliers()
+        col1, col2 = st.columns([3, 1])
+        supplier_id = col1.selectbox(
+            "Постачальник",
+            suppliers_df["id"],
+            format_func=dict(zip(suppliers_df["id"], suppliers_df["name"])).get,
+            key="bulk_supplier"
+        )
+        if supplier_id is not None:
+            supplier_id = int(supplier_id)
+        else:
+            st.warning("Немає жодного постачальника — замовлення створити неможливо")
+        batch = orders_from_recommendations(data["recommendations"], supplier_id)
+        edited = st.data_editor(
+            batch[["material", "quantity", "price_per_unit", "price_source"]],
+            disabled=["material", "price_source"],
+            use_container_width=True,
+            key="bulk_orders_editor"
+        )
+        if col2.button("Замовити все", use_container_width=True, disabled=supplier_id is None):
+            try:
+                result = create_purchase_orders(batch.assign(
+                    quantity=edited["quantity"], price_per_unit=edited["price_per_unit"]
+                ))
+                st.success(f"Створено замовлень: {result.created} на ₴{result.total_cost:,.0f}")
+                if result.duplicates:
+                    st.info(f"Вже замовлено раніше: {len(result.duplicates)}")
+            except PurchaseOrderError as e:
+                st.error("Замовлення не створено: " + "; ".join(e.errors[:10]))
+
         with st.expander("Створити замовлення"):
             mat = st.selectbox("Матеріал", data["recommendations"]["material"].unique())
-            qty = st.number_input("Кількість", 1, 1000, int(data["recommendations"][data["recommendations"]["material"] == mat]["to_order"].iloc[0]))
-            price = st.number_input("Ціна за од.", 1.0, 1000.0, 75.0)
-            if st.button("Замовити"):
-                # Приклад: supplier_id = 1
-                create_purchase_order(1, mat, qty, price)
+            qty = st.number_input("Кількість", 1, None, int(data["recommendations"][data["recommendations"]["material"] == mat]["to_order"].iloc[0]))
+            price = st.number_input("Ціна за од.", 1.0, 1000.0, FALLBACK_PRICE_PER_UNIT)
+            # Ключ форми: повторний прогін з тим самим натисканням не створить друге замовлення
+            form_key = st.session_state.setdefault("order_form_key", uuid.uuid4().hex)
+            if st.button("Замовити", disabled=supplier_id is None):
+                if create_purchase_order(supplier_id, mat, qty, price, idempotency_key=f"manual:{form_key}"):
+                    st.session_state.order_form_key = uuid.uuid4().hex
     else:
         st.success("Запаси в нормі")
 
+    with st.expander("Цільові запаси"):
+        targets = st.data_editor(
+            get_stock_targets(),
+            num_rows="dynamic",
+            use_container_width=True,
+            key="stock_targets_editor"
+        )
+        if st.button("Зберегти цілі"):
+            try:
+                st.success(f"Збережено цілей: {save_stock_targets(targets)}")
+            except sqlite3.IntegrityError as e:
+                st.error(f"Цілі не збережено (min_stock ≥ 0, max_stock ≥ min_stock): {e}")
+
     st.subheader("Активні замовлення")
     st.dataframe(data["active_orders"], use_container_width=True)
 
@@ -179,6 +355,21 @@ with tab_logistics:
             col3.metric("CO₂", f"{result.co2:,.0f} кг")
             col4.metric("Ефективність", f"{result.route_efficiency:.1f}%")
 
+    with st.expander("Консолідація замовлень у рейси"):
+        st.caption("CSV з колонками route, distance_km, weight_kg, roll_count — замовлення одного route їдуть разом")
+        upload = st.file_uploader("Замовлення", type="csv", key="consolidation_orders")
+        if upload is not None:
+            try:
+                plan = plan_consolidation(pd.read_csv(upload))
+            except (KeyError, ValueError) as e:
+                st.error(f"Некоректний файл: {e}")
+            else:
+                col1, col2, col3 = st.columns(3)
+                col1.metric("Рейсів поштучно", plan.per_order_trips)
+                col2.metric("Рейсів після консолідації", plan.trips, -plan.trips_saved, delta_color="inverse")
+                col3.metric("Економія", f"₴{plan.cost_saved:,.0f}")
+                st.dataframe(plan.trucks, use_container_width=True)
+
 # ===================================================================
 # 5. ФІНАНСИ
 # ===================================================================
@@ -186,18 +377,67 @@ with tab_finance:
     st.subheader("P&L Звіт")
 
     if not data["pl"].empty:
-        excel_buffer = export_pl_to_excel(data["pl"])
+        st.bar_chart(data["pl"].set_index("month")["profit"])
+        st.line_chart(data["pl"].set_index("month")[["income", "expense"]])
         st.download_button(
-            "Завантажити P&L (Excel)",
-            excel_buffer,
-            f"PL_{datetime.now().strftime('%Y%m')}.xlsx",
+            "P&L в Excel",
+            export_pl_to_excel(data["pl"]),
+            "pl_report.xlsx",
             "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            use_container_width=True
+            key="download_pl"
         )
-        st.bar_chart(data["pl"].set_index("month")["profit"])
-        st.line_chart(data["pl"].set_index("month")[["income", "expense"]])
     else:
         st.info("Немає фінансових даних")
 
+    st.subheader("Звіти (Excel)")
+    if get_report_jobs().running():
+        reports_panel_live()
+    else:
+        reports_panel()
+
     st.subheader("Cash Flow")
-    st.dataframe(data["cash_flow"], use_container_width=True)
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        cf_from = st.date_input("З", datetime.now().date() - timedelta(days=CASH_FLOW_WINDOW_DAYS))
+    with col2:
+        cf_to = st.date_input("По", datetime.now().date())
+    with col3:
+        cf_type = st.selectbox("Тип", ["Усі", "income", "expense"])
+    with col4:
+        cf_category = st.selectbox("Категорія", ["Усі"] + get_cash_flow_categories())
+    cf_group = st.radio(
+        "Групування", list(CASH_FLOW_GROUP_LABELS),
+        format_func=CASH_FLOW_GROUP_LABELS.get, horizontal=True
+    )
+
+    cf_filters = {
+        "date_from": cf_from,
+        "date_to": cf_to,
+        "type_": None if cf_type == "Усі" else cf_type,
+        "category": None if cf_category == "Усі" else cf_category,
+    }
+    summary = cash_flow_summary(cf_group, **cf_filters)
+    if summary.empty:
+        st.info("Немає операцій за обраний період")
+    else:
+        if cf_group != "category":
+            st.bar_chart(summary.set_index(cf_group)[["income", "expense"]])
+        st.dataframe(summary, use_container_width=True)
+
+        # Keyset-сторінки операцій; стек курсорів скидається при зміні фільтрів
+        if st.session_state.get("cf_filters") != cf_filters:
+            st.session_state.cf_filters = cf_filters
+            st.session_state.cf_cursors = [None]
+        cursors = st.session_state.cf_cursors
+        page, next_cursor = query_cash_flow(**cf_filters, cursor=cursors[-1], limit=CASH_FLOW_PAGE_SIZE)
+        st.dataframe(page, use_container_width=True)
+
+        col1, col2 = st.columns(2)
+        if col1.button("Новіші", disabled=len(cursors) == 1, use_container_width=True):
+            cursors.pop()
+            st.rerun()
+        if col2.button("Старіші", disabled=next_cursor is None, use_container_width=True):
+            cursors.append(next_cursor)
+            st.rerun()
+
+    full_export_button("cash_flow", "Уся історія Cash Flow (Excel)", export_cash_flow_to_excel)
@@ -1,32 +1,19 @@
-import streamlit as st
-import sqlite3
 import pandas as pd
-import os
-from datetime import datetime
+
+from connections import get_connection
+from data_cache import cached_loader
+from migrations import migrate
 
 DB_PATH = "data/clients.db"
 
+CLIENTS_SQL = "SELECT * FROM clients"
+
 def init_clients():
-    os.makedirs("data", exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute("""CREATE TABLE IF NOT EXISTS clients (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT, type TEXT, balance REAL DEFAULT 0.0
-    )""")
-    conn.execute("""CREATE TABLE IF NOT EXISTS transactions (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        client_id INTEGER, type TEXT, amount REAL, date TEXT
-    )""")
-    # Приклади
-    conn.execute("INSERT OR IGNORE INTO clients (name, type) VALUES (?, ?)", ("ТОВ СіткаПлюс", "client"))
-    conn.execute("INSERT OR IGNORE INTO transactions (client_id, type, amount, date) VALUES (?, ?, ?, ?)",
-                 (1, "payment", 15000.0, "2025-10-10"))
-    conn.commit()
-    conn.close()
+    """Доводить схему clients.db до актуальної версії (див. migrations.py)."""
+    migrate("clients", DB_PATH)
 
-@st.cache_data(ttl=300)
+@cached_loader("clients", snapshot=True)
 def get_clients():
-    conn = sqlite3.connect(DB_PATH)
-    df = pd.read_sql_query("SELECT * FROM clients", conn)
-    conn.close()
+    conn = get_connection(DB_PATH)
+    df = pd.read_sql_query(CLIENTS_SQL, conn)
     return df
@@ -3,12 +3,31 @@ import os
 DATA_DIR = "data"
 os.makedirs(DATA_DIR, exist_ok=True)
 
-MIN_STOCK = {
-    "Оцинкований": 50,
-    "Чорний": 30,
-    "ПВХ": 20
+# Файли баз за доменами (ім'я = схема в ATTACH-з'єднанні)
+DATABASES = {
+    "warehouse": os.path.join(DATA_DIR, "warehouse.db"),
+    "suppliers": os.path.join(DATA_DIR, "suppliers.db"),
+    "finance": os.path.join(DATA_DIR, "finance.db"),
+    "clients": os.path.join(DATA_DIR, "clients.db"),
+    "history": os.path.join(DATA_DIR, "history.db"),
 }
 
 TRUCK_CAPACITY = 20000  # кг
+TRUCK_MAX_ROLLS = 400   # рулонів у кузові (обмеження об'єму)
 FUEL_CONSUMPTION = 0.35  # л/км
 CO2_PER_LITER = 2.3
+
+# --- SQLite ---
+SQLITE_BUSY_TIMEOUT_MS = 5000
+SQLITE_CACHE_SIZE_KIB = 64 * 1024          # PRAGMA cache_size = -KiB
+SQLITE_MMAP_SIZE = 256 * 1024 * 1024       # байт
+
+# --- Діагностика SQL ---
+SLOW_QUERY_MS = 100                        # поріг журналу повільних запитів
+SLOW_QUERY_LOG = os.path.join(DATA_DIR, "slow_queries.log")
+QUERY_STATS_DUMP = os.path.join(DATA_DIR, "query_stats.json")
+QUERY_STATS_SAMPLES = 1000                 # останніх вимірів на запит для перцентилів
+
+# --- Фонові звіти ---
+REPORTS_DIR = os.path.join(DATA_DIR, "reports")
+REPORT_WORKERS = 2
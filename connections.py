@@ -0,0 +1,121 @@
+# connections.py — СПІЛЬНІ З'ЄДНАННЯ SQLITE
+"""
+Одне з'єднання на (потік, файл бази), яке перевикористовується між
+викликами замість sqlite3.connect/close у кожній функції.
+При відкритті вмикається WAL і налаштовуються pragma з config.settings.
+
+get_attached_connection() — з'єднання, до якого через ATTACH підключені
+всі доменні бази (схеми warehouse, suppliers, finance, clients, history),
+для крос-доменних запитів одним SQL-виразом.
+
+Усі з'єднання створюються з фабрикою query_stats.InstrumentedConnection:
+час, рядки і викликач кожного запиту потрапляють у статистику.
+
+Транзакції пишемо через `with conn:` — commit або rollback, але
+з'єднання лишається відкритим. Закривати його самостійно не треба.
+"""
+import os
+import sqlite3
+import threading
+from typing import Callable, Dict, Tuple
+
+from config.settings import (
+    DATABASES, SQLITE_BUSY_TIMEOUT_MS, SQLITE_CACHE_SIZE_KIB, SQLITE_MMAP_SIZE
+)
+from query_stats import InstrumentedConnection
+
+ATTACHED = "<attached>"
+
+_lock = threading.Lock()
+_connections: Dict[Tuple[int, str], sqlite3.Connection] = {}
+_stats = {"opened": 0, "reused": 0, "closed": 0}
+
+
+def _apply_pragmas(conn: sqlite3.Connection, schema: str = "main") -> None:
+    conn.execute(f"PRAGMA {schema}.journal_mode=WAL")
+    conn.execute(f"PRAGMA {schema}.synchronous=NORMAL")
+    conn.execute(f"PRAGMA {schema}.cache_size=-{int(SQLITE_CACHE_SIZE_KIB)}")
+    conn.execute(f"PRAGMA {schema}.mmap_size={int(SQLITE_MMAP_SIZE)}")
+    conn.execute(f"PRAGMA busy_timeout={int(SQLITE_BUSY_TIMEOUT_MS)}")
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # check_same_thread=False лише для того, щоб _prune_dead_threads
+    # могла закрити з'єднання з іншого потоку; використовується воно одним потоком
+    return sqlite3.connect(
+        db_path, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000, check_same_thread=False,
+        factory=InstrumentedConnection,
+    )
+
+
+def _open_single(db_path: str) -> sqlite3.Connection:
+    conn = _connect(db_path)
+    _apply_pragmas(conn)
+    return conn
+
+
+def _open_attached(_: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:", check_same_thread=False, factory=InstrumentedConnection)
+    conn.execute(f"PRAGMA busy_timeout={int(SQLITE_BUSY_TIMEOUT_MS)}")
+    for schema, db_path in DATABASES.items():
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        conn.execute("ATTACH DATABASE ? AS " + schema, (db_path,))
+        _apply_pragmas(conn, schema)
+    return conn
+
+
+def _prune_dead_threads() -> None:
+    """Закриває з'єднання потоків, яких уже немає (Streamlit створює потік на кожен rerun)."""
+    alive = {t.ident for t in threading.enumerate()}
+    for key in [k for k in _connections if k[0] not in alive]:
+        _connections.pop(key).close()
+        _stats["closed"] += 1
+
+
+def _get_or_open(target: str, opener: Callable[[str], sqlite3.Connection]) -> sqlite3.Connection:
+    key = (threading.get_ident(), target)
+    with _lock:
+        conn = _connections.get(key)
+        if conn is not None:
+            _stats["reused"] += 1
+            return conn
+        _prune_dead_threads()
+
+    conn = opener(target)
+
+    with _lock:
+        _connections[key] = conn
+        _stats["opened"] += 1
+    return conn
+
+
+def get_connection(db_path: str) -> sqlite3.Connection:
+    """Повертає з'єднання поточного потоку з базою db_path (відкриває за потреби)."""
+    return _get_or_open(os.path.abspath(db_path), _open_single)
+
+
+def get_attached_connection() -> sqlite3.Connection:
+    """
+    З'єднання поточного потоку, у якому всі бази з DATABASES підключені
+    через ATTACH під своїми іменами: SELECT ... FROM warehouse.inventory
+    JOIN suppliers.purchase_orders ... виконується одним запитом.
+    """
+    return _get_or_open(ATTACHED, _open_attached)
+
+
+def close_all() -> None:
+    """Закриває всі відкриті з'єднання (тести, завершення процесу)."""
+    with _lock:
+        for conn in _connections.values():
+            conn.close()
+            _stats["closed"] += 1
+        _connections.clear()
+
+
+def connection_stats() -> Dict[str, int]:
+    """Скільки з'єднань відкрито, перевикористано, закрито і відкрито зараз."""
+    with _lock:
+        return {**_stats, "open": len(_connections)}
@@ -0,0 +1,48 @@
+# crossdomain.py — КРОС-ДОМЕННІ ЗАПИТИ ЧЕРЕЗ ATTACH
+"""
+Склад, замовлення, фінанси та клієнти лежать у різних файлах.
+Тут вони поєднуються на одному ATTACH-з'єднанні (connections.
+get_attached_connection), тож JOIN між доменами — один SQL-вираз
+без проміжних dict/DataFrame у Python.
+"""
+import pandas as pd
+
+from connections import get_attached_connection
+from data_cache import cached_loader
+
+# Статуси замовлень, що ще не надійшли на склад
+IN_TRANSIT_STATUSES = ("planned", "ordered")
+
+STOCK_POSITION_SQL = f"""
+    WITH on_hand AS (
+        SELECT material, quantity AS qty
+        FROM warehouse.stock_balance
+        WHERE quantity > 0
+    ),
+    in_transit AS (
+        SELECT material, SUM(quantity) AS qty
+        FROM suppliers.purchase_orders
+        WHERE status IN ({", ".join(f"'{s}'" for s in IN_TRANSIT_STATUSES)})
+        GROUP BY material
+    ),
+    materials AS (
+        SELECT material FROM on_hand
+        UNION
+        SELECT material FROM in_transit
+    )
+    SELECT
+        m.material,
+        COALESCE(h.qty, 0) AS on_hand,
+        COALESCE(t.qty, 0) AS in_transit,
+        COALESCE(h.qty, 0) + COALESCE(t.qty, 0) AS projected
+    FROM materials m
+    LEFT JOIN on_hand h ON h.material = m.material
+    LEFT JOIN in_transit t ON t.material = m.material
+    ORDER BY m.material
+"""
+
+@cached_loader("inventory", "purchase_orders")
+def get_stock_position() -> pd.DataFrame:
+    """Матеріал → на складі, в дорозі (planned/ordered), прогнозний запас."""
+    return pd.read_sql_query(STOCK_POSITION_SQL, get_attached_connection())
+
@@ -0,0 +1,137 @@
+# data_cache.py — КЕШ ЗАВАНТАЖУВАЧІВ З ЗАЛЕЖНОСТЯМИ ВІД ТАБЛИЦЬ
+"""
+Кожен кешований завантажувач оголошує таблиці, які читає:
+
+    @cached_loader("inventory")
+    def get_inventory(): ...
+
+Свіжість визначається не TTL, а лічильниками змін таблиць
+(table_versions, тригери з migrations.py): версії таблиць входять у ключ
+st.cache_data. Поки дані не змінювались — результат береться з кешу
+скільки завгодно довго; будь-який запис (у цьому чи іншому процесі)
+збільшує версію, і наступний виклик читає базу заново. Перевірка
+свіжості — один запит по первинному ключу на кожну базу.
+
+snapshot=True — результат зберігається один раз на процес як незмінний
+знімок (snapshots.py, st.cache_resource), а сесії отримують view без копії.
+
+invalidate_tables("purchase_orders") додатково звільняє пам'ять під
+застарілі результати залежних завантажувачів одразу після запису.
+"""
+import functools
+import sqlite3
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+import streamlit as st
+
+from config.settings import DATABASES
+from connections import get_connection
+from migrations import TRACKED_TABLES
+from snapshots import publish
+
+# Скільки версій результату тримати на завантажувач (старі витісняються)
+CACHE_MAX_ENTRIES = 8
+# Спільні знімки великі: поточний і попередній (для сесій, що ще рендерять його)
+SNAPSHOT_MAX_ENTRIES = 2
+
+TABLE_DATABASES: Dict[str, str] = {
+    table: db_name for db_name, tables in TRACKED_TABLES.items() for table in tables
+}
+
+_lock = threading.Lock()
+_dependents: Dict[str, List[Callable]] = defaultdict(list)
+
+
+def table_versions(tables: Sequence[str]) -> Tuple[int, ...]:
+    """Поточні версії таблиць у порядку tables (-1 — таблиця ще не відстежується)."""
+    by_db: Dict[str, List[str]] = defaultdict(list)
+    for table in tables:
+        by_db[TABLE_DATABASES[table]].append(table)
+
+    versions: Dict[str, int] = {}
+    for db_name, db_tables in by_db.items():
+        conn = get_connection(DATABASES[db_name])
+        placeholders = ", ".join("?" for _ in db_tables)
+        try:
+            versions.update(conn.execute(
+                f"SELECT name, version FROM table_versions WHERE name IN ({placeholders})",
+                db_tables,
+            ).fetchall())
+        except sqlite3.OperationalError:
+            pass  # база ще не мігрована
+    return tuple(versions.get(table, -1) for table in tables)
+
+
+def cached_loader(
+    *tables: str, snapshot: bool = False, max_entries: Optional[int] = None, **cache_kwargs
+) -> Callable:
+    """
+    st.cache_data з ключем за версіями таблиць. tables — усі таблиці, які
+    функція читає, включно з прочитаними через інші кешовані завантажувачі.
+    snapshot=True — для функцій, що повертають DataFrame: спільний
+    незмінний знімок замість копії на кожну сесію.
+    """
+    unknown = [table for table in tables if table not in TABLE_DATABASES]
+    if not tables or unknown:
+        raise ValueError(f"cached_loader: невідомі або не вказані таблиці {unknown}")
+
+    def decorator(func: Callable) -> Callable:
+        if snapshot:
+            def versioned(versions, *args, **kwargs):
+                return publish(f"{func.__module__}.{func.__qualname__}", versions, func(*args, **kwargs))
+        else:
+            def versioned(versions, *args, **kwargs):
+                return func(*args, **kwargs)
+
+        # st.cache_data/st.cache_resource розрізняють функції за __module__/__qualname__
+        versioned.__module__ = func.__module__
+        versioned.__qualname__ = func.__qualname__
+        versioned.__name__ = func.__name__
+        if snapshot:
+            cached = st.cache_resource(max_entries=max_entries or SNAPSHOT_MAX_ENTRIES, **cache_kwargs)(versioned)
+        else:
+            cached = st.cache_data(max_entries=max_entries or CACHE_MAX_ENTRIES, **cache_kwargs)(versioned)
+
+        @functools.wraps(func)
+        def loader(*args, **kwargs):
+            result = cached(table_versions(tables), *args, **kwargs)
+            return result.view() if snapshot else result
+
+        loader.clear = cached.clear
+        loader.tables = frozenset(tables)
+        with _lock:
+            for table in tables:
+                _dependents[table].append(loader)
+        return loader
+
+    return decorator
+
+
+def dependents(table: str) -> List[Callable]:
+    """Кешовані завантажувачі, що читають table."""
+    with _lock:
+        return list(_dependents.get(table, ()))
+
+
+def invalidate_tables(*tables: str) -> int:
+    """Очищає кеші завантажувачів, залежних від tables; повертає їх кількість."""
+    loaders: Dict[int, Callable] = {}
+    with _lock:
+        for table in tables:
+            for loader in _dependents.get(table, ()):
+                loaders[id(loader)] = loader
+    for loader in loaders.values():
+        loader.clear()
+    return len(loaders)
+
+
+def invalidate_all() -> int:
+    """Очищає всі зареєстровані завантажувачі (кнопка «Оновити дані»)."""
+    return invalidate_tables(*registered_tables())
+
+
+def registered_tables() -> Set[str]:
+    with _lock:
+        return set(_dependents)
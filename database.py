@@ -1,8 +1,17 @@
 # database.py
-import sqlite3
+import atexit
+import logging
+import threading
+import time
 import pandas as pd
 import os
-from typing import Dict, Any
+import sqlite3
+from datetime import date, datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple, Union
+
+from connections import get_connection
+from data_cache import invalidate_tables
+from migrations import migrate
 
 # --- Конфігурація баз ---
 DB_DIR = "data"
@@ -10,88 +19,49 @@ DB_CLI = os.path.join(DB_DIR, "clients.db")
 DB_SUP = os.path.join(DB_DIR, "suppliers.db")
 DB_HIST = os.path.join(DB_DIR, "history.db")
 
+# --- Буферизований запис історії ---
+HISTORY_FLUSH_SIZE = 500        # записів у буфері до примусового скидання
+HISTORY_FLUSH_INTERVAL = 2.0    # секунд між фоновими скиданнями
+
+logger = logging.getLogger(__name__)
+
+# --- Запити ---
+CLIENTS_LIST_SQL = "SELECT id, name, email, phone, balance FROM clients ORDER BY id DESC"
+SUPPLIERS_LIST_SQL = "SELECT id, name, email, phone, balance FROM suppliers ORDER BY id DESC"
+HISTORY_RECENT_SQL = """
+    SELECT 
+        timestamp, material, cell_size, wire_thickness,
+        roll_length, roll_height, price_per_kg, margin_pct,
+        purchase_cost, sale_price, profit, area, total_weight
+    FROM history 
+    ORDER BY id DESC 
+    LIMIT ?
+"""
+
 # --- Ініціалізація ---
 def init_db() -> None:
-    """Створює папку data/ та ініціалізує всі таблиці."""
-    os.makedirs(DB_DIR, exist_ok=True)
-
-    # Клієнти
-    _create_table(
-        DB_CLI,
-        "clients",
-        """
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        email TEXT,
-        phone TEXT,
-        balance REAL DEFAULT 0.0,
-        logo TEXT
-        """
-    )
-
-    # Постачальники
-    _create_table(
-        DB_SUP,
-        "suppliers",
-        """
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        email TEXT,
-        phone TEXT,
-        balance REAL DEFAULT 0.0,
-        logo TEXT
-        """
-    )
-
-    # Історія розрахунків
-    _create_table(
-        DB_HIST,
-        "history",
-        """
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        timestamp TEXT NOT NULL,
-        material TEXT NOT NULL,
-        cell_size REAL NOT NULL,
-        wire_thickness REAL NOT NULL,
-        roll_length REAL NOT NULL,
-        roll_height REAL NOT NULL,
-        price_per_kg REAL NOT NULL,
-        margin_pct REAL NOT NULL,
-        purchase_cost REAL NOT NULL,
-        sale_price REAL NOT NULL,
-        profit REAL NOT NULL,
-        area REAL NOT NULL,
-        total_weight REAL NOT NULL
-        """
-    )
-
-# --- Універсальна функція створення таблиці ---
-def _create_table(db_path: str, table_name: str, schema: str) -> None:
-    """Створює таблицю, якщо її немає."""
-    conn = sqlite3.connect(db_path)
-    conn.execute(f"CREATE TABLE IF NOT EXISTS {table_name} ({schema.strip()})")
-    conn.commit()
-    conn.close()
+    """Доводить clients.db, suppliers.db та history.db до актуальних схем (migrations.py)."""
+    migrate("clients", DB_CLI)
+    migrate("suppliers", DB_SUP)
+    migrate("history", DB_HIST)
 
 # ===================================================================
 # КЛІЄНТИ
 # ===================================================================
 def add_client(name: str, email: str, phone: str, balance: float, logo_b64: str | None) -> None:
     """Додає клієнта."""
-    conn = sqlite3.connect(DB_CLI)
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO clients (name, email, phone, balance, logo) VALUES (?, ?, ?, ?, ?)",
-        (name, email, phone, balance, logo_b64)
-    )
-    conn.commit()
-    conn.close()
+    conn = get_connection(DB_CLI)
+    with conn:
+        conn.execute(
+            "INSERT INTO clients (name, email, phone, balance, logo) VALUES (?, ?, ?, ?, ?)",
+            (name, email, phone, balance, logo_b64)
+        )
+    invalidate_tables("clients")
 
 def get_clients() -> pd.DataFrame:
     """Повертає клієнтів."""
-    conn = sqlite3.connect(DB_CLI)
-    df = pd.read_sql_query("SELECT id, name, email, phone, balance FROM clients ORDER BY id DESC", conn)
-    conn.close()
+    conn = get_connection(DB_CLI)
+    df = pd.read_sql_query(CLIENTS_LIST_SQL, conn)
     return df
 
 # ===================================================================
@@ -99,51 +69,289 @@ def get_clients() -> pd.DataFrame:
 # ===================================================================
 def add_supplier(name: str, email: str, phone: str, balance: float, logo_b64: str | None) -> None:
     """Додає постачальника."""
-    conn = sqlite3.connect(DB_SUP)
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO suppliers (name, email, phone, balance, logo) VALUES (?, ?, ?, ?, ?)",
-        (name, email, phone, balance, logo_b64)
-    )
-    conn.commit()
-    conn.close()
+    conn = get_connection(DB_SUP)
+    with conn:
+        conn.execute(
+            "INSERT INTO suppliers (name, email, phone, balance, logo) VALUES (?, ?, ?, ?, ?)",
+            (name, email, phone, balance, logo_b64)
+        )
+    invalidate_tables("suppliers")
 
 def get_suppliers() -> pd.DataFrame:
     """Повертає постачальників."""
-    conn = sqlite3.connect(DB_SUP)
-    df = pd.read_sql_query("SELECT id, name, email, phone, balance FROM suppliers ORDER BY id DESC", conn)
-    conn.close()
+    conn = get_connection(DB_SUP)
+    df = pd.read_sql_query(SUPPLIERS_LIST_SQL, conn)
     return df
 
 # ===================================================================
 # ІСТОРІЯ РОЗРАХУНКІВ
 # ===================================================================
+HISTORY_COLUMNS: Tuple[str, ...] = (
+    "timestamp", "material", "cell_size", "wire_thickness",
+    "roll_length", "roll_height", "price_per_kg", "margin_pct",
+    "purchase_cost", "sale_price", "profit", "area", "total_weight"
+)
+
+
+class HistoryWriter:
+    """
+    Write-behind буфер для таблиці history.
+    Записи накопичуються в пам'яті й скидаються одним executemany
+    в одній транзакції — коли буфер досягає max_batch або минає
+    flush_interval секунд. close() скидає все, що лишилось.
+    """
+
+    def __init__(
+        self,
+        db_path: str = DB_HIST,
+        max_batch: int = HISTORY_FLUSH_SIZE,
+        flush_interval: float = HISTORY_FLUSH_INTERVAL
+    ):
+        self.db_path = db_path
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self._buffer: List[Tuple[Any, ...]] = []
+        self._lock = threading.Lock()         # захищає буфер і статистику
+        self._flush_lock = threading.Lock()   # одне скидання за раз
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._insert_sql = (
+            f"INSERT INTO history ({', '.join(HISTORY_COLUMNS)}) "
+            f"VALUES ({', '.join('?' for _ in HISTORY_COLUMNS)})"
+        )
+        # Статистика
+        self.flushes = 0
+        self.rows_written = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    def add(self, calc_dict: Dict[str, Any]) -> None:
+        """Ставить розрахунок у чергу (без звернення до диска)."""
+        unknown = set(calc_dict) - set(HISTORY_COLUMNS)
+        if unknown:
+            raise ValueError(f"Невідомі поля історії: {', '.join(sorted(unknown))}")
+        # усі колонки history — NOT NULL; неповний запис заблокував би скидання всього буфера
+        missing = [col for col in HISTORY_COLUMNS if calc_dict.get(col) is None]
+        if missing:
+            raise ValueError(f"Не заповнені поля історії: {', '.join(missing)}")
+        row = tuple(calc_dict.get(col) for col in HISTORY_COLUMNS)
+
+        with self._lock:
+            self._buffer.append(row)
+            full = len(self._buffer) >= self.max_batch
+        self._ensure_thread()
+        if full:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        """Скидає буфер на диск; повертає кількість записаних рядків."""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._buffer = self._buffer, []
+            if not rows:
+                return 0
+
+            start = time.perf_counter()
+            try:
+                conn = get_connection(self.db_path)
+                try:
+                    with conn:  # одна транзакція на весь пакет
+                        conn.executemany(self._insert_sql, rows)
+                except sqlite3.IntegrityError:
+                    # Повторювати такий пакет безглуздо — пишемо по рядку, відкидаючи зіпсовані
+                    rows = self._insert_valid(conn, rows)
+            except Exception:
+                # Повертаємо рядки в голову черги, щоб не загубити
+                with self._lock:
+                    self._buffer[:0] = rows
+                raise
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            with self._lock:
+                self.flushes += 1
+                self.rows_written += len(rows)
+                self.last_flush_ms = elapsed_ms
+                self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+                self._total_flush_ms += elapsed_ms
+            return len(rows)
+
+    def _insert_valid(self, conn: sqlite3.Connection, rows: List[Tuple[Any, ...]]) -> List[Tuple[Any, ...]]:
+        written = []
+        with conn:
+            for row in rows:
+                try:
+                    conn.execute(self._insert_sql, row)
+                except sqlite3.IntegrityError:
+                    logger.error("Запис історії відкинуто: %r", row)
+                else:
+                    written.append(row)
+        return written
+
+    def close(self) -> None:
+        """Зупиняє фоновий потік і скидає залишок буфера."""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def stats(self) -> Dict[str, float]:
+        """Глибина черги та латентність скидань (мс)."""
+        with self._lock:
+            return {
+                "queue_depth": len(self._buffer),
+                "flushes": self.flushes,
+                "rows_written": self.rows_written,
+                "last_flush_ms": round(self.last_flush_ms, 3),
+                "avg_flush_ms": round(self._total_flush_ms / self.flushes, 3) if self.flushes else 0.0,
+                "max_flush_ms": round(self.max_flush_ms, 3),
+            }
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None and not self._stopped.is_set():
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name="history-writer", daemon=True
+                    )
+                    self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if self._stopped.is_set():
+                break
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Не вдалося записати історію розрахунків")
+
+
+_history_writer: Optional[HistoryWriter] = None
+_history_writer_lock = threading.Lock()
+
+
+def get_history_writer() -> HistoryWriter:
+    """Спільний для процесу буфер історії; скидається при завершенні."""
+    global _history_writer
+    with _history_writer_lock:
+        if _history_writer is None:
+            _history_writer = HistoryWriter()
+            atexit.register(_history_writer.close)
+        return _history_writer
+
+
 def add_calculation(calc_dict: Dict[str, Any]) -> None:
-    """Зберігає розрахунок."""
-    conn = sqlite3.connect(DB_HIST)
-    df = pd.DataFrame([calc_dict])
-    df.to_sql("history", conn, if_exists="append", index=False)
-    conn.close()
+    """Зберігає розрахунок (через буфер історії)."""
+    get_history_writer().add(calc_dict)
 
 def get_history(limit: int = 100) -> pd.DataFrame:
     """Повертає останні N записів."""
-    conn = sqlite3.connect(DB_HIST)
+    get_history_writer().flush()
+    conn = get_connection(DB_HIST)
+    df = pd.read_sql_query(HISTORY_RECENT_SQL, conn, params=(int(limit),))
+    return df
+
+HistoryCursor = Tuple[str, int]
+DateLike = Union[str, date, datetime, None]
+
+
+def _history_bound(value: DateLike, upper: bool) -> Optional[Tuple[str, str]]:
+    """Перетворює межу дати на (оператор, значення) для порівняння з timestamp."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return ("<=" if upper else ">=", value.strftime("%Y-%m-%d %H:%M:%S"))
+    if isinstance(value, date):
+        value = value.isoformat()
+    if upper and len(value) == 10:
+        # Дата без часу — включаємо весь день
+        next_day = date.fromisoformat(value) + timedelta(days=1)
+        return ("<", next_day.isoformat())
+    return ("<=" if upper else ">=", value)
+
+
+def build_history_query(
+    material: Optional[str] = None,
+    date_from: DateLike = None,
+    date_to: DateLike = None,
+    cell_size: Optional[float] = None,
+    cursor: Optional[HistoryCursor] = None,
+    limit: int = 100
+) -> Tuple[str, List[Any]]:
+    """SQL і параметри для query_history (окремо — для перевірки планів запитів)."""
+    conditions: List[str] = []
+    params: List[Any] = []
+    if material is not None:
+        conditions.append("material = ?")
+        params.append(material)
+    if cell_size is not None:
+        conditions.append("cell_size = ?")
+        params.append(cell_size)
+    bounds = [_history_bound(date_from, upper=False)]
+    if cursor is None:
+        bounds.append(_history_bound(date_to, upper=True))
+    # з курсором верхня межа date_to вже врахована на першій сторінці,
+    # а дві верхні межі заважають SQLite почати пошук саме з курсора
+    for bound in bounds:
+        if bound is not None:
+            conditions.append(f"timestamp {bound[0]} ?")
+            params.append(bound[1])
+    if cursor is not None:
+        conditions.append("(timestamp, id) < (?, ?)")
+        params.extend(cursor)
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
     query = f"""
-        SELECT 
-            timestamp, material, cell_size, wire_thickness,
+        SELECT
+            id, timestamp, material, cell_size, wire_thickness,
             roll_length, roll_height, price_per_kg, margin_pct,
             purchase_cost, sale_price, profit, area, total_weight
-        FROM history 
-        ORDER BY id DESC 
-        LIMIT {limit}
+        FROM history
+        {where}
+        ORDER BY timestamp DESC, id DESC
+        LIMIT ?
     """
-    df = pd.read_sql_query(query, conn)
-    conn.close()
-    return df
+    params.append(int(limit))
+    return query, params
+
+
+def query_history(
+    material: Optional[str] = None,
+    date_from: DateLike = None,
+    date_to: DateLike = None,
+    cell_size: Optional[float] = None,
+    cursor: Optional[HistoryCursor] = None,
+    limit: int = 100
+) -> Tuple[pd.DataFrame, Optional[HistoryCursor]]:
+    """
+    Сторінка історії (найновіші першими) з фільтрами на боці SQLite.
+    Keyset-пагінація: cursor — (timestamp, id) останнього рядка попередньої
+    сторінки, тож глибокі сторінки коштують стільки ж, скільки перша.
+    З курсором date_to не застосовується: курсор береться з попередньої
+    сторінки, яка вже обмежена date_to, тож рядки після нього — старші.
+    Повертає (DataFrame, cursor наступної сторінки або None).
+    """
+    get_history_writer().flush()
+    query, params = build_history_query(material, date_from, date_to, cell_size, cursor, limit)
+
+    conn = get_connection(DB_HIST)
+    df = pd.read_sql_query(query, conn, params=params)
+
+    next_cursor = None
+    if len(df) == limit:
+        last = df.iloc[-1]
+        next_cursor = (last["timestamp"], int(last["id"]))
+    return df, next_cursor
+
 
 def clear_history() -> None:
     """Очищає історію."""
-    conn = sqlite3.connect(DB_HIST)
-    conn.execute("DELETE FROM history")
-    conn.commit()
-    conn.close()
+    get_history_writer().flush()
+    conn = get_connection(DB_HIST)
+    with conn:
+        conn.execute("DELETE FROM history")
@@ -0,0 +1,227 @@
+# fifo.py — FIFO-СОБІВАРТІСТЬ СПИСАНЬ
+"""
+Списання (відвантаження рулонів) розподіляються по партіях inventory
+у порядку надходження (arrival_date, потім id) без циклів у Python.
+
+Партії кожного матеріалу викладаються на одну числову вісь: партія
+займає інтервал [початок, кінець) завдовжки у свою кількість, матеріали
+йдуть один за одним. Списання матеріалу — теж інтервал на цій осі
+(накопичена сума попередніх списань того ж матеріалу). np.searchsorted
+знаходить першу й останню партію, яких торкається списання, np.repeat
+розгортає пари «списання × партія», а перетин інтервалів дає кількість
+і вартість кожного шматка. Складність — O((n + m) log n).
+
+    python fifo.py issues.csv            # списати і записати залишки
+    python fifo.py issues.csv --dry-run  # лише розрахунок
+"""
+import argparse
+import json
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from connections import get_connection
+from data_cache import invalidate_tables
+from migrations import drop_stock_ledger_triggers, migrate, post_stock_movements
+from warehouse import DB_PATH
+
+FIFO_BATCHES_SQL = """
+    SELECT id, batch_id, material, quantity, price_per_unit
+    FROM inventory
+    WHERE material IN (SELECT value FROM json_each(?)) AND quantity > 0
+    ORDER BY material, arrival_date, id
+"""
+
+ISSUE_BATCH_SQL = "UPDATE inventory SET quantity = quantity - ? WHERE id = ?"
+
+
+class FifoError(ValueError):
+    """Некоректні списання або нестача запасу."""
+
+
+@dataclass
+class FifoResult:
+    issues: pd.DataFrame        # вхідні рядки + allocated, shortfall, cost, unit_cost
+    allocations: pd.DataFrame   # issue (позиція рядка), id, batch_id, material, quantity, unit_cost, cost
+    consumed: pd.DataFrame      # id, batch_id, material, consumed, remaining — лише зачеплені партії
+
+    @property
+    def total_cost(self) -> float:
+        return float(self.issues["cost"].sum())
+
+    @property
+    def shortfall(self) -> pd.Series:
+        """Нестача по матеріалах (лише ненульова)."""
+        short = self.issues.groupby("material", sort=True)["shortfall"].sum()
+        return short[short > 0]
+
+
+def _group_offsets(codes: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Накопичена сума values до кожного елемента в межах групи (codes відсортовані)."""
+    ends = np.cumsum(values)
+    starts = ends - values
+    first = np.r_[True, codes[1:] != codes[:-1]] if len(codes) else np.zeros(0, dtype=bool)
+    group = np.cumsum(first) - 1
+    return starts - starts[first][group]
+
+
+def _sum_by(index: np.ndarray, values: np.ndarray, size: int, dtype) -> np.ndarray:
+    # bincount рахує у float64 — точно для цілих до 2**53
+    return np.bincount(index, weights=values, minlength=size).astype(dtype)
+
+
+def allocate_fifo(batches: pd.DataFrame, issues: pd.DataFrame) -> FifoResult:
+    """
+    Розподіляє issues (material, quantity; порядок рядків — порядок списань)
+    по batches (id, batch_id, material, quantity, price_per_unit; у межах
+    матеріалу — вже в порядку FIFO). Нестача не є помилкою: її видно в shortfall.
+    """
+    quantity = pd.to_numeric(issues["quantity"], errors="coerce")
+    # inventory.quantity — INTEGER: дробове списання не записати в партію і журнал
+    bad = ~((quantity > 0) & (quantity % 1 == 0))
+    if bad.any():
+        rows = ", ".join(str(i + 1) for i in np.flatnonzero(bad.to_numpy())[:20])
+        raise FifoError(f"кількість списання має бути цілим > 0 (рядки {rows})")
+    quantity = quantity.astype(np.int64)
+
+    # порожній результат read_sql має object-колонки
+    batches = batches.assign(
+        quantity=pd.to_numeric(batches["quantity"]),
+        price_per_unit=pd.to_numeric(batches["price_per_unit"]),
+    )
+    batches = batches[batches["quantity"] > 0]
+    materials = pd.Index(pd.unique(np.concatenate([
+        batches["material"].to_numpy(dtype=object), issues["material"].to_numpy(dtype=object)
+    ])))
+    dtype = np.result_type(batches["quantity"].dtype, quantity.dtype)
+
+    # --- партії на спільній осі ---
+    b_code = materials.get_indexer(batches["material"])
+    b_order = np.argsort(b_code, kind="stable")
+    b_code = b_code[b_order]
+    b_qty = batches["quantity"].to_numpy(dtype=dtype)[b_order]
+    b_price = batches["price_per_unit"].to_numpy(dtype=float)[b_order]
+    b_end = np.cumsum(b_qty)
+    b_start = b_end - b_qty
+    available = _sum_by(b_code, b_qty, len(materials), dtype)
+    base = np.cumsum(available) - available
+
+    # --- списання як інтервали в межах свого матеріалу ---
+    i_code = materials.get_indexer(issues["material"])
+    i_order = np.argsort(i_code, kind="stable")
+    i_code = i_code[i_order]
+    i_qty = quantity.to_numpy(dtype=dtype)[i_order]
+    demand_start = _group_offsets(i_code, i_qty)
+    start = base[i_code] + np.minimum(demand_start, available[i_code])
+    end = base[i_code] + np.minimum(demand_start + i_qty, available[i_code])
+
+    # --- пари «списання × партія» ---
+    first = np.searchsorted(b_end, start, side="right")
+    last = np.searchsorted(b_start, end, side="left") - 1
+    pieces = np.where(end > start, last - first + 1, 0)
+    issue_idx = np.repeat(np.arange(len(i_qty)), pieces)
+    batch_idx = first[issue_idx] + (np.arange(pieces.sum()) - np.repeat(np.cumsum(pieces) - pieces, pieces))
+    piece_qty = np.minimum(end[issue_idx], b_end[batch_idx]) - np.maximum(start[issue_idx], b_start[batch_idx])
+    piece_cost = piece_qty * b_price[batch_idx]
+
+    # --- результати у вихідному порядку рядків ---
+    n = len(i_qty)
+    allocated = _sum_by(issue_idx, piece_qty, n, dtype)
+    cost = np.bincount(issue_idx, weights=piece_cost, minlength=n)
+    unsort = np.empty(n, dtype=np.int64)
+    unsort[i_order] = np.arange(n)
+
+    result_issues = issues.copy()
+    result_issues["allocated"] = allocated[unsort]
+    result_issues["shortfall"] = (i_qty - allocated)[unsort]
+    result_issues["cost"] = cost[unsort]
+    # без розподілу (повна нестача) — NaN
+    result_issues["unit_cost"] = np.divide(
+        cost, allocated, out=np.full(n, np.nan), where=allocated > 0
+    )[unsort]
+
+    source = batches.iloc[b_order]
+    allocations = pd.DataFrame({
+        "issue": i_order[issue_idx],
+        "id": source["id"].to_numpy()[batch_idx],
+        "batch_id": source["batch_id"].to_numpy()[batch_idx],
+        "material": materials[b_code[batch_idx]],
+        "quantity": piece_qty,
+        "unit_cost": b_price[batch_idx],
+        "cost": piece_cost,
+    })
+
+    used = _sum_by(batch_idx, piece_qty, len(b_qty), dtype)
+    touched = np.flatnonzero(used)
+    consumed = pd.DataFrame({
+        "id": source["id"].to_numpy()[touched],
+        "batch_id": source["batch_id"].to_numpy()[touched],
+        "material": materials[b_code[touched]],
+        "consumed": used[touched],
+        "remaining": b_qty[touched] - used[touched],
+    })
+    return FifoResult(result_issues, allocations, consumed)
+
+
+def load_fifo_batches(conn, materials) -> pd.DataFrame:
+    """Партії з залишком для materials у порядку FIFO."""
+    return pd.read_sql_query(
+        FIFO_BATCHES_SQL, conn, params=(json.dumps([str(m) for m in pd.unique(materials)]),)
+    )
+
+
+def issue_fifo(issues: pd.DataFrame, allow_shortfall: bool = False, db_path: Optional[str] = None) -> FifoResult:
+    """
+    Списує issues зі складу за FIFO однією транзакцією: читання партій,
+    розрахунок і запис залишків відбуваються під BEGIN IMMEDIATE, тож
+    паралельне списання не отримає ті самі партії. Рухи потрапляють у
+    журнал stock_movements як 'issue' (одним executemany, без тригерів
+    по рядку). Якщо запасу не вистачає і allow_shortfall=False — FifoError
+    без жодних змін.
+    """
+    db_path = db_path or DB_PATH
+    migrate("warehouse", db_path)
+    conn = get_connection(db_path)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        result = allocate_fifo(load_fifo_batches(conn, issues["material"]), issues)
+        short = result.shortfall
+        if len(short) and not allow_shortfall:
+            raise FifoError("нестача: " + ", ".join(f"{m} — {q:g}" for m, q in short.items()))
+
+        consumed = result.consumed
+        drop_stock_ledger_triggers(conn)
+        conn.executemany(ISSUE_BATCH_SQL, zip(consumed["consumed"].tolist(), consumed["id"].tolist()))
+        post_stock_movements(conn, zip(
+            consumed["material"].tolist(),
+            ["issue"] * len(consumed),
+            (-consumed["consumed"]).tolist(),
+            consumed["id"].tolist(),
+            consumed["batch_id"].tolist(),
+        ))
+        conn.commit()
+    except Exception:
+        conn.rollback()     # повертає й зняті тригери журналу
+        raise
+    invalidate_tables("inventory")
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="FIFO-списання зі складу")
+    parser.add_argument("path", help="CSV з колонками material, quantity")
+    parser.add_argument("--dry-run", action="store_true", help="лише розрахунок, без запису")
+    parser.add_argument("--allow-shortfall", action="store_true", help="списати наявне при нестачі")
+    args = parser.parse_args()
+
+    issues = pd.read_csv(args.path, dtype={"material": str})
+    if args.dry_run:
+        migrate("warehouse", DB_PATH)
+        conn = get_connection(DB_PATH)
+        result = allocate_fifo(load_fifo_batches(conn, issues["material"]), issues)
+    else:
+        result = issue_fifo(issues, allow_shortfall=args.allow_shortfall)
+    print(result.issues.groupby("material")[["quantity", "allocated", "shortfall", "cost"]].sum())
+    print(f"Собівартість: {result.total_cost:,.2f}")
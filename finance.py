@@ -1,31 +1,166 @@
-import streamlit as st
-import sqlite3
 import pandas as pd
-import os
-from datetime import datetime
+from datetime import date, datetime, timedelta
+from typing import Any, List, Optional, Tuple, Union
+
+from connections import get_connection
+from data_cache import cached_loader
+from migrations import migrate
+from utils.export import export_sql_to_excel
 
 DB_PATH = "data/finance.db"
 
+CASH_FLOW_SQL = "SELECT * FROM cash_flow ORDER BY date DESC"
+
 def init_finance():
-    os.makedirs("data", exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute("""CREATE TABLE IF NOT EXISTS cash_flow (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        type TEXT, category TEXT, amount REAL, date TEXT
-    )""")
-    # Приклади
-    conn.execute("INSERT OR IGNORE INTO cash_flow (type, category, amount, date) VALUES (?, ?, ?, ?)",
-                 ("income", "Продажі", 45000.0, "2025-10-15"))
-    conn.execute("INSERT OR IGNORE INTO cash_flow (type, category, amount, date) VALUES (?, ?, ?, ?)",
-                 ("expense", "Закупівлі", 30000.0, "2025-10-16"))
-    conn.commit()
-    conn.close()
-
-@st.cache_data(ttl=300)
-def get_cash_flow_df():
-    conn = sqlite3.connect(DB_PATH)
-    df = pd.read_sql_query("SELECT * FROM cash_flow ORDER BY date DESC", conn)
-    conn.close()
-    if not df.empty:
-        df["date"] = pd.to_datetime(df["date"])
-    return df
+    """Доводить схему finance.db до актуальної версії (див. migrations.py)."""
+    migrate("finance", DB_PATH)
+
+def export_cash_flow_to_excel(output=None):
+    """Уся історія руху коштів у Excel без завантаження таблиці в пам'ять."""
+    return export_sql_to_excel(get_connection(DB_PATH), CASH_FLOW_SQL, "Cash Flow", output=output)
+
+# ===================================================================
+# ЗАПИТИ З ФІЛЬТРАМИ НА БОЦІ SQLITE
+# ===================================================================
+CashFlowCursor = Tuple[str, int]
+DateLike = Union[str, date, datetime, None]
+
+CASH_FLOW_CATEGORIES_SQL = "SELECT DISTINCT category FROM cash_flow WHERE category IS NOT NULL ORDER BY category"
+
+# Ключ групування → вираз періоду
+CASH_FLOW_GROUPS = {
+    "day": "date",
+    # понеділок тижня: найближча неділя (або сам день) мінус 6 днів
+    "week": "date(date, 'weekday 0', '-6 days')",
+    "category": "category",
+}
+
+
+def _iso_date(value: DateLike) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, (date, datetime)):
+        return value.strftime("%Y-%m-%d")
+    return value[:10]
+
+
+def _cash_flow_filters(
+    date_from: DateLike, date_to: DateLike, type_: Optional[str], category: Optional[str]
+) -> Tuple[List[str], List[Any]]:
+    conditions: List[str] = []
+    params: List[Any] = []
+    if type_ is not None:
+        conditions.append("type = ?")
+        params.append(type_)
+    if category is not None:
+        conditions.append("category = ?")
+        params.append(category)
+    if date_from is not None:
+        conditions.append("date >= ?")
+        params.append(_iso_date(date_from))
+    if date_to is not None:
+        # виключна межа наступного дня: рядок з часом в останній день ('2025-01-31 18:00') теж потрапляє
+        conditions.append("date < ?")
+        params.append((date.fromisoformat(_iso_date(date_to)) + timedelta(days=1)).isoformat())
+    return conditions, params
+
+
+def build_cash_flow_query(
+    date_from: DateLike = None,
+    date_to: DateLike = None,
+    type_: Optional[str] = None,
+    category: Optional[str] = None,
+    cursor: Optional[CashFlowCursor] = None,
+    limit: int = 100
+) -> Tuple[str, List[Any]]:
+    """SQL і параметри для query_cash_flow (окремо — для перевірки планів запитів)."""
+    conditions, params = _cash_flow_filters(date_from, None if cursor else date_to, type_, category)
+    # з курсором верхня межа date_to вже врахована на першій сторінці
+    if cursor is not None:
+        conditions.append("(date, id) < (?, ?)")
+        params.extend(cursor)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    query = f"""
+        SELECT id, type, category, amount, date
+        FROM cash_flow
+        {where}
+        ORDER BY date DESC, id DESC
+        LIMIT ?
+    """
+    params.append(int(limit))
+    return query, params
+
+
+@cached_loader("cash_flow")
+def query_cash_flow(
+    date_from: DateLike = None,
+    date_to: DateLike = None,
+    type_: Optional[str] = None,
+    category: Optional[str] = None,
+    cursor: Optional[CashFlowCursor] = None,
+    limit: int = 100
+) -> Tuple[pd.DataFrame, Optional[CashFlowCursor]]:
+    """
+    Сторінка операцій (найновіші першими) з фільтрами на боці SQLite.
+    Keyset-пагінація: cursor — (date, id) останнього рядка попередньої
+    сторінки; з курсором date_to не застосовується — його вже врахувала
+    перша сторінка. Дати перетворюються лише для рядків сторінки.
+    Повертає (DataFrame, cursor наступної сторінки або None).
+    """
+    query, params = build_cash_flow_query(date_from, date_to, type_, category, cursor, limit)
+    df = pd.read_sql_query(query, get_connection(DB_PATH), params=params)
+
+    next_cursor = None
+    if len(df) == limit:
+        last = df.iloc[-1]
+        next_cursor = (last["date"], int(last["id"]))
+    df["date"] = pd.to_datetime(df["date"])
+    return df, next_cursor
+
+
+def build_cash_flow_summary_query(
+    group_by: str = "day",
+    date_from: DateLike = None,
+    date_to: DateLike = None,
+    type_: Optional[str] = None,
+    category: Optional[str] = None
+) -> Tuple[str, List[Any]]:
+    """SQL агрегату cash_flow_summary."""
+    if group_by not in CASH_FLOW_GROUPS:
+        raise ValueError(f"group_by має бути одним із {', '.join(CASH_FLOW_GROUPS)}")
+    conditions, params = _cash_flow_filters(date_from, date_to, type_, category)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    key = CASH_FLOW_GROUPS[group_by]
+    query = f"""
+        SELECT
+            {key} AS {group_by},
+            TOTAL(CASE WHEN type = 'income' THEN amount END) AS income,
+            TOTAL(CASE WHEN type = 'expense' THEN amount END) AS expense,
+            TOTAL(CASE WHEN type = 'income' THEN amount END)
+                - TOTAL(CASE WHEN type = 'expense' THEN amount END) AS net,
+            COUNT(*) AS entries
+        FROM cash_flow
+        {where}
+        GROUP BY {key}
+        ORDER BY {group_by}
+    """
+    return query, params
+
+
+@cached_loader("cash_flow")
+def cash_flow_summary(
+    group_by: str = "day",
+    date_from: DateLike = None,
+    date_to: DateLike = None,
+    type_: Optional[str] = None,
+    category: Optional[str] = None
+) -> pd.DataFrame:
+    """Доходи, витрати, сальдо й кількість операцій по днях, тижнях або категоріях."""
+    query, params = build_cash_flow_summary_query(group_by, date_from, date_to, type_, category)
+    return pd.read_sql_query(query, get_connection(DB_PATH), params=params)
+
+
+@cached_loader("cash_flow")
+def get_cash_flow_categories() -> List[str]:
+    rows = get_connection(DB_PATH).execute(CASH_FLOW_CATEGORIES_SQL).fetchall()
+    return [row[0] for row in rows]
@@ -0,0 +1,284 @@
+# ingest.py — ПОТОКОВИЙ ІМПОРТ ВИВАНТАЖЕНЬ ERP (CSV / Excel)
+"""
+Імпорт партій складу, замовлень постачальникам і руху коштів.
+Файл читається шматками (pandas chunksize для CSV, read-only режим
+openpyxl для Excel), кожен шматок перевіряється за схемою таблиці
+(PRAGMA table_info) і вставляється одним executemany. Кілька шматків
+ідуть в одну велику транзакцію, каталожні індекси та тригери лічильника
+змін знімаються на час завантаження; наприкінці індекси будуються одним
+проходом. Тригери знімаються всередині транзакції з даними і до кожного
+commit повертаються разом зі збільшенням версії таблиці (data_cache), тож
+у базі ніколи не зафіксовано стан без них. Для inventory так само
+знімаються тригери журналу руху: приходи нових партій проводяться в
+stock_movements/stock_balance одним запитом перед кожним commit.
+Пам'ять обмежена розміром шматка незалежно від розміру файлу.
+
+    python ingest.py inventory erp/batches.csv
+"""
+import argparse
+import os
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from config.settings import DATABASES
+from connections import get_connection
+from migrations import (
+    bump_table_versions, create_change_triggers, drop_change_triggers,
+    drop_indexes, drop_stock_ledger_triggers, migrate, post_stock_receipts, sync_indexes,
+)
+
+# Таблиця → база
+TABLES: Dict[str, str] = {
+    "inventory": "warehouse",
+    "purchase_orders": "suppliers",
+    "cash_flow": "finance",
+}
+
+# Колонки з датами: зберігаються як YYYY-MM-DD
+DATE_COLUMNS = {"arrival_date", "order_date", "delivery_date", "date"}
+
+# Похідні колонки, якщо їх немає у вивантаженні
+DERIVED_COLUMNS = {
+    "inventory": {"total_cost": ("quantity", "price_per_unit")},
+    "purchase_orders": {"total_cost": ("quantity", "price_per_unit")},
+}
+
+# Шаблони ({table} — одна з TABLES)
+LAST_ROWID_SQL = "SELECT COALESCE(MAX(rowid), 0) FROM {table}"
+
+CHUNK_ROWS = 50_000
+COMMIT_ROWS = 1_000_000
+MAX_ERRORS = 20
+
+
+class IngestError(ValueError):
+    """Файл не відповідає схемі таблиці."""
+
+
+@dataclass
+class IngestReport:
+    table: str
+    rows_read: int = 0
+    rows_inserted: int = 0
+    rows_rejected: int = 0
+    seconds: float = 0.0
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows_inserted / self.seconds if self.seconds else 0.0
+
+
+@dataclass
+class _Column:
+    name: str
+    affinity: str
+    not_null: bool
+    has_default: bool
+
+
+def _table_schema(conn: sqlite3.Connection, table: str) -> Dict[str, _Column]:
+    schema = {}
+    for _, name, col_type, not_null, default, pk in conn.execute(f"PRAGMA table_info({table})"):
+        if pk:
+            continue  # id призначає SQLite
+        col_type = (col_type or "").upper()
+        affinity = "INTEGER" if "INT" in col_type else "REAL" if col_type in ("REAL", "FLOAT", "DOUBLE") else "TEXT"
+        schema[name] = _Column(name, affinity, bool(not_null), default is not None)
+    return schema
+
+
+# ===================================================================
+# ЧИТАННЯ ШМАТКАМИ
+# ===================================================================
+def iter_chunks(path: str, chunk_rows: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """DataFrame-шматки по chunk_rows рядків з CSV або Excel (перший аркуш)."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".xlsx", ".xlsm"):
+        yield from _iter_excel_chunks(path, chunk_rows)
+    else:
+        yield from pd.read_csv(
+            path, chunksize=chunk_rows, dtype=str, keep_default_na=False, na_values=[""],
+            skipinitialspace=True,
+        )
+
+
+def _iter_excel_chunks(path: str, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [str(h).strip() if h is not None else "" for h in next(rows, ())]
+        batch: List[tuple] = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= chunk_rows:
+                yield pd.DataFrame(batch, columns=header)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=header)
+    finally:
+        workbook.close()
+
+
+# ===================================================================
+# ПЕРЕВІРКА
+# ===================================================================
+def _check_header(table: str, columns: List[str], schema: Dict[str, _Column]) -> List[str]:
+    unknown = [c for c in columns if c not in schema and c != "id"]
+    if unknown:
+        raise IngestError(f"{table}: невідомі колонки {', '.join(unknown)}")
+    derived = DERIVED_COLUMNS.get(table, {})
+    missing = [
+        c.name for c in schema.values()
+        if c.not_null and not c.has_default and c.name not in columns
+        and not (c.name in derived and set(derived[c.name]) <= set(columns))
+    ]
+    if missing:
+        raise IngestError(f"{table}: бракує обов'язкових колонок {', '.join(missing)}")
+    return [c for c in schema if c in columns or c in derived]
+
+
+def validate_chunk(
+    table: str, chunk: pd.DataFrame, schema: Dict[str, _Column], columns: List[str], first_row: int = 1
+) -> Tuple[pd.DataFrame, List[str]]:
+    """
+    Приводить типи шматка до схеми. Повертає (придатні рядки у порядку
+    columns, описи відхилених рядків з номерами від first_row).
+    """
+    chunk = chunk.reset_index(drop=True)
+    out = pd.DataFrame(index=chunk.index)
+    bad = pd.Series(False, index=chunk.index)
+    reasons = pd.Series("", index=chunk.index, dtype=object)
+
+    for name in columns:
+        col = schema[name]
+        if name in chunk:
+            raw = chunk[name]
+        else:
+            a, b = DERIVED_COLUMNS[table][name]
+            raw = pd.to_numeric(chunk[a], errors="coerce") * pd.to_numeric(chunk[b], errors="coerce")
+        missing = raw.isna()
+
+        if name in DATE_COLUMNS:
+            values = pd.to_datetime(raw, errors="coerce", format="ISO8601")
+            invalid = values.isna() & ~missing
+            values = values.dt.strftime("%Y-%m-%d")
+        elif col.affinity in ("INTEGER", "REAL"):
+            values = pd.to_numeric(raw, errors="coerce")
+            invalid = values.isna() & ~missing
+            if col.affinity == "INTEGER":
+                fractional = values.notna() & (values % 1 != 0)
+                invalid |= fractional
+                values = values.where(~fractional).astype("Int64")
+        else:
+            values = raw.astype(object).where(~missing, None)
+            invalid = pd.Series(False, index=chunk.index)
+
+        if col.not_null and not col.has_default:
+            invalid |= missing
+        bad |= invalid
+        reasons[invalid] = reasons[invalid] + f"{name}; "
+        out[name] = values
+
+    errors = [f"рядок {first_row + i}: некоректні {reasons[i].rstrip('; ')}" for i in chunk.index[bad]]
+    return out[~bad], errors
+
+
+# ===================================================================
+# ЗАВАНТАЖЕННЯ
+# ===================================================================
+def import_file(
+    path: str,
+    table: str,
+    chunk_rows: int = CHUNK_ROWS,
+    commit_rows: int = COMMIT_ROWS,
+    db_path: Optional[str] = None,
+) -> IngestReport:
+    """Імпортує файл у таблицю table; повертає звіт зі швидкістю рядків/с."""
+    if table not in TABLES:
+        raise IngestError(f"Імпорт у {table} не підтримується")
+    db_name = TABLES[table]
+    db_path = db_path or DATABASES[db_name]
+    migrate(db_name, db_path)
+    conn = get_connection(db_path)
+    schema = _table_schema(conn, table)
+
+    report = IngestReport(table=table)
+    start = time.perf_counter()
+    ledger = table == "inventory"
+    drop_indexes(conn, db_name, [table])
+
+    def suspend_triggers() -> int:
+        # Тригери знімаються в тій самій транзакції, що й дані: якщо процес
+        # упаде до commit, відкат поверне їх разом зі станом таблиці
+        conn.execute("BEGIN")
+        drop_change_triggers(conn, [table])
+        if ledger:
+            drop_stock_ledger_triggers(conn)
+        return conn.execute(LAST_ROWID_SQL.format(table=table)).fetchone()[0]
+
+    def commit(last_id: int) -> None:
+        # Кожен зафіксований стан — з проведеними приходами, тригерами й новою версією
+        if ledger:
+            post_stock_receipts(conn, last_id)
+        create_change_triggers(conn, [table])
+        bump_table_versions(conn, [table])
+        conn.commit()
+
+    try:
+        columns: Optional[List[str]] = None
+        insert_sql = ""
+        pending = 0
+        last_id = suspend_triggers()
+        for chunk in iter_chunks(path, chunk_rows):
+            if columns is None:
+                columns = _check_header(table, list(chunk.columns), schema)
+                insert_sql = (
+                    f"INSERT INTO {table} ({', '.join(columns)}) "
+                    f"VALUES ({', '.join('?' for _ in columns)})"
+                )
+            valid, errors = validate_chunk(table, chunk, schema, columns, report.rows_read + 1)
+
+            rows = valid.astype(object).where(valid.notna(), None).itertuples(index=False, name=None)
+            conn.executemany(insert_sql, rows)
+
+            report.rows_read += len(chunk)
+            report.rows_inserted += len(valid)
+            report.rows_rejected += len(errors)
+            report.errors.extend(errors[:max(0, MAX_ERRORS - len(report.errors))])
+
+            pending += len(valid)
+            if pending >= commit_rows:
+                commit(last_id)
+                last_id = suspend_triggers()
+                pending = 0
+        commit(last_id)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        # Індекси після збою також повертає звірка в migrate() при наступному запуску
+        sync_indexes(conn, db_name, tables=[table])
+        report.seconds = time.perf_counter() - start
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Імпорт вивантаження ERP у базу")
+    parser.add_argument("table", choices=sorted(TABLES))
+    parser.add_argument("path")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    result = import_file(args.path, args.table, chunk_rows=args.chunk_rows)
+    print(f"{result.table}: прочитано {result.rows_read}, вставлено {result.rows_inserted}, "
+          f"відхилено {result.rows_rejected} за {result.seconds:.1f} с "
+          f"({result.rows_per_sec:,.0f} рядків/с)")
+    for error in result.errors:
+        print("  " + error)
@@ -1,7 +1,34 @@
 # logistics.py — ВИПРАВЛЕНИЙ
+"""
+Вартість доставки: рейси, пальне, пакування, водій, CO₂ і завантаження
+вантажівки. Розрахунок векторний (calculate_logistics_batch) — тисячі
+відвантажень за один прохід NumPy; calculate_optimized_logistics
+рахує одне відвантаження звичайною арифметикою за тими самими формулами
+й константами, тож результати збігаються.
+
+plan_consolidation збирає багато замовлень одного напрямку у спільні
+вантажівки (обмеження — TRUCK_CAPACITY і TRUCK_MAX_ROLLS) і показує,
+скільки рейсів це економить проти поштучного розрахунку.
+"""
+import math
 from dataclasses import dataclass
+from typing import List, Optional
 
-@dataclass
+import numpy as np
+import pandas as pd
+
+from config.settings import CO2_PER_LITER, FUEL_CONSUMPTION, TRUCK_CAPACITY, TRUCK_MAX_ROLLS
+
+FUEL_PRICE = 55.0            # ₴/л
+PACKAGING_PER_ROLL = 5.0     # ₴
+DRIVER_COST_PER_TRIP = 500.0 # ₴
+
+RESULT_COLUMNS = [
+    "trips", "fuel_cost", "packaging_cost", "driver_cost", "total_cost", "co2", "route_efficiency",
+]
+
+
+@dataclass(slots=True)
 class LogisticsResult:
     trips: int
     fuel_cost: float
@@ -11,30 +38,278 @@ class LogisticsResult:
     co2: float
     route_efficiency: float  # % використання вантажопідйомності
 
+
+def _round1(values: np.ndarray) -> np.ndarray:
+    """
+    round(x, 1) як у Python. np.round множить на 10 з округленням добутку
+    й біля .x5 може помилитись на 0.1 — такі значення (частки відсотка
+    рядків) дораховуються точно.
+    """
+    values = np.atleast_1d(values)
+    scaled = values * 10
+    result = np.round(scaled) / 10
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if near_tie.any():
+        result[near_tie] = [round(v, 1) for v in values[near_tie].tolist()]
+    return result
+
+
+def calculate_logistics_batch(
+    distance_km, weight_kg, roll_count, max_rolls: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    Масиви (або скаляри — з broadcast) відстаней, ваг і кількості рулонів →
+    DataFrame з колонками RESULT_COLUMNS, рядок на відвантаження.
+    max_rolls — ліміт рулонів на вантажівку (як у plan_consolidation);
+    без нього рейси рахуються лише за вагою.
+    """
+    distance = np.asarray(distance_km, dtype=float)
+    weight = np.asarray(weight_kg, dtype=float)
+    rolls = np.asarray(roll_count, dtype=float)
+    if not (np.isfinite(weight).all() and (weight >= 0).all()):
+        raise ValueError("вага має бути невід'ємним числом")
+    distance, weight, rolls = np.broadcast_arrays(distance, weight, rolls)
+
+    # Розрахунок; відвантаження лише з рулонами (вага 0) — все одно один рейс
+    trips = np.ceil(weight / TRUCK_CAPACITY).astype(np.int64)
+    if max_rolls is not None:
+        trips = np.maximum(trips, np.ceil(rolls / max_rolls).astype(np.int64))
+    trips = np.where((trips == 0) & (rolls > 0), 1, trips)
+    fuel_liters = distance * FUEL_CONSUMPTION * trips
+    fuel_cost = fuel_liters * FUEL_PRICE
+    packaging_cost = rolls * PACKAGING_PER_ROLL
+    driver_cost = trips * DRIVER_COST_PER_TRIP
+    total_cost = fuel_cost + packaging_cost + driver_cost
+    co2 = fuel_liters * CO2_PER_LITER
+
+    # Ефективність (скільки % вантажопідйомності використано); без рейсів — 0
+    used_capacity = np.divide(
+        weight, TRUCK_CAPACITY * trips, out=np.zeros(weight.shape), where=trips > 0
+    )
+    route_efficiency = _round1(used_capacity * 100)
+
+    return pd.DataFrame({
+        "trips": trips.ravel(),
+        "fuel_cost": fuel_cost.ravel(),
+        "packaging_cost": packaging_cost.ravel(),
+        "driver_cost": driver_cost.ravel(),
+        "total_cost": total_cost.ravel(),
+        "co2": co2.ravel(),
+        "route_efficiency": route_efficiency.ravel(),
+    })
+
+
+def cost_shipments(shipments: pd.DataFrame, max_rolls: Optional[int] = None) -> pd.DataFrame:
+    """Відвантаження з колонками distance_km, weight_kg, roll_count + колонки вартості."""
+    costs = calculate_logistics_batch(
+        shipments["distance_km"], shipments["weight_kg"], shipments["roll_count"], max_rolls
+    )
+    costs.index = shipments.index
+    return shipments.join(costs)
+
+
+def logistics_results(costs: pd.DataFrame) -> List[LogisticsResult]:
+    """Рядки результату пакетного розрахунку як LogisticsResult (слоти — без __dict__ на рядок)."""
+    return [
+        LogisticsResult(int(row[0]), *row[1:])
+        for row in costs[RESULT_COLUMNS].itertuples(index=False, name=None)
+    ]
+
+
 def calculate_optimized_logistics(distance_km, weight_kg, roll_count):
-    from config.settings import TRUCK_CAPACITY, FUEL_CONSUMPTION, CO2_PER_LITER
-    import math
+    """
+    Одне відвантаження — звичайною арифметикою (на порядки швидше, ніж
+    DataFrame з одного рядка); масиви передаються в пакетний розрахунок.
+    """
+    if np.ndim(distance_km) or np.ndim(weight_kg) or np.ndim(roll_count):
+        return logistics_results(calculate_logistics_batch(distance_km, weight_kg, roll_count))
+    if not (math.isfinite(weight_kg) and weight_kg >= 0):
+        raise ValueError("вага має бути невід'ємним числом")
 
-    # Розрахунок
+    # Розрахунок — та сама послідовність операцій, що й у calculate_logistics_batch
     trips = math.ceil(weight_kg / TRUCK_CAPACITY)
+    if trips == 0 and roll_count > 0:
+        trips = 1
     fuel_liters = distance_km * FUEL_CONSUMPTION * trips
-    fuel_cost = fuel_liters * 55.0  # ₴/л
-    packaging_cost = roll_count * 5.0
-    driver_cost = trips * 500.0
+    fuel_cost = fuel_liters * FUEL_PRICE
+    packaging_cost = roll_count * PACKAGING_PER_ROLL
+    driver_cost = trips * DRIVER_COST_PER_TRIP
     total_cost = fuel_cost + packaging_cost + driver_cost
     co2 = fuel_liters * CO2_PER_LITER
 
-    # Ефективність (скільки % вантажопідйомності використано)
-    used_capacity = weight_kg / (TRUCK_CAPACITY * trips)
+    # Ефективність (скільки % вантажопідйомності використано); без рейсів — 0
+    used_capacity = weight_kg / (TRUCK_CAPACITY * trips) if trips else 0.0
     route_efficiency = round(used_capacity * 100, 1)
 
-    # ПОВЕРТАЄМО ВСІ АТРИБУТИ
     return LogisticsResult(
         trips=trips,
-        fuel_cost=fuel_cost,
-        packaging_cost=packaging_cost,
-        driver_cost=driver_cost,
-        total_cost=total_cost,
-        co2=co2,
-        route_efficiency=route_efficiency
+        fuel_cost=float(fuel_cost),
+        packaging_cost=float(packaging_cost),
+        driver_cost=float(driver_cost),
+        total_cost=float(total_cost),
+        co2=float(co2),
+        route_efficiency=route_efficiency,
+    )
+
+
+# ===================================================================
+# КОНСОЛІДАЦІЯ ЗАМОВЛЕНЬ У РЕЙСИ
+# ===================================================================
+# Допуск на похибку float при порівнянні із залишком місця
+_FIT_EPS = 1e-9
+
+
+@dataclass
+class ConsolidationPlan:
+    loads: pd.DataFrame     # order (індекс замовлення), truck, weight_kg, roll_count
+    trucks: pd.DataFrame    # truck, route, orders, distance_km, weight_kg, roll_count, fill + RESULT_COLUMNS
+    per_order: pd.DataFrame # поштучний розрахунок (cost_shipments) для порівняння
+
+    @property
+    def trips(self) -> int:
+        return int(self.trucks["trips"].sum())
+
+    @property
+    def per_order_trips(self) -> int:
+        return int(self.per_order["trips"].sum())
+
+    @property
+    def trips_saved(self) -> int:
+        return self.per_order_trips - self.trips
+
+    @property
+    def cost_saved(self) -> float:
+        return float(self.per_order["total_cost"].sum() - self.trucks["total_cost"].sum())
+
+
+def _split_oversized(weight: np.ndarray, rolls: np.ndarray, capacity: float, max_rolls: int):
+    """Замовлення, що не влазить в одну вантажівку, ділиться на рівні частини."""
+    parts = np.maximum(np.ceil(weight / capacity), np.ceil(rolls / max_rolls)).astype(np.int64)
+    parts = np.maximum(parts, 1)
+    order = np.repeat(np.arange(len(weight)), parts)
+    # номер частини в межах замовлення; цілі рулони — залишок по одному в перші частини
+    k = np.arange(len(order)) - np.repeat(np.cumsum(parts) - parts, parts)
+    part_rolls = np.floor(rolls / parts)[order] + (k < np.mod(rolls, parts)[order])
+    return order, (weight / parts)[order], part_rolls
+
+
+def _first_fit_decreasing(weight, rolls, capacity, max_rolls):
+    """
+    FFD за більшою з двох часток (вага / місткість, рулони / ліміт):
+    найбільші частини першими, кожна — у першу вантажівку, де є місце.
+    Пошук місця — один векторний вираз по відкритих вантажівках.
+    """
+    n = len(weight)
+    truck = np.empty(n, dtype=np.int64)
+    free_w = np.empty(n)
+    free_r = np.empty(n)
+    opened = 0
+    size = np.maximum(weight / capacity, rolls / max_rolls)
+    for i in np.argsort(-size, kind="stable"):
+        w, r = weight[i], rolls[i]
+        fits = (free_w[:opened] >= w - _FIT_EPS) & (free_r[:opened] >= r - _FIT_EPS)
+        t = int(fits.argmax()) if opened else 0
+        if not opened or not fits[t]:
+            t = opened
+            free_w[t], free_r[t] = capacity, max_rolls
+            opened += 1
+        truck[i] = t
+        free_w[t] -= w
+        free_r[t] -= r
+    return truck, free_w[:opened], free_r[:opened]
+
+
+def _eliminate_trucks(truck, weight, rolls, free_w, free_r, capacity, max_rolls):
+    """
+    Покращення після FFD: найменш завантажені вантажівки по черзі
+    пробуємо розвантажити в інші (first fit). Якщо всі частини знайшли
+    місце — вантажівка прибирається, інакше переміщення скасовуються.
+    """
+    fill = np.maximum(1 - free_w / capacity, 1 - free_r / max_rolls)
+    alive = np.ones(len(free_w), dtype=bool)
+    members = {t: list(items) for t, items in pd.Series(np.arange(len(truck))).groupby(truck).indices.items()}
+    for t in np.argsort(fill, kind="stable"):
+        alive[t] = False
+        trial_w, trial_r = free_w.copy(), free_r.copy()
+        moves = []
+        for i in sorted(members[t], key=lambda i: -weight[i]):
+            fits = alive & (trial_w >= weight[i] - _FIT_EPS) & (trial_r >= rolls[i] - _FIT_EPS)
+            target = int(fits.argmax())
+            if not fits[target]:
+                break
+            trial_w[target] -= weight[i]
+            trial_r[target] -= rolls[i]
+            moves.append((i, target))
+        else:
+            for i, target in moves:
+                truck[i] = target
+                members[target].append(i)
+            free_w, free_r = trial_w, trial_r
+            continue
+        alive[t] = True
+    # щільна нумерація вантажівок, що лишились
+    return np.unique(truck, return_inverse=True)[1]
+
+
+def plan_consolidation(
+    orders: pd.DataFrame,
+    capacity: float = TRUCK_CAPACITY,
+    max_rolls: int = TRUCK_MAX_ROLLS,
+    improve: bool = True,
+) -> ConsolidationPlan:
+    """
+    orders: distance_km, weight_kg, roll_count і необов'язково route —
+    разом їдуть лише замовлення одного route (без колонки — усі разом).
+    Вантажівка їде на найдальшу точку свого рейсу (distance_km = max).
+    improve=False — лише FFD.
+    """
+    weight_all = pd.to_numeric(orders["weight_kg"]).to_numpy(dtype=float)
+    rolls_all = pd.to_numeric(orders["roll_count"]).to_numpy(dtype=float)
+    if not (np.isfinite(weight_all).all() and (weight_all >= 0).all() and (rolls_all >= 0).all()):
+        raise ValueError("вага і кількість рулонів мають бути невід'ємними")
+    routes = orders["route"] if "route" in orders else pd.Series("", index=orders.index)
+
+    loads = []
+    truck_offset = 0
+    for _, positions in pd.Series(np.arange(len(orders))).groupby(routes.to_numpy(), sort=False, dropna=False):
+        idx = positions.to_numpy()
+        part_order, weight, rolls = _split_oversized(weight_all[idx], rolls_all[idx], capacity, max_rolls)
+        truck, free_w, free_r = _first_fit_decreasing(weight, rolls, capacity, max_rolls)
+        if improve:
+            truck = _eliminate_trucks(truck, weight, rolls, free_w, free_r, capacity, max_rolls)
+        loads.append(pd.DataFrame({
+            "position": idx[part_order],
+            "truck": truck + truck_offset,
+            "weight_kg": weight,
+            "roll_count": rolls,
+        }))
+        truck_offset += int(truck.max()) + 1 if len(truck) else 0
+
+    columns = ["position", "truck", "weight_kg", "roll_count"]
+    loads = pd.concat(loads, ignore_index=True) if loads else pd.DataFrame(columns=columns)
+    position = loads["position"].to_numpy(dtype=np.int64)
+    loads["distance_km"] = orders["distance_km"].to_numpy(dtype=float)[position]
+    loads["route"] = routes.to_numpy()[position]
+
+    trucks = loads.groupby("truck", sort=True).agg(
+        route=("route", "first"),
+        orders=("position", "nunique"),
+        distance_km=("distance_km", "max"),
+        weight_kg=("weight_kg", "sum"),
+        roll_count=("roll_count", "sum"),
+    ).reset_index()
+    trucks["fill"] = np.round(
+        np.maximum(trucks["weight_kg"] / capacity, trucks["roll_count"] / max_rolls) * 100, 1
+    )
+    # сума частин може перевищити місткість на похибку float — не більше одного рейсу
+    trucks = trucks.join(calculate_logistics_batch(
+        trucks["distance_km"], np.minimum(trucks["weight_kg"], capacity), trucks["roll_count"], max_rolls
+    ))
+
+    loads.insert(0, "order", orders.index.to_numpy()[position])
+    return ConsolidationPlan(
+        loads=loads.drop(columns=["position", "route", "distance_km"]),
+        trucks=trucks,
+        # базовий поштучний розрахунок — з тим самим лімітом рулонів, що й план
+        per_order=cost_shipments(orders[["distance_km", "weight_kg", "roll_count"]], max_rolls),
     )
@@ -0,0 +1,348 @@
+# mesh_core.py — ЧИСТЕ ЯДРО РОЗРАХУНКІВ (без Streamlit)
+"""
+Формули сітки-рябиці для UI, нічних пакетних задач і воркерів.
+Модуль не імпортує streamlit: помилки — типізовані винятки,
+кешування — власний обмежений LRU з лічильниками влучань.
+"""
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Dict, Hashable, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+# Константи з формули
+BASE_WEIGHT_FACTOR = 13.4
+BASE_LENGTH_FACTOR = 2173
+COPPER_DENSITY_RATIO = 1.141
+PVC_COEFFICIENTS = {
+    1.2: 0.3896,
+    1.5: 0.4711,
+    1.8: 0.5402,
+    2.0: 0.5794
+}
+
+MATERIAL_PRICES: Dict[str, float] = {
+    "Оцинкований": 75.0,
+    "Чорний": 55.0,
+    "Мідний": 700.0,
+    "ПВХ": 110.0
+}
+
+DEFAULT_PRICE_PER_KG = 75.0
+CACHE_MAXSIZE = 1024
+
+
+# ===================================================================
+# ВИНЯТКИ
+# ===================================================================
+class CalculationError(ValueError):
+    """Базова помилка розрахунку."""
+
+
+class InvalidParameterError(CalculationError):
+    """Недопустимі вхідні параметри (розмір вічка, товщина дроту...)."""
+
+
+# ===================================================================
+# ОБМЕЖЕНИЙ LRU-КЕШ
+# ===================================================================
+class LRUCache:
+    """Потокобезпечний LRU-кеш на maxsize записів з лічильниками hits/misses."""
+
+    def __init__(self, maxsize: int = CACHE_MAXSIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+
+        value = compute()
+
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def info(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "size": len(self._data), "maxsize": self.maxsize}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+_cost_cache = LRUCache()
+
+
+# ===================================================================
+# РОЗРАХУНОК ОДНОГО РУЛОНУ
+# ===================================================================
+def resolve_price_per_kg(material: str, custom_price_per_kg: Optional[float] = None) -> float:
+    """Ціна за кг: власна, якщо задана (не None/0), інакше стандартна для матеріалу."""
+    return custom_price_per_kg or MATERIAL_PRICES.get(material, DEFAULT_PRICE_PER_KG)
+
+
+def _compute_warehouse_cost(
+    cell_size_mm: float,
+    wire_thickness_mm: float,
+    roll_length_m: float,
+    roll_height_m: float,
+    material: str,
+    price_per_kg: float
+) -> Tuple[Dict[str, float], pd.DataFrame]:
+    area = roll_length_m * roll_height_m
+
+    # Коефіцієнт для матеріалу
+    if material == "Мідний":
+        material_coeff = COPPER_DENSITY_RATIO
+    elif material == "ПВХ":
+        material_coeff = PVC_COEFFICIENTS.get(wire_thickness_mm, 0.5)
+    else:
+        material_coeff = 1.0
+
+    # Вага 1 м²
+    weight_per_m2 = BASE_WEIGHT_FACTOR * (wire_thickness_mm ** 2) / cell_size_mm * material_coeff
+    weight_per_m2 = round(weight_per_m2, 4)
+
+    # Довжина на 1 м²
+    length_per_m2 = BASE_LENGTH_FACTOR / cell_size_mm
+    length_per_m2 = round(length_per_m2, 1)
+
+    # Загальна вага
+    total_weight = round(weight_per_m2 * area, 2)
+
+    # Собівартість
+    total_cost = round(total_weight * price_per_kg, 2)
+
+    results = {
+        "вага_1м2": weight_per_m2,
+        "довжина_1м2": length_per_m2,
+        "площа": area,
+        "загальна_вага": total_weight,
+        "ціна_за_кг": price_per_kg,
+        "собівартість": total_cost
+    }
+
+    details_df = build_details_df(
+        cell_size_mm, wire_thickness_mm, roll_length_m, roll_height_m, results
+    )
+
+    return results, details_df
+
+
+def compute_warehouse_cost(
+    cell_size_mm: float,
+    wire_thickness_mm: float,
+    roll_length_m: float,
+    roll_height_m: float,
+    material: str,
+    custom_price_per_kg: Optional[float] = None
+) -> Tuple[Dict[str, float], pd.DataFrame]:
+    """
+    Розрахунок витрат на виготовлення сітки-рябиці.
+    InvalidParameterError — якщо розмір вічка чи товщина дроту <= 0.
+    Кешується в LRU за нормалізованими параметрами (числа → float,
+    ціна → фактична ціна за кг). Повертає копії, тож кеш не псується.
+    """
+    if cell_size_mm <= 0 or wire_thickness_mm <= 0:
+        raise InvalidParameterError("Розмір вічка та товщина дроту мають бути > 0")
+
+    key = (
+        float(cell_size_mm), float(wire_thickness_mm),
+        float(roll_length_m), float(roll_height_m),
+        material, float(resolve_price_per_kg(material, custom_price_per_kg))
+    )
+    results, details_df = _cost_cache.get_or_compute(
+        key,
+        lambda: _compute_warehouse_cost(
+            cell_size_mm, wire_thickness_mm, roll_length_m, roll_height_m,
+            material, resolve_price_per_kg(material, custom_price_per_kg)
+        )
+    )
+    return dict(results), details_df.copy()
+
+
+def cost_cache_info() -> Dict[str, int]:
+    """Статистика LRU-кешу розрахунків: hits, misses, size, maxsize."""
+    return _cost_cache.info()
+
+
+def clear_cost_cache() -> None:
+    _cost_cache.clear()
+
+
+def build_details_df(
+    cell_size_mm: float,
+    wire_thickness_mm: float,
+    roll_length_m: float,
+    roll_height_m: float,
+    results: Dict[str, float]
+) -> pd.DataFrame:
+    """Таблиця «Деталі» для вкладки калькулятора."""
+    return pd.DataFrame({
+        "Параметр": [
+            "Розмір вічка (мм)", "Товщина дроту (мм)", "Довжина рулону (м)",
+            "Висота рулону (м)", "Площа (м²)", "Вага 1 м² (кг)",
+            "Довжина дроту 1 м² (м)", "Загальна вага (кг)", "Ціна за кг (грн)", "Собівартість (грн)"
+        ],
+        "Значення": [
+            cell_size_mm, wire_thickness_mm, roll_length_m, roll_height_m,
+            results["площа"], results["вага_1м2"], results["довжина_1м2"],
+            results["загальна_вага"], results["ціна_за_кг"], results["собівартість"]
+        ]
+    })
+
+
+# ===================================================================
+# ФОРМУЛИ З НАЛАШТОВУВАНИМИ КОЕФІЦІЄНТАМИ (calculations.py)
+# ===================================================================
+@lru_cache(maxsize=128)
+def calculate_weight_1m2(
+    cell_size: float, wire_thickness: float, material: str,
+    weight_factor: float = BASE_WEIGHT_FACTOR
+) -> float:
+    base = weight_factor * (wire_thickness ** 2) / cell_size
+    if material == "Мідний":
+        return round(base * COPPER_DENSITY_RATIO, 2)
+    if material == "ПВХ":
+        coef = PVC_COEFFICIENTS.get(wire_thickness, 0.5)
+        return round(base * coef, 2)
+    return round(base, 2)
+
+@lru_cache(maxsize=128)
+def calculate_total_length(
+    cell_size: float, area: float,
+    length_factor: float = BASE_LENGTH_FACTOR
+) -> int:
+    return round(length_factor / cell_size * area)
+
+def calculate_cost(weight: float, price_per_kg: float) -> float:
+    return round(weight * price_per_kg, 2)
+
+
+# ===================================================================
+# ПАКЕТНИЙ РОЗРАХУНОК (прайс-листи)
+# ===================================================================
+BATCH_COLUMNS = [
+    "cell_size_mm", "wire_thickness_mm", "roll_length_m",
+    "roll_height_m", "material", "custom_price_per_kg"
+]
+
+ArrayLike = Union[float, str, Sequence, np.ndarray, pd.Series, None]
+
+
+def _round_like_python(values: np.ndarray, ndigits: int) -> np.ndarray:
+    """
+    Векторне округлення, що збігається з вбудованим round().
+    np.round множить на 10**n і може інакше розв'язати «половинки»,
+    тому рядки поблизу .5 доокруглюємо поштучно через round().
+    """
+    rounded = np.round(values, ndigits)
+    scaled = values * (10.0 ** ndigits)
+    distance_to_half = np.abs(scaled - np.floor(scaled) - 0.5)
+    tolerance = np.maximum(np.abs(scaled), 1.0) * 1e-12
+    for i in np.flatnonzero(distance_to_half <= tolerance):
+        rounded[i] = round(float(values[i]), ndigits)
+    return rounded
+
+
+def calculate_warehouse_cost_batch(
+    params: Optional[pd.DataFrame] = None,
+    *,
+    cell_size_mm: ArrayLike = None,
+    wire_thickness_mm: ArrayLike = None,
+    roll_length_m: ArrayLike = None,
+    roll_height_m: ArrayLike = None,
+    material: ArrayLike = None,
+    custom_price_per_kg: ArrayLike = None
+) -> pd.DataFrame:
+    """
+    Пакетний розрахунок собівартості за один прохід NumPy.
+    Приймає DataFrame з колонками BATCH_COLUMNS або масиви параметрів
+    (скаляри розгортаються на всі рядки). Повертає DataFrame з тими ж
+    ключами, що й calculate_warehouse_cost; рядки з розміром вічка
+    або товщиною дроту <= 0 отримують NaN та valid=False.
+    """
+    if params is not None:
+        columns = {name: params[name] if name in params else None for name in BATCH_COLUMNS}
+    else:
+        columns = {
+            "cell_size_mm": cell_size_mm,
+            "wire_thickness_mm": wire_thickness_mm,
+            "roll_length_m": roll_length_m,
+            "roll_height_m": roll_height_m,
+            "material": material,
+            "custom_price_per_kg": custom_price_per_kg,
+        }
+
+    missing = [name for name in BATCH_COLUMNS[:5] if columns[name] is None]
+    if missing:
+        raise InvalidParameterError(f"Не вистачає параметрів: {', '.join(missing)}")
+
+    custom = columns["custom_price_per_kg"]
+    custom = pd.to_numeric(
+        pd.Series(np.atleast_1d(np.asarray(0.0 if custom is None else custom, dtype=object))),
+        errors="coerce"
+    ).fillna(0.0).to_numpy(dtype=float)
+
+    cell, wire, length, height, materials, custom = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(columns[name], dtype=float)) for name in BATCH_COLUMNS[:4]),
+        np.atleast_1d(np.asarray(columns["material"], dtype=object)),
+        custom
+    )
+    n = cell.shape[0]
+
+    valid = (cell > 0) & (wire > 0)
+    safe_cell = np.where(valid, cell, np.nan)
+
+    area = length * height
+
+    # Коефіцієнт для матеріалу (ПВХ — точний збіг товщини, як dict.get)
+    pvc_coeff = np.full(n, 0.5)
+    for thickness, coeff in PVC_COEFFICIENTS.items():
+        pvc_coeff[wire == thickness] = coeff
+    material_coeff = np.ones(n)
+    material_coeff = np.where(materials == "Мідний", COPPER_DENSITY_RATIO, material_coeff)
+    material_coeff = np.where(materials == "ПВХ", pvc_coeff, material_coeff)
+
+    weight_per_m2 = _round_like_python(
+        BASE_WEIGHT_FACTOR * (wire ** 2) / safe_cell * material_coeff, 4
+    )
+    length_per_m2 = _round_like_python(BASE_LENGTH_FACTOR / safe_cell, 1)
+    total_weight = _round_like_python(weight_per_m2 * area, 2)
+
+    default_price = pd.Series(materials, dtype=object).map(MATERIAL_PRICES).fillna(DEFAULT_PRICE_PER_KG).to_numpy(dtype=float)
+    price_per_kg = np.where(custom != 0, custom, default_price)
+
+    total_cost = _round_like_python(total_weight * price_per_kg, 2)
+
+    return pd.DataFrame({
+        "material": materials,
+        "cell_size_mm": cell,
+        "wire_thickness_mm": wire,
+        "roll_length_m": length,
+        "roll_height_m": height,
+        "вага_1м2": weight_per_m2,
+        "довжина_1м2": length_per_m2,
+        "площа": area,
+        "загальна_вага": total_weight,
+        "ціна_за_кг": price_per_kg,
+        "собівартість": total_cost,
+        "valid": valid
+    }, index=params.index if params is not None else None)
@@ -0,0 +1,714 @@
+# migrations.py — ВЕРСІОНОВАНІ МІГРАЦІЇ СХЕМ
+"""
+Кожна база має нумерований список міграцій. Номер застосованої
+зберігається в PRAGMA user_version файлу, тож у робочому режимі
+init_*() — це одне читання user_version на файл, без DDL і записів.
+
+Міграція — SQL-рядок, кортеж рядків або функція(conn). Нові міграції
+лише дописуються в кінець списку; змінювати вже випущені не можна.
+
+Вторинні індекси описані декларативно в INDEXES і звіряються з базою
+(sync_indexes) при першому migrate() файлу в процесі та після кожної
+міграції: відсутні створюються, змінені — перестворюються, зайві idx_*
+видаляються. Нові індекси додаються лише в INDEXES.
+"""
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+from config.settings import DATABASES
+from connections import get_connection
+
+Migration = Union[str, Tuple[str, ...], Callable[[sqlite3.Connection], None]]
+
+# ===================================================================
+# ДОПОМІЖНІ
+# ===================================================================
+def _columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _add_column_if_missing(conn: sqlite3.Connection, table: str, column: str, ddl: str) -> None:
+    if column not in _columns(conn, table):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+
+
+def _seed_if_empty(table: str, columns: Sequence[str], rows: Callable[[], List[tuple]]) -> Callable:
+    """Міграція: вставляє приклади, лише якщо таблиця порожня."""
+    def migration(conn: sqlite3.Connection) -> None:
+        if conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone() is None:
+            placeholders = ", ".join("?" for _ in columns)
+            conn.executemany(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", rows()
+            )
+    return migration
+
+
+# ===================================================================
+# ПРИКЛАДИ ДАНИХ
+# ===================================================================
+INVENTORY_SEED_COLUMNS = ("batch_id", "material", "quantity", "price_per_unit", "total_cost", "arrival_date")
+CLIENTS_SEED_COLUMNS = ("name", "type")
+TRANSACTIONS_SEED_COLUMNS = ("client_id", "type", "amount", "date")
+SUPPLIERS_SEED_COLUMNS = ("name", "inn", "address", "phone", "email", "contact_person", "created_date")
+ORDERS_SEED_COLUMNS = ("supplier_id", "material", "quantity", "price_per_unit", "total_cost",
+                       "status", "order_date", "delivery_date")
+CASH_FLOW_SEED_COLUMNS = ("type", "category", "amount", "date")
+STOCK_TARGETS_SEED_COLUMNS = ("material", "min_stock", "max_stock")
+
+
+def _inventory_seed() -> List[tuple]:
+    return [
+        ("B001", "Оцинкований", 100, 75.0, 7500.0, "2025-10-01"),
+        ("B002", "Чорний", 60, 60.0, 3600.0, "2025-10-05"),
+    ]
+
+
+def _stock_targets_seed() -> List[tuple]:
+    # Колишній procurement.MIN_STOCK: замовляли рівно до мінімуму
+    return [
+        ("Оцинкований", 50, 50),
+        ("Чорний", 30, 30),
+        ("ПВХ", 20, 20),
+        ("Мідний", 10, 10),
+    ]
+
+
+def _clients_seed() -> List[tuple]:
+    return [("ТОВ СіткаПлюс", "client")]
+
+
+def _transactions_seed() -> List[tuple]:
+    return [(1, "payment", 15000.0, "2025-10-10")]
+
+
+def _suppliers_seed() -> List[tuple]:
+    return [
+        ("ТОВ МеталПром", "1234567890", "Київ, вул. Металургів 10", "+380671234567",
+         "metalprom@ukr.net", "Іван Металенко", "2025-10-01"),
+        ("ФОП СтальБуд", "0987654321", "Харків, вул. Сталінградська 5", "+380672345678",
+         "stalbud@gmail.com", "Олена Сталь", "2025-10-02"),
+    ]
+
+
+def _orders_seed() -> List[tuple]:
+    today = datetime.now().strftime("%Y-%m-%d")
+    future = (datetime.now() + timedelta(days=7)).strftime("%Y-%m-%d")
+    return [
+        (1, "Оцинкований", 100, 75.0, 7500.0, "planned", today, future),
+        (2, "Чорний", 50, 55.0, 2750.0, "ordered", today, future),
+    ]
+
+
+def _cash_flow_seed() -> List[tuple]:
+    return [
+        ("income", "Продажі", 45000.0, "2025-10-15"),
+        ("expense", "Закупівлі", 30000.0, "2025-10-16"),
+    ]
+
+
+# ===================================================================
+# КАТАЛОГ ІНДЕКСІВ
+# ===================================================================
+# Ім'я індексу → "таблиця(колонки)". Префікс idx_ означає «керується
+# каталогом»: такий індекс, якого немає в INDEXES, буде видалено.
+# Кожен запит data-модулів перевіряється tests/test_query_plans.py.
+INDEXES: Dict[str, Dict[str, str]] = {
+    "warehouse": {
+        # агрегати партій по матеріалу (WHERE quantity > 0)
+        "idx_inventory_material_qty": "inventory(material, quantity)",
+        # FIFO: партії матеріалу в порядку надходження (fifo.py)
+        "idx_inventory_material_arrival": "inventory(material, arrival_date)",
+        # історія руху по матеріалу; списання за період (швидкість споживання)
+        "idx_stock_movements_material_ts": "stock_movements(material, created_at)",
+        "idx_stock_movements_kind_ts": "stock_movements(kind, created_at)",
+    },
+    "suppliers": {
+        # активні замовлення: status IN (...) ORDER BY order_date
+        "idx_purchase_orders_status_date": "purchase_orders(status, order_date)",
+        # остання ціна матеріалу: MAX(id) GROUP BY material
+        "idx_purchase_orders_material": "purchase_orders(material)",
+    },
+    "finance": {
+        "idx_cash_flow_date": "cash_flow(date)",
+        "idx_cash_flow_type_date": "cash_flow(type, date)",
+        "idx_cash_flow_category_date": "cash_flow(category, date)",
+    },
+    "clients": {},
+    "history": {
+        # rowid = id неявно додається в кінець кожного індексу
+        "idx_history_timestamp": "history(timestamp)",
+        "idx_history_material_ts": "history(material, timestamp)",
+        "idx_history_cell_size_ts": "history(cell_size, timestamp)",
+    },
+}
+
+
+def _index_sql(name: str, definition: str) -> str:
+    return f"CREATE INDEX {name} ON {definition}"
+
+
+def _normalize_sql(sql: str) -> str:
+    return " ".join(sql.replace("(", " ( ").replace(")", " ) ").replace(",", " , ").split()).lower()
+
+
+def sync_indexes(conn: sqlite3.Connection, db_name: str, tables: Optional[Sequence[str]] = None) -> None:
+    """
+    Приводить індекси бази у відповідність до INDEXES[db_name].
+    tables — обмежити звірку цими таблицями (для масового імпорту).
+    """
+    wanted = {
+        name: _index_sql(name, definition)
+        for name, definition in INDEXES.get(db_name, {}).items()
+        if tables is None or definition.split("(")[0].strip() in tables
+    }
+    existing = {
+        name: sql for name, table, sql in conn.execute(
+            "SELECT name, tbl_name, sql FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx!_%' ESCAPE '!'"
+        )
+        if tables is None or table in tables
+    }
+    with conn:
+        for name, sql in existing.items():
+            if name not in wanted or _normalize_sql(sql) != _normalize_sql(wanted[name]):
+                conn.execute(f"DROP INDEX {name}")
+        for name, sql in wanted.items():
+            if name not in existing or _normalize_sql(existing[name]) != _normalize_sql(sql):
+                conn.execute(sql)
+
+
+def drop_indexes(conn: sqlite3.Connection, db_name: str, tables: Sequence[str]) -> None:
+    """Видаляє каталожні індекси таблиць (перед масовим завантаженням)."""
+    with conn:
+        for name, definition in INDEXES.get(db_name, {}).items():
+            if definition.split("(")[0].strip() in tables:
+                conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+# ===================================================================
+# ЛІЧИЛЬНИКИ ЗМІН ТАБЛИЦЬ
+# ===================================================================
+# Тригери збільшують table_versions.version при кожній зміні таблиці;
+# data_cache використовує версії як частину ключа кешу.
+TRACKED_TABLES: Dict[str, Tuple[str, ...]] = {
+    "warehouse": ("inventory", "stock_targets"),
+    "suppliers": ("suppliers", "purchase_orders"),
+    "finance": ("cash_flow",),
+    "clients": ("clients", "transactions"),
+    "history": (),
+}
+
+TABLE_VERSIONS_DDL = """CREATE TABLE IF NOT EXISTS table_versions (
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID"""
+
+_TRIGGER_EVENTS = ("INSERT", "UPDATE", "DELETE")
+
+
+def create_change_triggers(conn: sqlite3.Connection, tables: Sequence[str]) -> None:
+    """Створює тригери лічильника змін (без власної транзакції)."""
+    for table in tables:
+        conn.execute("INSERT OR IGNORE INTO table_versions (name, version) VALUES (?, 0)", (table,))
+        for event in _TRIGGER_EVENTS:
+            conn.execute(
+                f"CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_version "
+                f"AFTER {event} ON {table} BEGIN "
+                f"UPDATE table_versions SET version = version + 1 WHERE name = '{table}'; END"
+            )
+
+
+def drop_change_triggers(conn: sqlite3.Connection, tables: Sequence[str]) -> None:
+    """Знімає тригери на час масового імпорту; після нього — bump_table_versions."""
+    for table in tables:
+        for event in _TRIGGER_EVENTS:
+            conn.execute(f"DROP TRIGGER IF EXISTS trg_{table}_{event.lower()}_version")
+
+
+def bump_table_versions(conn: sqlite3.Connection, tables: Sequence[str]) -> None:
+    conn.executemany(
+        "UPDATE table_versions SET version = version + 1 WHERE name = ?",
+        [(table,) for table in tables],
+    )
+
+
+def _change_counters(db_name: str, tables: Optional[Sequence[str]] = None) -> Callable[[sqlite3.Connection], None]:
+    """
+    tables — явний список для міграції, випущеної до появи пізніших таблиць
+    бази (їм тригери створює власна міграція).
+    """
+    def migration(conn: sqlite3.Connection) -> None:
+        conn.execute(TABLE_VERSIONS_DDL)
+        create_change_triggers(conn, TRACKED_TABLES[db_name] if tables is None else tables)
+    return migration
+
+
+# ===================================================================
+# ПОМІСЯЧНИЙ P&L (finance)
+# ===================================================================
+# pl_monthly — згортка cash_flow по місяцях, яку тримають актуальною
+# тригери; entries — кількість операцій за місяць (місяць без операцій
+# не показується, як і в groupby по сирих даних).
+PL_MONTHLY_DDL = """CREATE TABLE IF NOT EXISTS pl_monthly (
+    month TEXT PRIMARY KEY,
+    income REAL NOT NULL DEFAULT 0,
+    expense REAL NOT NULL DEFAULT 0,
+    entries INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID"""
+
+_PL_ADD = """
+    INSERT INTO pl_monthly (month, income, expense, entries)
+    SELECT substr(NEW.date, 1, 7),
+           CASE WHEN NEW.type = 'income' THEN COALESCE(NEW.amount, 0) ELSE 0 END,
+           CASE WHEN NEW.type = 'expense' THEN COALESCE(NEW.amount, 0) ELSE 0 END,
+           1
+    WHERE NEW.date IS NOT NULL
+    ON CONFLICT(month) DO UPDATE SET
+        income = income + excluded.income,
+        expense = expense + excluded.expense,
+        entries = entries + 1;
+"""
+
+_PL_SUBTRACT = """
+    UPDATE pl_monthly SET
+        income = income - CASE WHEN OLD.type = 'income' THEN COALESCE(OLD.amount, 0) ELSE 0 END,
+        expense = expense - CASE WHEN OLD.type = 'expense' THEN COALESCE(OLD.amount, 0) ELSE 0 END,
+        entries = entries - 1
+    WHERE month = substr(OLD.date, 1, 7);
+"""
+
+PL_MONTHLY_TRIGGERS = (
+    f"CREATE TRIGGER IF NOT EXISTS trg_cash_flow_insert_pl AFTER INSERT ON cash_flow BEGIN {_PL_ADD} END",
+    f"CREATE TRIGGER IF NOT EXISTS trg_cash_flow_delete_pl AFTER DELETE ON cash_flow BEGIN {_PL_SUBTRACT} END",
+    "CREATE TRIGGER IF NOT EXISTS trg_cash_flow_update_pl AFTER UPDATE OF type, amount, date ON cash_flow "
+    f"BEGIN {_PL_SUBTRACT} {_PL_ADD} END",
+)
+
+
+REBUILD_PL_MONTHLY_SQL = """
+    INSERT INTO pl_monthly (month, income, expense, entries)
+    SELECT substr(date, 1, 7),
+           TOTAL(CASE WHEN type = 'income' THEN amount END),
+           TOTAL(CASE WHEN type = 'expense' THEN amount END),
+           COUNT(*)
+    FROM cash_flow
+    WHERE date IS NOT NULL
+    GROUP BY substr(date, 1, 7)
+"""
+
+
+def rebuild_pl_monthly(conn: sqlite3.Connection) -> int:
+    """Перераховує pl_monthly з cash_flow (без власної транзакції); повертає кількість місяців."""
+    conn.execute("DELETE FROM pl_monthly")
+    conn.execute(REBUILD_PL_MONTHLY_SQL)
+    return conn.execute("SELECT COUNT(*) FROM pl_monthly").fetchone()[0]
+
+
+def _pl_monthly(conn: sqlite3.Connection) -> None:
+    conn.execute(PL_MONTHLY_DDL)
+    for trigger in PL_MONTHLY_TRIGGERS:
+        conn.execute(trigger)
+    rebuild_pl_monthly(conn)
+
+
+# ===================================================================
+# ЦІЛЬОВІ ЗАПАСИ (warehouse)
+# ===================================================================
+# Точка замовлення й рівень поповнення на матеріал: прогнозний запас
+# (склад + замовлення в дорозі) нижче min_stock → замовити до max_stock.
+STOCK_TARGETS_DDL = """CREATE TABLE IF NOT EXISTS stock_targets (
+    material TEXT PRIMARY KEY,
+    min_stock INTEGER NOT NULL CHECK (min_stock >= 0),
+    max_stock INTEGER NOT NULL CHECK (max_stock >= min_stock)
+) WITHOUT ROWID"""
+
+
+def _stock_targets(conn: sqlite3.Connection) -> None:
+    conn.execute(STOCK_TARGETS_DDL)
+    _seed_if_empty("stock_targets", STOCK_TARGETS_SEED_COLUMNS, _stock_targets_seed)(conn)
+    create_change_triggers(conn, ["stock_targets"])
+
+
+# ===================================================================
+# ЖУРНАЛ РУХУ ЗАПАСІВ (warehouse)
+# ===================================================================
+# Партії inventory лишаються джерелом правди; кожну зміну кількості
+# тригери дописують у stock_movements (прихід, списання, коригування),
+# а той — у залишок stock_balance (рядок на матеріал). Журнал лише
+# дописується: виправлення — новим коригуванням. Рахується додатна
+# частина кількості партії — як і колишній SUM(quantity) WHERE quantity > 0.
+STOCK_MOVEMENTS_DDL = """CREATE TABLE IF NOT EXISTS stock_movements (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT NOT NULL DEFAULT (datetime('now', 'localtime')),
+    material TEXT NOT NULL,
+    kind TEXT NOT NULL CHECK (kind IN ('receipt', 'issue', 'adjustment')),
+    quantity INTEGER NOT NULL,
+    inventory_id INTEGER,
+    batch_id TEXT
+)"""
+
+STOCK_BALANCE_DDL = """CREATE TABLE IF NOT EXISTS stock_balance (
+    material TEXT PRIMARY KEY,
+    quantity INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT NOT NULL
+) WITHOUT ROWID"""
+
+
+def _movement(row: str, kind: str, quantity: str, condition: str) -> str:
+    return f"""
+    INSERT INTO stock_movements (material, kind, quantity, inventory_id, batch_id)
+    SELECT {row}.material, {kind}, {quantity}, {row}.id, {row}.batch_id
+    WHERE {row}.material IS NOT NULL AND {condition};
+"""
+
+
+_OLD_QTY = "max(COALESCE(OLD.quantity, 0), 0)"
+_NEW_QTY = "max(COALESCE(NEW.quantity, 0), 0)"
+
+STOCK_LEDGER_TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS trg_inventory_insert_ledger AFTER INSERT ON inventory BEGIN "
+    + _movement("NEW", "'receipt'", _NEW_QTY, f"{_NEW_QTY} != 0")
+    + "END",
+    "CREATE TRIGGER IF NOT EXISTS trg_inventory_update_ledger AFTER UPDATE OF material, quantity ON inventory BEGIN "
+    # зміна кількості в межах матеріалу
+    + _movement(
+        "NEW",
+        f"CASE WHEN {_NEW_QTY} < {_OLD_QTY} THEN 'issue' ELSE 'adjustment' END",
+        f"{_NEW_QTY} - {_OLD_QTY}",
+        f"NEW.material IS OLD.material AND {_NEW_QTY} != {_OLD_QTY}",
+    )
+    # партію перенесли на інший матеріал: з одного залишку в інший
+    + _movement("OLD", "'adjustment'", f"-{_OLD_QTY}", f"NEW.material IS NOT OLD.material AND {_OLD_QTY} != 0")
+    + _movement("NEW", "'adjustment'", _NEW_QTY, f"NEW.material IS NOT OLD.material AND {_NEW_QTY} != 0")
+    + "END",
+    "CREATE TRIGGER IF NOT EXISTS trg_inventory_delete_ledger AFTER DELETE ON inventory BEGIN "
+    + _movement("OLD", "'adjustment'", f"-{_OLD_QTY}", f"{_OLD_QTY} != 0")
+    + "END",
+    """CREATE TRIGGER IF NOT EXISTS trg_stock_movements_balance AFTER INSERT ON stock_movements BEGIN
+        INSERT INTO stock_balance (material, quantity, updated_at)
+        VALUES (NEW.material, NEW.quantity, NEW.created_at)
+        ON CONFLICT(material) DO UPDATE SET
+            quantity = quantity + excluded.quantity,
+            updated_at = excluded.updated_at;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_stock_movements_no_update BEFORE UPDATE ON stock_movements BEGIN
+        SELECT RAISE(ABORT, 'stock_movements: журнал лише дописується');
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_stock_movements_no_delete BEFORE DELETE ON stock_movements BEGIN
+        SELECT RAISE(ABORT, 'stock_movements: журнал лише дописується');
+    END""",
+)
+
+
+def create_stock_ledger_triggers(conn: sqlite3.Connection) -> None:
+    for trigger in STOCK_LEDGER_TRIGGERS:
+        conn.execute(trigger)
+
+
+def drop_stock_ledger_triggers(conn: sqlite3.Connection) -> None:
+    """Знімає тригери журналу на inventory для масового імпорту; після нього — post_stock_receipts."""
+    for event in _TRIGGER_EVENTS:
+        conn.execute(f"DROP TRIGGER IF EXISTS trg_inventory_{event.lower()}_ledger")
+
+
+LAST_MOVEMENT_ID_SQL = "SELECT COALESCE(MAX(id), 0) FROM stock_movements"
+
+# Залишки за рухами з id > ? одним агрегованим upsert. «+material»: інакше
+# SQLite групує через idx_stock_movements_material_ts і читає весь журнал
+# замість діапазону rowid
+POST_BALANCE_SQL = """
+    INSERT INTO stock_balance (material, quantity, updated_at)
+    SELECT material, SUM(quantity), MAX(created_at)
+    FROM stock_movements
+    WHERE id > ?
+    GROUP BY +material
+    ON CONFLICT(material) DO UPDATE SET
+        quantity = quantity + excluded.quantity,
+        updated_at = excluded.updated_at
+"""
+
+NEW_MOVEMENTS_COUNT_SQL = "SELECT COUNT(*) FROM stock_movements WHERE id > ?"
+
+POST_RECEIPTS_SQL = """
+    INSERT INTO stock_movements (material, kind, quantity, inventory_id, batch_id)
+    SELECT material, 'receipt', quantity, id, batch_id
+    FROM inventory
+    WHERE id > ? AND material IS NOT NULL AND quantity > 0
+    ORDER BY id
+"""
+
+INSERT_MOVEMENT_SQL = (
+    "INSERT INTO stock_movements (material, kind, quantity, inventory_id, batch_id) VALUES (?, ?, ?, ?, ?)"
+)
+
+
+def _post_movements(conn: sqlite3.Connection, write: Callable[[], object]) -> int:
+    """
+    Дописує рухи функцією write() з вимкненим тригером залишку, а потім
+    оновлює stock_balance одним агрегованим upsert. Відновлює всі тригери
+    журналу. Повертає кількість нових рухів.
+    """
+    first = conn.execute(LAST_MOVEMENT_ID_SQL).fetchone()[0]
+    conn.execute("DROP TRIGGER IF EXISTS trg_stock_movements_balance")
+    write()
+    conn.execute(POST_BALANCE_SQL, (first,))
+    create_stock_ledger_triggers(conn)
+    return conn.execute(NEW_MOVEMENTS_COUNT_SQL, (first,)).fetchone()[0]
+
+
+def post_stock_receipts(conn: sqlite3.Connection, after_id: int) -> int:
+    """
+    Проводить прихід партій inventory з id > after_id set-based запитами
+    замість тригерів по рядку (без власної транзакції). Повертає кількість рухів.
+    """
+    return _post_movements(conn, lambda: conn.execute(POST_RECEIPTS_SQL, (after_id,)))
+
+
+def post_stock_movements(conn: sqlite3.Connection, rows: Iterable[tuple]) -> int:
+    """
+    Дописує готові рухи (material, kind, quantity, inventory_id, batch_id)
+    одним executemany — для масових змін inventory при знятих тригерах
+    журналу (без власної транзакції). Повертає кількість рухів.
+    """
+    return _post_movements(conn, lambda: conn.executemany(INSERT_MOVEMENT_SQL, rows))
+
+
+def _stock_ledger(conn: sqlite3.Connection) -> None:
+    conn.execute(STOCK_MOVEMENTS_DDL)
+    conn.execute(STOCK_BALANCE_DDL)
+    create_stock_ledger_triggers(conn)
+    # Початкові залишки: кожна наявна партія — прихід на дату надходження
+    conn.execute("""
+        INSERT INTO stock_movements (created_at, material, kind, quantity, inventory_id, batch_id)
+        SELECT COALESCE(arrival_date, datetime('now', 'localtime')), material, 'receipt', quantity, id, batch_id
+        FROM inventory
+        WHERE material IS NOT NULL AND quantity > 0
+        ORDER BY id
+    """)
+
+
+# ===================================================================
+# МІГРАЦІЇ ПО БАЗАХ
+# ===================================================================
+
+
+def _suppliers_order_dates(conn: sqlite3.Connection) -> None:
+    # Старі бази могли не мати цих полів
+    _add_column_if_missing(conn, "purchase_orders", "order_date", "TEXT")
+    _add_column_if_missing(conn, "purchase_orders", "delivery_date", "TEXT")
+
+
+def _orders_idempotency_key(conn: sqlite3.Connection) -> None:
+    # Ключ ідемпотентності пакетного створення замовлень (procurement.create_purchase_orders);
+    # NULL — без перевірки. Обмеження, а не каталожний індекс: імпорт його не знімає.
+    _add_column_if_missing(conn, "purchase_orders", "idempotency_key", "TEXT")
+    conn.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_purchase_orders_idempotency_key "
+        "ON purchase_orders(idempotency_key)"
+    )
+
+
+def _clients_unify_schema(conn: sqlite3.Connection) -> None:
+    # clients.py і database.py створювали clients з різними полями
+    _add_column_if_missing(conn, "clients", "type", "TEXT")
+    _add_column_if_missing(conn, "clients", "email", "TEXT")
+    _add_column_if_missing(conn, "clients", "phone", "TEXT")
+    _add_column_if_missing(conn, "clients", "logo", "TEXT")
+
+
+def _suppliers_unify_schema(conn: sqlite3.Connection) -> None:
+    _add_column_if_missing(conn, "suppliers", "balance", "REAL DEFAULT 0.0")
+    _add_column_if_missing(conn, "suppliers", "logo", "TEXT")
+
+
+def _history_indexes(conn: sqlite3.Connection) -> None:
+    # Історична міграція; надалі індекси веде каталог INDEXES
+    for index_name, definition in INDEXES["history"].items():
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {definition}")
+
+
+MIGRATIONS: Dict[str, List[Migration]] = {
+    "warehouse": [
+        # 1
+        """CREATE TABLE IF NOT EXISTS inventory (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            batch_id TEXT,
+            material TEXT,
+            quantity INTEGER,
+            price_per_unit REAL,
+            total_cost REAL,
+            arrival_date TEXT
+        )""",
+        # 2
+        _seed_if_empty("inventory", INVENTORY_SEED_COLUMNS, _inventory_seed),
+        # 3
+        _change_counters("warehouse", ("inventory",)),
+        # 4
+        _stock_targets,
+        # 5
+        _stock_ledger,
+    ],
+    "clients": [
+        # 1
+        (
+            """CREATE TABLE IF NOT EXISTS clients (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT, type TEXT, balance REAL DEFAULT 0.0
+            )""",
+            """CREATE TABLE IF NOT EXISTS transactions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                client_id INTEGER, type TEXT, amount REAL, date TEXT
+            )""",
+        ),
+        # 2
+        _clients_unify_schema,
+        # 3
+        _seed_if_empty("clients", CLIENTS_SEED_COLUMNS, _clients_seed),
+        # 4
+        _seed_if_empty("transactions", TRANSACTIONS_SEED_COLUMNS, _transactions_seed),
+        # 5
+        _change_counters("clients"),
+    ],
+    "suppliers": [
+        # 1
+        (
+            """CREATE TABLE IF NOT EXISTS suppliers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                inn TEXT,
+                address TEXT,
+                phone TEXT,
+                email TEXT,
+                contact_person TEXT,
+                rating REAL DEFAULT 5.0,
+                created_date TEXT NOT NULL
+            )""",
+            """CREATE TABLE IF NOT EXISTS purchase_orders (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                supplier_id INTEGER NOT NULL,
+                material TEXT NOT NULL,
+                quantity INTEGER NOT NULL,
+                price_per_unit REAL NOT NULL,
+                total_cost REAL NOT NULL,
+                status TEXT DEFAULT 'planned',
+                order_date TEXT,
+                delivery_date TEXT
+            )""",
+        ),
+        # 2
+        _suppliers_order_dates,
+        # 3
+        _suppliers_unify_schema,
+        # 4
+        _seed_if_empty("suppliers", SUPPLIERS_SEED_COLUMNS, _suppliers_seed),
+        # 5
+        _seed_if_empty("purchase_orders", ORDERS_SEED_COLUMNS, _orders_seed),
+        # 6
+        _change_counters("suppliers"),
+        # 7
+        _orders_idempotency_key,
+    ],
+    "finance": [
+        # 1
+        """CREATE TABLE IF NOT EXISTS cash_flow (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            type TEXT, category TEXT, amount REAL, date TEXT
+        )""",
+        # 2
+        _seed_if_empty("cash_flow", CASH_FLOW_SEED_COLUMNS, _cash_flow_seed),
+        # 3
+        _change_counters("finance"),
+        # 4
+        _pl_monthly,
+    ],
+    "history": [
+        # 1
+        """CREATE TABLE IF NOT EXISTS history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            material TEXT NOT NULL,
+            cell_size REAL NOT NULL,
+            wire_thickness REAL NOT NULL,
+            roll_length REAL NOT NULL,
+            roll_height REAL NOT NULL,
+            price_per_kg REAL NOT NULL,
+            margin_pct REAL NOT NULL,
+            purchase_cost REAL NOT NULL,
+            sale_price REAL NOT NULL,
+            profit REAL NOT NULL,
+            area REAL NOT NULL,
+            total_weight REAL NOT NULL
+        )""",
+        # 2
+        _history_indexes,
+    ],
+}
+
+
+# ===================================================================
+# ЗАСТОСУВАННЯ
+# ===================================================================
+def _apply(conn: sqlite3.Connection, migration: Migration) -> None:
+    if callable(migration):
+        migration(conn)
+    elif isinstance(migration, tuple):
+        for statement in migration:
+            conn.execute(statement)
+    else:
+        conn.execute(migration)
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+_indexes_synced: Set[str] = set()
+_indexes_lock = threading.Lock()
+
+
+def migrate(db_name: str, db_path: Optional[str] = None) -> int:
+    """
+    Доводить базу db_name до останньої версії й повертає її номер.
+    Якщо версія актуальна — лише одне читання PRAGMA user_version
+    (плюс одноразова звірка індексів при першому виклику в процесі).
+    """
+    migrations = MIGRATIONS[db_name]
+    target = len(migrations)
+    db_path = os.path.abspath(db_path or DATABASES[db_name])
+    conn = get_connection(db_path)
+
+    if schema_version(conn) >= target:
+        if db_path not in _indexes_synced:
+            with _indexes_lock:
+                sync_indexes(conn, db_name)
+                _indexes_synced.add(db_path)
+        return target
+
+    # BEGIN IMMEDIATE: паралельний процес дочекається і побачить нову версію
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        current = schema_version(conn)
+        for number in range(current + 1, target + 1):
+            _apply(conn, migrations[number - 1])
+        conn.execute(f"PRAGMA user_version = {target}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    with _indexes_lock:
+        sync_indexes(conn, db_name)
+        _indexes_synced.add(db_path)
+    return target
+
+
+def migrate_all() -> Dict[str, int]:
+    """Мігрує всі бази з DATABASES."""
+    return {name: migrate(name) for name in MIGRATIONS}
+
+
+if __name__ == "__main__":
+    for name, version in migrate_all().items():
+        print(f"{name}: версія схеми {version}")
@@ -0,0 +1,148 @@
+# price_matrix.py — ПОПЕРЕДНЬО ПОРАХОВАНА МАТРИЦЯ ВАГИ/ДОВЖИНИ НА 1 м²
+"""
+Вхідний простір калькулятора дискретний: 4 матеріали, вічко 10–100 мм
+(крок 5), дріт 1.0–3.0 мм (крок 0.1). Матриця рахується один раз
+пакетним розрахунком, зберігається в data/ як .npy і відкривається
+через memory-map, тож усі процеси ділять одну копію в page cache.
+Ім'я файлу містить відбиток констант — зміна коефіцієнтів чи цін
+автоматично веде до перебудови.
+"""
+import hashlib
+import os
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import mesh_core as core
+
+MATRIX_DIR = "data"
+
+# --- Сітка вхідних значень (як у віджетах вкладки калькулятора) ---
+CELL_SIZES = np.arange(10, 101, 5, dtype=float)
+WIRE_THICKNESSES = np.array([round(1.0 + 0.1 * i, 1) for i in range(21)])
+
+# Останній вимір матриці
+WEIGHT, LENGTH = 0, 1
+
+
+def _fingerprint() -> str:
+    """Відбиток усіх констант, від яких залежить матриця."""
+    constants = (
+        core.BASE_WEIGHT_FACTOR, core.BASE_LENGTH_FACTOR, core.COPPER_DENSITY_RATIO,
+        sorted(core.PVC_COEFFICIENTS.items()), sorted(core.MATERIAL_PRICES.items()),
+        CELL_SIZES.tolist(), WIRE_THICKNESSES.tolist()
+    )
+    return hashlib.sha1(repr(constants).encode("utf-8")).hexdigest()[:12]
+
+
+@dataclass
+class PriceMatrix:
+    path: str
+    materials: Tuple[str, ...]
+    prices: np.ndarray   # ціна за кг за замовчуванням, форма (M,)
+    values: np.ndarray   # вага/довжина на 1 м², форма (M, C, W, 2)
+
+    def lookup(self, material: str, cell_size_mm: float, wire_thickness_mm: float) -> Optional[Tuple[int, int, int]]:
+        """Індекси (матеріал, вічко, дріт) або None, якщо значення поза сіткою."""
+        if material not in self.materials:
+            return None
+        c = int(np.searchsorted(CELL_SIZES, cell_size_mm))
+        w = int(np.searchsorted(WIRE_THICKNESSES, wire_thickness_mm))
+        # Лише точний збіг: коефіцієнти ПВХ залежать від точного значення товщини
+        if c >= CELL_SIZES.size or CELL_SIZES[c] != cell_size_mm:
+            return None
+        if w >= WIRE_THICKNESSES.size or WIRE_THICKNESSES[w] != wire_thickness_mm:
+            return None
+        return self.materials.index(material), c, w
+
+
+def build_price_matrix(path: str) -> None:
+    """Рахує матрицю пакетним розрахунком і атомарно записує її у path."""
+    materials = list(core.MATERIAL_PRICES)
+    m, c, w = np.meshgrid(np.arange(len(materials)), CELL_SIZES, WIRE_THICKNESSES, indexing="ij")
+    batch = core.calculate_warehouse_cost_batch(
+        cell_size_mm=c.ravel(),
+        wire_thickness_mm=w.ravel(),
+        roll_length_m=1.0,
+        roll_height_m=1.0,
+        material=np.array(materials, dtype=object)[m.ravel()]
+    )
+    values = np.stack([
+        batch["вага_1м2"].to_numpy().reshape(m.shape),
+        batch["довжина_1м2"].to_numpy().reshape(m.shape)
+    ], axis=-1)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, values)
+    os.replace(tmp_path, path)
+
+
+_matrix: Optional[PriceMatrix] = None
+
+
+def get_price_matrix() -> PriceMatrix:
+    """Відкриває (за потреби будує) матрицю; результат спільний для процесу."""
+    global _matrix
+    fingerprint = _fingerprint()
+    path = os.path.join(MATRIX_DIR, f"price_matrix_{fingerprint}.npy")
+    if _matrix is not None and _matrix.path == path:
+        return _matrix
+
+    if not os.path.exists(path):
+        os.makedirs(MATRIX_DIR, exist_ok=True)
+        build_price_matrix(path)
+        # Прибираємо матриці від старих констант
+        for name in os.listdir(MATRIX_DIR):
+            if name.startswith("price_matrix_") and name.endswith(".npy") and fingerprint not in name:
+                os.remove(os.path.join(MATRIX_DIR, name))
+
+    _matrix = PriceMatrix(
+        path=path,
+        materials=tuple(core.MATERIAL_PRICES),
+        prices=np.array(list(core.MATERIAL_PRICES.values()), dtype=float),
+        values=np.load(path, mmap_mode="r")
+    )
+    return _matrix
+
+
+def price_roll(
+    cell_size_mm: float,
+    wire_thickness_mm: float,
+    roll_length_m: float,
+    roll_height_m: float,
+    material: str,
+    custom_price_per_kg: Optional[float] = None
+) -> Tuple[Dict[str, float], pd.DataFrame]:
+    """
+    Те саме, що mesh_core.compute_warehouse_cost, але через матрицю:
+    пошук індексу + множення на площу та ціну. Значення поза сіткою
+    рахуються звичайним способом (InvalidParameterError для <= 0).
+    """
+    matrix = get_price_matrix()
+    index = matrix.lookup(material, cell_size_mm, wire_thickness_mm)
+    if index is None:
+        return core.compute_warehouse_cost(
+            cell_size_mm, wire_thickness_mm, roll_length_m, roll_height_m,
+            material, custom_price_per_kg
+        )
+
+    weight_per_m2, length_per_m2 = (float(v) for v in matrix.values[index])
+    area = roll_length_m * roll_height_m
+    total_weight = round(weight_per_m2 * area, 2)
+    price_per_kg = custom_price_per_kg or float(matrix.prices[index[0]])
+
+    results = {
+        "вага_1м2": weight_per_m2,
+        "довжина_1м2": length_per_m2,
+        "площа": area,
+        "загальна_вага": total_weight,
+        "ціна_за_кг": price_per_kg,
+        "собівартість": round(total_weight * price_per_kg, 2)
+    }
+    details_df = core.build_details_df(
+        cell_size_mm, wire_thickness_mm, roll_length_m, roll_height_m, results
+    )
+    return results, details_df
@@ -1,114 +1,343 @@
 # procurement.py — ГОТОВИЙ ДО ІМПОРТУ В app.py
-import sqlite3
+import json
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
 import pandas as pd
 import streamlit as st
-from datetime import datetime, timedelta
+
+from connections import get_attached_connection, get_connection
+from crossdomain import IN_TRANSIT_STATUSES
+from data_cache import cached_loader, invalidate_tables
+from suppliers import ACTIVE_ORDERS_SQL
 
 # --- Шляхи до баз ---
 WAREHOUSE_DB = "data/warehouse.db"
 SUPPLIERS_DB = "data/suppliers.db"
 
-# --- Мінімальні запаси ---
-MIN_STOCK = {
-    "Оцинкований": 50,
-    "Чорний": 30,
-    "ПВХ": 20,
-    "Мідний": 10
-}
+# stock_balance веде журнал руху (migrations.py) — рядок на матеріал;
+# змінюється лише разом з inventory, тож кеш залежить від inventory
+CURRENT_STOCK_SQL = "SELECT material, quantity FROM stock_balance WHERE quantity > 0"
+
+MATERIAL_STOCK_SQL = "SELECT quantity FROM stock_balance WHERE material = ?"
+
+# Цілі беруться з warehouse.stock_targets, склад — з warehouse.stock_balance;
+# замовлення в дорозі агрегуються одним проходом, без циклу в Python.
+REORDER_SQL = f"""
+    WITH in_transit AS (
+        SELECT material, SUM(quantity) AS qty
+        FROM suppliers.purchase_orders
+        WHERE status IN ({", ".join(f"'{s}'" for s in IN_TRANSIT_STATUSES)})
+        GROUP BY material
+    ),
+    position AS (
+        SELECT
+            t.material,
+            COALESCE(h.quantity, 0) AS on_hand,
+            COALESCE(o.qty, 0) AS in_transit,
+            t.min_stock,
+            t.max_stock
+        FROM warehouse.stock_targets t
+        LEFT JOIN warehouse.stock_balance h ON h.material = t.material
+        LEFT JOIN in_transit o ON o.material = t.material
+    )
+    SELECT
+        material,
+        on_hand,
+        in_transit,
+        on_hand + in_transit AS projected,
+        min_stock,
+        max_stock,
+        max_stock - (on_hand + in_transit) AS to_order,
+        CASE WHEN on_hand = 0 THEN 'Критичний' ELSE 'Високий' END AS priority
+    FROM position
+    WHERE on_hand + in_transit < min_stock
+    ORDER BY on_hand > 0, to_order DESC, material
+"""
+
+STOCK_TARGETS_SQL = "SELECT material, min_stock, max_stock FROM stock_targets ORDER BY material"
+
+UPSERT_STOCK_TARGET_SQL = """
+    INSERT INTO stock_targets (material, min_stock, max_stock) VALUES (?, ?, ?)
+    ON CONFLICT(material) DO UPDATE SET
+        min_stock = excluded.min_stock,
+        max_stock = excluded.max_stock
+"""
+
+DELETE_MISSING_STOCK_TARGETS_SQL = """
+    DELETE FROM stock_targets WHERE material NOT IN (SELECT value FROM json_each(?))
+"""
+
+INSERT_ORDER_SQL = """
+    INSERT INTO purchase_orders
+    (supplier_id, material, quantity, price_per_unit, total_cost, status, order_date, delivery_date, idempotency_key)
+    VALUES (?, ?, ?, ?, ?, 'planned', ?, ?, ?)
+"""
+
+# Списки параметрів передаються одним JSON-масивом (без ліміту на кількість «?»)
+SUPPLIER_IDS_SQL = "SELECT id FROM suppliers WHERE id IN (SELECT value FROM json_each(?))"
+
+EXISTING_KEYS_SQL = """
+    SELECT idempotency_key FROM purchase_orders
+    WHERE idempotency_key IN (SELECT value FROM json_each(?))
+"""
+
+LAST_ORDER_PRICES_SQL = """
+    SELECT material, price_per_unit FROM suppliers.purchase_orders
+    WHERE id IN (SELECT MAX(id) FROM suppliers.purchase_orders GROUP BY material)
+"""
+
+LAST_BATCH_PRICES_SQL = """
+    SELECT material, price_per_unit FROM warehouse.inventory
+    WHERE id IN (SELECT MAX(id) FROM warehouse.inventory GROUP BY material)
+"""
+
+ORDER_COLUMNS = ("supplier_id", "material", "quantity", "price_per_unit")
+DELIVERY_LEAD_DAYS = 7
+# ₴ за од. для матеріалу без жодного замовлення чи партії (як у формі «Створити замовлення»)
+FALLBACK_PRICE_PER_UNIT = 75.0
+MAX_ORDER_ERRORS = 20
 
 # ===================================================================
 # 1. ПОТОЧНИЙ ЗАПАС
 # ===================================================================
-@st.cache_data(ttl=300)
+@cached_loader("inventory")
 def get_current_stock():
     """Повертає поточний запас: матеріал → кількість"""
     try:
-        conn = sqlite3.connect(WAREHOUSE_DB)
-        df = pd.read_sql_query("""
-            SELECT material, SUM(quantity) as total_quantity
-            FROM inventory
-            WHERE quantity > 0
-            GROUP BY material
-        """, conn)
-        conn.close()
-        return dict(zip(df["material"], df["total_quantity"]))
+        conn = get_connection(WAREHOUSE_DB)
+        return dict(conn.execute(CURRENT_STOCK_SQL).fetchall())
     except Exception as e:
         st.error(f"Помилка читання складу: {e}")
         return {}
 
+def get_material_stock(material: str) -> int:
+    """Залишок одного матеріалу — пошук за первинним ключем stock_balance."""
+    row = get_connection(WAREHOUSE_DB).execute(MATERIAL_STOCK_SQL, (material,)).fetchone()
+    return max(row[0], 0) if row else 0
+
 # ===================================================================
 # 2. РЕКОМЕНДАЦІЇ ПО ЗАКУПІВЛЯХ
 # ===================================================================
-@st.cache_data(ttl=300)
+@cached_loader("inventory", "purchase_orders", "stock_targets")
 def recommend_procurement():
     """
-    Повертає DataFrame з рекомендаціями:
-    - Матеріал
-    - Поточний запас
-    - Мін. запас
-    - Треба замовити
-    - Пріоритет
+    Повертає DataFrame з рекомендаціями (лише те, що треба замовити):
+    - material, on_hand (склад), in_transit (planned/ordered), projected
+    - min_stock / max_stock з stock_targets
+    - to_order — до max_stock з урахуванням замовлень у дорозі
+    - priority — «Критичний», якщо на складі нічого немає
     """
-    current = get_current_stock()
-    recommendations = []
+    try:
+        return pd.read_sql_query(REORDER_SQL, get_attached_connection())
+    except Exception as e:
+        st.error(f"Помилка розрахунку закупівель: {e}")
+        return pd.DataFrame()
 
-    for material, min_qty in MIN_STOCK.items():
-        current_qty = current.get(material, 0)
-        to_order = max(0, min_qty - current_qty)
-        recommendations.append({
-            "material": material,
-            "current_stock": current_qty,
-            "min_stock": min_qty,
-            "to_order": to_order,
-            "priority": "Високий" if to_order > 0 else "OK"
-        })
-
-    df = pd.DataFrame(recommendations)
-    df = df[df["to_order"] > 0]  # Тільки те, що треба замовити
-    df = df.sort_values("to_order", ascending=False)
-    return df
+@cached_loader("stock_targets")
+def get_stock_targets():
+    """Цільові запаси: material, min_stock, max_stock"""
+    return pd.read_sql_query(STOCK_TARGETS_SQL, get_connection(WAREHOUSE_DB))
+
+def save_stock_targets(targets: pd.DataFrame) -> int:
+    """
+    Зберігає повний набір цілей (колонки material, min_stock, max_stock;
+    порожній max_stock = min_stock) однією транзакцією: додає, оновлює і
+    видаляє матеріали, яких у targets немає. Рядок без min_stock лишає ціль
+    матеріалу як була. Порушення CHECK — sqlite3.IntegrityError без змін.
+    Повертає кількість збережених рядків.
+    """
+    materials = targets["material"].dropna().astype(str).tolist()
+    df = targets.dropna(subset=["material", "min_stock"])
+    max_stock = df["max_stock"].fillna(df["min_stock"]) if "max_stock" in df else df["min_stock"]
+    rows = list(zip(
+        df["material"].astype(str),
+        df["min_stock"].astype(int).tolist(),
+        max_stock.astype(int).tolist(),
+    ))
+    conn = get_connection(WAREHOUSE_DB)
+    with conn:
+        conn.execute(DELETE_MISSING_STOCK_TARGETS_SQL, (json.dumps(materials),))
+        conn.executemany(UPSERT_STOCK_TARGET_SQL, rows)
+    invalidate_tables("stock_targets")
+    return len(rows)
 
 # ===================================================================
 # 3. СТВОРЕННЯ ЗАМОВЛЕННЯ
 # ===================================================================
-def create_purchase_order(supplier_id: int, material: str, quantity: int, price_per_unit: float):
+class PurchaseOrderError(ValueError):
+    """Пакет замовлень не пройшов перевірку; errors — по рядках."""
+
+    def __init__(self, errors: List[str]):
+        self.errors = errors
+        super().__init__("; ".join(errors[:MAX_ORDER_ERRORS]))
+
+
+@dataclass
+class BulkOrderResult:
+    created: int
+    total_cost: float
+    duplicates: List[str] = field(default_factory=list)   # ключі, що вже були в базі
+
+
+def validate_purchase_orders(orders: pd.DataFrame) -> pd.DataFrame:
+    """
+    Перевіряє пакет (колонки supplier_id, material, quantity, price_per_unit,
+    необов'язково idempotency_key) і повертає нормалізовану копію.
+    Усі помилки збираються разом — PurchaseOrderError.
+    """
+    missing = [c for c in ORDER_COLUMNS if c not in orders]
+    if missing:
+        raise PurchaseOrderError([f"немає колонок {', '.join(missing)}"])
+
+    df = orders.reset_index(drop=True)
+    keys = df["idempotency_key"] if "idempotency_key" in df else pd.Series(None, index=df.index, dtype=object)
+    df = pd.DataFrame({
+        "supplier_id": pd.to_numeric(df["supplier_id"], errors="coerce"),
+        "material": df["material"].astype("string").str.strip(),
+        "quantity": pd.to_numeric(df["quantity"], errors="coerce"),
+        "price_per_unit": pd.to_numeric(df["price_per_unit"], errors="coerce"),
+        "idempotency_key": keys.astype(object).where(keys.notna(), None),
+    })
+
+    known = {
+        row[0] for row in get_connection(SUPPLIERS_DB).execute(
+            SUPPLIER_IDS_SQL, (json.dumps(df["supplier_id"].dropna().astype(int).unique().tolist()),)
+        )
+    }
+    checks = {
+        "невідомий постачальник": ~df["supplier_id"].isin(known),
+        "порожній матеріал": df["material"].isna() | (df["material"] == ""),
+        "кількість має бути цілим > 0": ~((df["quantity"] > 0) & (df["quantity"] % 1 == 0)),
+        "ціна має бути > 0": ~(df["price_per_unit"] > 0),
+        "ключ повторюється в пакеті": df["idempotency_key"].notna() & df["idempotency_key"].duplicated(keep=False),
+    }
+    bad = pd.DataFrame(checks).to_numpy(dtype=bool)
+    messages = np.array(list(checks))
+    errors = [f"рядок {i + 1}: {', '.join(messages[bad[i]])}" for i in np.flatnonzero(bad.any(axis=1))]
+    if errors:
+        raise PurchaseOrderError(errors)
+
+    df["supplier_id"] = df["supplier_id"].astype(int)
+    df["quantity"] = df["quantity"].astype(int)
+    df["material"] = df["material"].astype(object)
+    return df
+
+
+def create_purchase_orders(orders: pd.DataFrame, lead_days: int = DELIVERY_LEAD_DAYS) -> BulkOrderResult:
     """
-    Додає нове замовлення в таблицю purchase_orders
+    Створює пакет замовлень ('planned') однією транзакцією: перевірка,
+    відсів ключів, що вже є в базі, один executemany, одна інвалідація кешу.
+    Повторний виклик з тими самими idempotency_key нічого не дублює.
     """
-    total_cost = quantity * price_per_unit
+    df = validate_purchase_orders(orders)
     order_date = datetime.now().strftime("%Y-%m-%d")
-    delivery_date = (datetime.now() + timedelta(days=7)).strftime("%Y-%m-%d")
+    delivery_date = (datetime.now() + timedelta(days=lead_days)).strftime("%Y-%m-%d")
+    df["total_cost"] = df["quantity"] * df["price_per_unit"]
 
+    conn = get_connection(SUPPLIERS_DB)
+    # IMMEDIATE: паралельний пакет з тими самими ключами чекає на цей
+    conn.execute("BEGIN IMMEDIATE")
     try:
-        conn = sqlite3.connect(SUPPLIERS_DB)
-        conn.execute("""
-            INSERT INTO purchase_orders 
-            (supplier_id, material, quantity, price_per_unit, total_cost, status, order_date, delivery_date)
-            VALUES (?, ?, ?, ?, ?, 'planned', ?, ?)
-        """, (supplier_id, material, quantity, price_per_unit, total_cost, order_date, delivery_date))
+        keys = df["idempotency_key"].dropna().tolist()
+        existing = {
+            row[0] for row in conn.execute(EXISTING_KEYS_SQL, (json.dumps(keys),))
+        } if keys else set()
+        new = df[~df["idempotency_key"].isin(existing)] if existing else df
+        conn.executemany(INSERT_ORDER_SQL, (
+            (supplier_id, material, quantity, price, total, order_date, delivery_date, key)
+            for supplier_id, material, quantity, price, key, total in new.itertuples(index=False, name=None)
+        ))
         conn.commit()
-        conn.close()
-        st.success(f"Замовлення на {quantity} од. {material} створено!")
-        st.cache_data.clear()  # Оновлюємо кеш
+    except Exception:
+        conn.rollback()
+        raise
+
+    if len(new):
+        invalidate_tables("purchase_orders")
+    return BulkOrderResult(
+        created=len(new),
+        total_cost=float(new["total_cost"].sum()),
+        duplicates=sorted(existing),
+    )
+
+
+def create_purchase_order(
+    supplier_id: int, material: str, quantity: int, price_per_unit: float,
+    idempotency_key: Optional[str] = None,
+) -> bool:
+    """
+    Додає одне замовлення через create_purchase_orders (та сама перевірка
+    і ключ ідемпотентності, що й для пакета). True — замовлення є в базі.
+    """
+    try:
+        result = create_purchase_orders(pd.DataFrame([{
+            "supplier_id": supplier_id,
+            "material": material,
+            "quantity": quantity,
+            "price_per_unit": price_per_unit,
+            "idempotency_key": idempotency_key,
+        }]))
+    except PurchaseOrderError as e:
+        st.error("Замовлення не створено: " + "; ".join(e.errors))
+        return False
     except Exception as e:
         st.error(f"Помилка створення замовлення: {e}")
+        return False
+    if result.duplicates:
+        st.info("Це замовлення вже створено")
+    else:
+        st.success(f"Замовлення на {quantity} од. {material} створено!")
+    return True
+
+
+@cached_loader("inventory", "purchase_orders")
+def last_purchase_prices() -> Dict[str, float]:
+    """Матеріал → ціна останнього замовлення (якщо замовлень не було — останньої партії складу)."""
+    conn = get_attached_connection()
+    prices = dict(conn.execute(LAST_BATCH_PRICES_SQL).fetchall())
+    prices.update(conn.execute(LAST_ORDER_PRICES_SQL).fetchall())
+    return prices
+
+
+def orders_from_recommendations(recommendations: pd.DataFrame, supplier_id: int) -> pd.DataFrame:
+    """
+    Пакет замовлень з recommend_procurement: кількість to_order, ціна —
+    last_purchase_prices, а для матеріалу без історії закупівель —
+    FALLBACK_PRICE_PER_UNIT (price_source = 'типова', її варто перевірити).
+    Ключ — дата + матеріал + кількість, тож повторне натискання того ж дня
+    не створює дублікатів. Результат кешується за вмістом recommendations.
+    """
+    return _orders_batch(recommendations, supplier_id, datetime.now().strftime("%Y-%m-%d"))
+
+
+@cached_loader("inventory", "purchase_orders")
+def _orders_batch(recommendations: pd.DataFrame, supplier_id: int, today: str) -> pd.DataFrame:
+    prices = last_purchase_prices()
+    price = recommendations["material"].map(prices)
+    return pd.DataFrame({
+        "supplier_id": supplier_id,
+        "material": recommendations["material"].to_numpy(),
+        "quantity": recommendations["to_order"].to_numpy(),
+        "price_per_unit": price.fillna(FALLBACK_PRICE_PER_UNIT).to_numpy(),
+        "price_source": np.where(price.isna(), "типова", "остання закупівля"),
+        "idempotency_key": [
+            f"reorder:{today}:{material}:{qty}"
+            for material, qty in zip(recommendations["material"], recommendations["to_order"])
+        ],
+    })
 
 # ===================================================================
 # 4. АКТИВНІ ЗАМОВЛЕННЯ
 # ===================================================================
-@st.cache_data(ttl=300)
+@cached_loader("purchase_orders", "suppliers", snapshot=True)
 def get_active_orders():
     """Повертає активні замовлення (planned, ordered) з назвою постачальника"""
     try:
-        conn = sqlite3.connect(SUPPLIERS_DB)
-        df = pd.read_sql_query("""
-            SELECT po.*, s.name as supplier_name
-            FROM purchase_orders po
-            JOIN suppliers s ON po.supplier_id = s.id
-            WHERE po.status IN ('planned', 'ordered')
-            ORDER BY po.order_date DESC
-        """, conn)
-        conn.close()
+        conn = get_connection(SUPPLIERS_DB)
+        df = pd.read_sql_query(ACTIVE_ORDERS_SQL, conn)
         return df
     except Exception as e:
         st.error(f"Помилка читання замовлень: {e}")
@@ -0,0 +1,246 @@
+# query_stats.py — ІНСТРУМЕНТАЦІЯ SQL-ЗАПИТІВ
+"""
+Кожне з'єднання з connections.py створюється з фабрикою
+InstrumentedConnection, тож усі запити warehouse, suppliers, procurement,
+finance, clients, database (і pd.read_sql_query поверх них) вимірюються
+без змін у цих модулях.
+
+Для кожного запиту фіксується час виконання разом із вибіркою рядків,
+кількість рядків і функція-викликач (перший кадр стеку з коду проєкту).
+Запити, довші за SLOW_QUERY_MS, пишуться в SLOW_QUERY_LOG.
+query_stats() — перцентилі по кожному запиту, dump_query_stats() — JSON-дамп.
+"""
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+from config.settings import QUERY_STATS_DUMP, QUERY_STATS_SAMPLES, SLOW_QUERY_LOG, SLOW_QUERY_MS
+
+_ROOT = os.path.dirname(os.path.abspath(__file__))
+_SKIP_FILES = {os.path.abspath(__file__), os.path.join(_ROOT, "connections.py")}
+
+_lock = threading.Lock()
+_slow_logger: Optional[logging.Logger] = None
+
+
+@dataclass
+class _QueryStats:
+    sql: str
+    callers: Set[str] = field(default_factory=set)
+    calls: int = 0
+    rows: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    samples: Deque[float] = field(default_factory=lambda: deque(maxlen=QUERY_STATS_SAMPLES))
+
+
+_stats: Dict[str, _QueryStats] = {}
+
+
+def _normalize(sql: str) -> str:
+    return re.sub(r"\s+", " ", sql).strip()
+
+
+def _caller() -> str:
+    """module.function першого кадру з коду проєкту поза інструментацією."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (
+            filename.startswith(_ROOT)
+            and filename not in _SKIP_FILES
+            and "site-packages" not in filename
+        ):
+            name = getattr(frame.f_code, "co_qualname", frame.f_code.co_name)
+            return f"{frame.f_globals.get('__name__', '?')}.{name}"
+        frame = frame.f_back
+    return "?"
+
+
+def _get_slow_logger() -> logging.Logger:
+    global _slow_logger
+    if _slow_logger is None:
+        logger = logging.getLogger("meshgrid.slow_query")
+        if not logger.handlers:
+            os.makedirs(os.path.dirname(SLOW_QUERY_LOG) or ".", exist_ok=True)
+            handler = logging.FileHandler(SLOW_QUERY_LOG, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            logger.addHandler(handler)
+            logger.setLevel(logging.WARNING)
+            logger.propagate = False
+        _slow_logger = logger
+    return _slow_logger
+
+
+def record(sql: str, caller: str, elapsed_ms: float, rows: int) -> None:
+    """Додає один вимір; повільні запити — у журнал."""
+    key = _normalize(sql)
+    with _lock:
+        stats = _stats.get(key)
+        if stats is None:
+            stats = _stats[key] = _QueryStats(key)
+        stats.callers.add(caller)
+        stats.calls += 1
+        stats.rows += rows
+        stats.total_ms += elapsed_ms
+        stats.max_ms = max(stats.max_ms, elapsed_ms)
+        stats.samples.append(elapsed_ms)
+    if elapsed_ms >= SLOW_QUERY_MS:
+        _get_slow_logger().warning(
+            "%.1f ms rows=%d caller=%s sql=%s", elapsed_ms, rows, caller, key
+        )
+
+
+# ===================================================================
+# З'ЄДНАННЯ І КУРСОР
+# ===================================================================
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    Курсор, що міряє execute разом із подальшою вибіркою. Вимір для SELECT
+    закривається, коли рядки вичерпано, курсор закрито чи перевикористано.
+    """
+    _pending: Optional[list] = None  # [sql, caller, elapsed_ms, rows]
+
+    def _finish(self) -> None:
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            record(*pending)
+
+    def _timed(self, method, sql: str, *args):
+        self._finish()
+        caller = _caller()
+        start = time.perf_counter()
+        result = method(sql, *args)
+        elapsed = (time.perf_counter() - start) * 1000
+        if self.description is None:
+            record(sql, caller, elapsed, max(self.rowcount, 0))
+        else:
+            self._pending = [sql, caller, elapsed, 0]
+        return result
+
+    def execute(self, sql, parameters=()):
+        return self._timed(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._timed(super().executemany, sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self._timed(super().executescript, sql_script)
+
+    def _fetched(self, start: float, rows: int, exhausted: bool) -> None:
+        if self._pending is not None:
+            self._pending[2] += (time.perf_counter() - start) * 1000
+            self._pending[3] += rows
+            if exhausted:
+                self._finish()
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(start, row is not None, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(start, len(rows), not rows)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(start, len(rows), True)
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(start, 0, True)
+            raise
+        self._fetched(start, 1, False)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        self._finish()
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection.execute* у CPython оминає cursor(), тому перенаправляємо явно."""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+
+# ===================================================================
+# ЗВІТИ
+# ===================================================================
+def query_stats() -> pd.DataFrame:
+    """Статистика по запитах: виклики, рядки, p50/p95/p99, від найдорожчого."""
+    with _lock:
+        snapshot = [
+            (s.sql, sorted(s.callers), s.calls, s.rows, s.total_ms, s.max_ms, list(s.samples))
+            for s in _stats.values()
+        ]
+    records = []
+    for sql, callers, calls, rows, total_ms, max_ms, samples in snapshot:
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+        records.append({
+            "query": sql,
+            "callers": ", ".join(callers),
+            "calls": calls,
+            "rows": rows,
+            "total_ms": round(total_ms, 2),
+            "p50_ms": round(p50, 2),
+            "p95_ms": round(p95, 2),
+            "p99_ms": round(p99, 2),
+            "max_ms": round(max_ms, 2),
+        })
+    columns = ["query", "callers", "calls", "rows", "total_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"]
+    return pd.DataFrame(records, columns=columns).sort_values("total_ms", ascending=False, ignore_index=True)
+
+
+def dump_query_stats(path: str = QUERY_STATS_DUMP) -> str:
+    """Записує статистику у JSON-файл і повертає шлях."""
+    payload = {
+        "generated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "slow_query_ms": SLOW_QUERY_MS,
+        "queries": query_stats().to_dict(orient="records"),
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def reset_query_stats() -> None:
+    with _lock:
+        _stats.clear()
+
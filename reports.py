@@ -0,0 +1,224 @@
+# reports.py — ФОНОВЕ ФОРМУВАННЯ ЗВІТІВ
+"""
+Багатоаркушеві Excel-звіти (P&L, рух коштів, оцінка складу, активні
+замовлення) будуються у пулі процесів, а не в прогоні Streamlit.
+
+Звіт описано декларативно в REPORTS: аркуш = SQL-запит до однієї з баз.
+Готовий файл лежить у REPORTS_DIR під ключем із версій таблиць звіту
+(table_versions, див. data_cache), тож:
+  - поки дані не змінились, повторний запит — лише перевірка наявності файлу;
+  - один і той самий ключ не будується двічі: активні задачі процесу
+    зберігаються в ReportJobs, а файл з'являється атомарно через os.replace;
+  - після зміни даних ключ інший, старий файл видаляється після побудови нового.
+Робочий процес пише прогрес у <файл>.progress, UI читає його.
+"""
+import glob
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from accounting import PL_MONTHLY_SQL
+from config.settings import DATABASES, REPORT_WORKERS, REPORTS_DIR
+from connections import get_connection
+from data_cache import table_versions
+from finance import CASH_FLOW_SQL, build_cash_flow_summary_query
+from suppliers import ACTIVE_ORDERS_SQL
+from utils.export import EXPORT_CHUNK_ROWS, write_excel
+from warehouse import INVENTORY_SQL
+
+# Змінюється разом зі структурою звітів — старі файли стають недійсними
+REPORT_FORMAT_VERSION = 1
+
+INVENTORY_VALUATION_SQL = """
+    SELECT
+        material,
+        SUM(quantity) AS quantity,
+        SUM(quantity * price_per_unit) AS value,
+        SUM(quantity * price_per_unit) / SUM(quantity) AS avg_price
+    FROM inventory
+    WHERE quantity > 0
+    GROUP BY material
+    ORDER BY value DESC
+"""
+
+ACTIVE_ORDERS_BY_MATERIAL_SQL = """
+    SELECT material, status, COUNT(*) AS orders, SUM(quantity) AS quantity, SUM(total_cost) AS total_cost
+    FROM purchase_orders
+    WHERE status IN ('planned', 'ordered')
+    GROUP BY material, status
+    ORDER BY material, status
+"""
+
+
+@dataclass(frozen=True)
+class ReportSheet:
+    title: str
+    db: str
+    sql: str
+    params: Tuple = ()
+
+
+@dataclass(frozen=True)
+class Report:
+    title: str
+    tables: Tuple[str, ...]
+    sheets: Tuple[ReportSheet, ...]
+
+
+def _summary_sheet(title: str, group_by: str) -> ReportSheet:
+    sql, params = build_cash_flow_summary_query(group_by)
+    return ReportSheet(title, "finance", sql, tuple(params))
+
+
+REPORTS: Dict[str, Report] = {
+    "pl": Report("P&L", ("cash_flow",), (
+        ReportSheet("P&L", "finance", PL_MONTHLY_SQL),
+    )),
+    "cash_flow": Report("Рух коштів", ("cash_flow",), (
+        _summary_sheet("По тижнях", "week"),
+        _summary_sheet("По категоріях", "category"),
+        ReportSheet("Операції", "finance", CASH_FLOW_SQL),
+    )),
+    "inventory_valuation": Report("Оцінка складу", ("inventory",), (
+        ReportSheet("Оцінка", "warehouse", INVENTORY_VALUATION_SQL),
+        ReportSheet("Партії", "warehouse", INVENTORY_SQL),
+    )),
+    "active_orders": Report("Активні замовлення", ("purchase_orders", "suppliers"), (
+        ReportSheet("По матеріалах", "suppliers", ACTIVE_ORDERS_BY_MATERIAL_SQL),
+        ReportSheet("Замовлення", "suppliers", ACTIVE_ORDERS_SQL),
+    )),
+}
+
+
+def report_path(name: str) -> str:
+    """Файл звіту для поточних версій його таблиць."""
+    versions = "-".join(str(v) for v in table_versions(REPORTS[name].tables))
+    return os.path.join(REPORTS_DIR, f"{name}_f{REPORT_FORMAT_VERSION}_v{versions}.xlsx")
+
+
+# ===================================================================
+# ПОБУДОВА (у робочому процесі)
+# ===================================================================
+def _write_progress(path: str, fraction: float, stage: str) -> None:
+    tmp_path = path + ".progress.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"fraction": round(fraction, 4), "stage": stage}, f, ensure_ascii=False)
+    os.replace(tmp_path, path + ".progress")
+
+
+def read_progress(path: str) -> Tuple[float, str]:
+    try:
+        with open(path + ".progress", encoding="utf-8") as f:
+            state = json.load(f)
+        return state["fraction"], state["stage"]
+    except (OSError, ValueError, KeyError):
+        return 0.0, "У черзі"
+
+
+def build_report(name: str, path: str) -> str:
+    """Будує звіт name у path (через тимчасовий файл); повертає path."""
+    report = REPORTS[name]
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    # Частка — за завершеними аркушами, всередині аркуша — лічильник рядків;
+    # без попереднього COUNT(*), що виконав би кожен запит двічі
+    sheets_total = len(report.sheets)
+
+    def chunks(index: int, sheet: ReportSheet) -> Iterator[pd.DataFrame]:
+        conn = get_connection(DATABASES[sheet.db])
+        _write_progress(path, index / sheets_total, sheet.title)
+        rows = 0
+        for chunk in pd.read_sql_query(sheet.sql, conn, params=list(sheet.params), chunksize=EXPORT_CHUNK_ROWS):
+            yield chunk
+            rows += len(chunk)
+            _write_progress(path, index / sheets_total, f"{sheet.title}, {rows:,} рядків")
+        _write_progress(path, (index + 1) / sheets_total, sheet.title)
+
+    # pid у назві: два процеси застосунку можуть будувати той самий ключ
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    write_excel({sheet.title: chunks(i, sheet) for i, sheet in enumerate(report.sheets)}, tmp_path)
+    os.replace(tmp_path, path)
+
+    # Старі версії цього звіту більше не потрібні
+    for stale in glob.glob(os.path.join(REPORTS_DIR, f"{name}_f*.xlsx")):
+        if os.path.abspath(stale) != os.path.abspath(path):
+            os.remove(stale)
+    if os.path.exists(path + ".progress"):
+        os.remove(path + ".progress")
+    return path
+
+
+# ===================================================================
+# ЧЕРГА ЗАДАЧ (у процесі застосунку)
+# ===================================================================
+@dataclass
+class ReportStatus:
+    name: str
+    state: str              # missing | running | done | failed
+    path: str
+    fraction: float = 0.0
+    stage: str = ""
+    error: Optional[str] = None
+
+
+class ReportJobs:
+    """Пул процесів і реєстр задач: один Future на файл звіту."""
+
+    def __init__(self, workers: int = REPORT_WORKERS):
+        self._workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: fork з багатопотокового сервера Streamlit небезпечний
+            self._executor = ProcessPoolExecutor(
+                max_workers=self._workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def request(self, name: str) -> ReportStatus:
+        """Ставить звіт у чергу, якщо його ще немає на диску і він не будується."""
+        path = report_path(name)
+        with self._lock:
+            if not os.path.exists(path):
+                future = self._futures.get(path)
+                if future is None or (future.done() and future.exception() is not None):
+                    try:
+                        self._futures[path] = self._pool().submit(build_report, name, path)
+                    except BrokenProcessPool:
+                        # робочий процес упав (OOM, kill) — пул більше не приймає задач
+                        self._executor = None
+                        self._futures[path] = self._pool().submit(build_report, name, path)
+        return self.status(name, path)
+
+    def status(self, name: str, path: Optional[str] = None) -> ReportStatus:
+        path = path or report_path(name)
+        if os.path.exists(path):
+            return ReportStatus(name, "done", path, 1.0)
+        with self._lock:
+            future = self._futures.get(path)
+        if future is None:
+            return ReportStatus(name, "missing", path)
+        if future.done() and future.exception() is not None:
+            return ReportStatus(name, "failed", path, error=str(future.exception()))
+        fraction, stage = read_progress(path)
+        return ReportStatus(name, "running", path, fraction, stage)
+
+    def running(self) -> List[str]:
+        with self._lock:
+            return [path for path, future in self._futures.items() if not future.done()]
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
@@ -0,0 +1,89 @@
+# snapshots.py — СПІЛЬНІ НЕЗМІННІ ЗНІМКИ ДАНИХ
+"""
+st.cache_data віддає кожній сесії власну розпаковану копію DataFrame,
+тож пам'ять росте разом із кількістю користувачів. Для основних наборів
+(склад, рух коштів, замовлення, клієнти) результат публікується один раз
+на процес як Snapshot: кожна колонка — окремий NumPy-масив із
+writeable=False. Сесії отримують view() — поверхневу копію, що ділить
+ці буфери. Додавати колонки у view можна (це не зачіпає знімок),
+змінювати значення на місці — ні: pandas піднімає ValueError
+(як і memory_usage(deep=True) — розмір знімка див. у snapshot_stats()).
+"""
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass(frozen=True, eq=False)
+class Snapshot:
+    name: str
+    versions: Tuple[int, ...]
+    frame: pd.DataFrame
+    nbytes: int
+    created: float
+
+    def view(self) -> pd.DataFrame:
+        """Поверхнева копія без копіювання даних."""
+        return self.frame.copy(deep=False)
+
+
+_lock = threading.Lock()
+_alive: "weakref.WeakSet[Snapshot]" = weakref.WeakSet()
+
+
+def freeze_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    DataFrame, де кожна NumPy-колонка — власний масив лише для читання.
+    Колонки з extension-типами pandas копіюються як є.
+    """
+    if not df.columns.is_unique:
+        return df.copy()
+    columns = {}
+    for name, series in df.items():
+        if isinstance(series.dtype, np.dtype):
+            values = np.array(series.to_numpy(), copy=True)
+            values.flags.writeable = False
+            columns[name] = values
+        else:
+            columns[name] = series.array.copy()
+    # copy=False: без консолідації в 2D-блоки, масиви лишаються спільними
+    return pd.DataFrame(columns, index=df.index.copy(), copy=False)
+
+
+def publish(name: str, versions: Tuple[int, ...], df: pd.DataFrame) -> Snapshot:
+    """Заморожує df і реєструє знімок для звіту про пам'ять."""
+    # deep memory_usage не читає object-масиви лише для читання — міряємо до заморозки
+    nbytes = int(df.memory_usage(index=True, deep=True).sum())
+    snapshot = Snapshot(
+        name=name,
+        versions=tuple(versions),
+        frame=freeze_frame(df),
+        nbytes=nbytes,
+        created=time.time(),
+    )
+    with _lock:
+        _alive.add(snapshot)
+    return snapshot
+
+
+def snapshot_stats() -> pd.DataFrame:
+    """Живі знімки процесу: набір, версії, рядки, пам'ять (МБ), вік (с)."""
+    now = time.time()
+    with _lock:
+        snapshots = list(_alive)
+    records = [
+        {
+            "name": s.name,
+            "versions": str(s.versions),
+            "rows": len(s.frame),
+            "memory_mb": round(s.nbytes / 1024 ** 2, 3),
+            "age_s": round(now - s.created, 1),
+        }
+        for s in sorted(snapshots, key=lambda s: (s.name, s.created))
+    ]
+    return pd.DataFrame(records, columns=["name", "versions", "rows", "memory_mb", "age_s"])
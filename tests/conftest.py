@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Порожні бази в тимчасовому каталозі (модулі працюють з відносними data/*.db)."""
+    import connections
+
+    monkeypatch.chdir(tmp_path)
+    yield tmp_path
+    connections.close_all()
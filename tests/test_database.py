@@ -0,0 +1,66 @@
+import pytest
+
+from connections import get_connection
+from database import DB_HIST, HISTORY_COLUMNS, HistoryWriter, build_history_query, init_db
+
+
+def _calc(**overrides):
+    calc = {col: 1.0 for col in HISTORY_COLUMNS}
+    calc.update(timestamp="2025-01-01 10:00:00", material="ПВХ")
+    calc.update(overrides)
+    return calc
+
+
+def test_history_writer_rejects_incomplete_record(data_dir):
+    init_db()
+    writer = HistoryWriter(flush_interval=60)
+
+    with pytest.raises(ValueError):
+        writer.add({k: v for k, v in _calc().items() if k != "timestamp"})
+    writer.add(_calc())
+    writer.close()
+
+    assert get_connection(DB_HIST).execute("SELECT COUNT(*) FROM history").fetchone() == (1,)
+
+
+def test_history_flush_drops_only_failing_rows(data_dir):
+    init_db()
+    writer = HistoryWriter(flush_interval=60)
+    writer.add(_calc(material="A"))
+    # в обхід перевірки add(): рядок, що порушує NOT NULL, не має блокувати решту
+    writer._buffer.append(tuple(None if col == "material" else 1.0 for col in HISTORY_COLUMNS))
+    writer.add(_calc(material="B"))
+
+    assert writer.flush() == 2
+    assert writer.stats()["queue_depth"] == 0
+    writer.add(_calc(material="C"))
+    writer.close()
+
+    rows = get_connection(DB_HIST).execute("SELECT material FROM history ORDER BY id").fetchall()
+    assert rows == [("A",), ("B",), ("C",)]
+
+
+def test_history_keyset_pages_have_no_gaps_or_duplicates(data_dir):
+    init_db()
+    writer = HistoryWriter(flush_interval=60)
+    # по 3 записи на кожну секунду: межі сторінок падають усередину однакових timestamp
+    for i in range(20):
+        writer.add(_calc(timestamp=f"2025-01-0{1 + i % 2} 10:00:0{i // 3}", cell_size=float(i)))
+    writer.add(_calc(timestamp="2025-01-03 09:00:00"))  # поза date_to
+    writer.close()
+
+    conn = get_connection(DB_HIST)
+    seen, cursor = [], None
+    while True:
+        sql, params = build_history_query(date_to="2025-01-02", cursor=cursor, limit=4)
+        page = conn.execute(sql, params).fetchall()
+        seen.extend((row[1], row[0]) for row in page)
+        if len(page) < 4:
+            break
+        cursor = (page[-1][1], page[-1][0])
+
+    expected = conn.execute(
+        "SELECT timestamp, id FROM history WHERE timestamp < '2025-01-03' ORDER BY timestamp DESC, id DESC"
+    ).fetchall()
+    assert len(expected) == 20
+    assert seen == expected
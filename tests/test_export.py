@@ -0,0 +1,54 @@
+import sqlite3
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from utils.export import NUMBER_FORMAT, export_sql_to_excel, write_excel
+from utils.reports_finance import export_pl_to_excel
+
+
+def _rows(worksheet):
+    return [list(row) for row in worksheet.iter_rows(values_only=True)]
+
+
+def test_rows_over_limit_continue_on_numbered_sheets():
+    df = pd.DataFrame({"id": range(7), "amount": [i + 0.5 for i in range(7)]})
+    # ліміт 4 рядки разом із заголовком — по 3 рядки даних на аркуш
+    chunks = (df.iloc[i:i + 2] for i in range(0, len(df), 2))
+    workbook = load_workbook(write_excel({"Дані": chunks}, max_rows=4))
+
+    assert workbook.sheetnames == ["Дані", "Дані (2)", "Дані (3)"]
+    sheets = [_rows(workbook[name]) for name in workbook.sheetnames]
+    assert all(rows[0] == ["id", "amount"] for rows in sheets)
+    assert [row[0] for rows in sheets for row in rows[1:]] == list(range(7))
+    assert [len(rows) - 1 for rows in sheets] == [3, 3, 1]
+
+
+def test_float_columns_get_number_format():
+    df = pd.DataFrame({"name": ["a", "b"], "qty": [1, 2], "price": [1.25, None]})
+    worksheet = load_workbook(write_excel({"Аркуш": df}))["Аркуш"]
+
+    assert worksheet["C2"].value == 1.25
+    assert worksheet["C2"].number_format == NUMBER_FORMAT
+    assert worksheet["C3"].value is None
+    assert worksheet["B2"].number_format == "General"
+    assert worksheet["A2"].number_format == "General"
+
+
+def test_export_sql_to_excel_streams_query_result():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE t (id INTEGER, amount REAL)")
+    conn.executemany("INSERT INTO t VALUES (?, ?)", [(i, i * 1.5) for i in range(10)])
+
+    output = export_sql_to_excel(conn, "SELECT * FROM t WHERE id >= ?", "Запит", params=(4,), chunk_rows=3)
+    rows = _rows(load_workbook(output)["Запит"])
+
+    assert rows == [["id", "amount"]] + [[i, i * 1.5] for i in range(4, 10)]
+
+
+def test_pl_export_formats_amounts():
+    pl = pd.DataFrame({"month": ["2025-01"], "income": [100], "expense": [40], "profit": [60]})
+    worksheet = load_workbook(export_pl_to_excel(pl))["P&L Звіт"]
+
+    assert _rows(worksheet) == [["month", "income", "expense", "profit"], ["2025-01", 100, 40, 60]]
+    assert all(worksheet.cell(2, col).number_format == "#,##0.00" for col in (2, 3, 4))
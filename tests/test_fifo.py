@@ -0,0 +1,57 @@
+import pandas as pd
+import pytest
+
+from connections import get_connection
+from fifo import FifoError, allocate_fifo, issue_fifo
+from migrations import migrate
+
+
+def _batches(rows):
+    return pd.DataFrame(rows, columns=["id", "batch_id", "material", "quantity", "price_per_unit"])
+
+
+def test_issue_spans_batches_in_order():
+    batches = _batches([
+        (1, "A1", "ПВХ", 10, 5.0),
+        (2, "B1", "Чорний", 4, 7.0),
+        (3, "A2", "ПВХ", 10, 6.0),
+    ])
+    issues = pd.DataFrame({"material": ["ПВХ", "Чорний", "ПВХ"], "quantity": [4, 5, 12]})
+
+    result = allocate_fifo(batches, issues)
+
+    assert result.issues["cost"].tolist() == [20.0, 28.0, 6 * 5.0 + 6 * 6.0]
+    assert result.issues["shortfall"].tolist() == [0, 1, 0]
+    assert result.allocations[["issue", "id", "quantity"]].values.tolist() == [[0, 1, 4], [2, 1, 6], [2, 3, 6], [1, 2, 4]]
+    assert dict(zip(result.consumed["id"], result.consumed["remaining"])) == {1: 0, 2: 0, 3: 4}
+
+
+def test_rejects_non_positive_quantity():
+    with pytest.raises(FifoError):
+        allocate_fifo(_batches([]), pd.DataFrame({"material": ["ПВХ"], "quantity": [0]}))
+    with pytest.raises(FifoError):
+        allocate_fifo(_batches([(1, "A1", "ПВХ", 10, 5.0)]), pd.DataFrame({"material": ["ПВХ"], "quantity": [1.5]}))
+
+
+def test_issue_fifo_writes_back_and_posts_ledger(data_dir):
+    migrate("warehouse")
+    conn = get_connection("data/warehouse.db")
+    with conn:
+        conn.executemany(
+            "INSERT INTO inventory (batch_id, material, quantity, price_per_unit, total_cost, arrival_date) "
+            "VALUES (?, 'Мідний', ?, ?, 0, ?)",
+            [("M2", 5, 9.0, "2025-02-01"), ("M1", 5, 8.0, "2025-01-01")],
+        )
+
+    with pytest.raises(FifoError):
+        issue_fifo(pd.DataFrame({"material": ["Мідний"], "quantity": [11]}))
+    result = issue_fifo(pd.DataFrame({"material": ["Мідний"], "quantity": [7]}))
+
+    assert result.total_cost == 5 * 8.0 + 2 * 9.0
+    assert conn.execute(
+        "SELECT batch_id, quantity FROM inventory WHERE material = 'Мідний' ORDER BY batch_id"
+    ).fetchall() == [("M1", 0), ("M2", 3)]
+    assert conn.execute("SELECT quantity FROM stock_balance WHERE material = 'Мідний'").fetchone() == (3,)
+    assert conn.execute(
+        "SELECT SUM(quantity) FROM stock_movements WHERE material = 'Мідний' AND kind = 'issue'"
+    ).fetchone() == (-7,)
@@ -1 +1,24 @@
+from datetime import date
 
+from connections import get_connection
+from finance import DB_PATH, build_cash_flow_query, build_cash_flow_summary_query
+from migrations import migrate
+
+
+def test_date_to_includes_timestamped_rows_on_last_day(data_dir):
+    migrate("finance", DB_PATH)
+    conn = get_connection(DB_PATH)
+    with conn:
+        conn.execute("DELETE FROM cash_flow")
+        conn.executemany(
+            "INSERT INTO cash_flow (type, category, amount, date) VALUES (?, 'Продажі', ?, ?)",
+            [("income", 10.0, "2025-01-30"), ("income", 20.0, "2025-01-31 18:30:00"),
+             ("income", 40.0, "2025-02-01")],
+        )
+
+    for date_to in ("2025-01-31", date(2025, 1, 31)):
+        sql, params = build_cash_flow_query(date_from="2025-01-01", date_to=date_to)
+        assert [row[3] for row in conn.execute(sql, params)] == [20.0, 10.0]
+
+    sql, params = build_cash_flow_summary_query("category", date_from="2025-01-01", date_to="2025-01-31")
+    assert conn.execute(sql, params).fetchall()[0][1:3] == (30.0, 0)
@@ -0,0 +1,73 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from connections import get_connection
+from ingest import IngestError, import_file
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEADER = "batch_id,material,quantity,price_per_unit,arrival_date\n"
+
+
+def _csv(tmp_path, body, header=HEADER):
+    path = tmp_path / "batches.csv"
+    path.write_text(header + body, encoding="utf-8")
+    return str(path)
+
+
+def test_malformed_rows_are_rejected_not_fatal(data_dir):
+    path = _csv(data_dir, (
+        "N1,ПВХ,10,5.0,2025-01-02\n"
+        "N2,ПВХ,1.5,5.0,2025-01-02\n"      # дробова кількість
+        "N3,ПВХ,abc,5.0,2025-01-02\n"      # не число
+        "N4,ПВХ,3,5.0,не-дата\n"
+        "N5,Чорний,4,2.5,\n"
+    ))
+
+    report = import_file(path, "inventory", chunk_rows=2)
+
+    assert (report.rows_read, report.rows_inserted, report.rows_rejected) == (5, 2, 3)
+    assert [e.split(":")[0] for e in report.errors] == ["рядок 2", "рядок 3", "рядок 4"]
+    assert "quantity" in report.errors[0] and "arrival_date" in report.errors[2]
+    conn = get_connection("data/warehouse.db")
+    assert conn.execute(
+        "SELECT batch_id, quantity, total_cost FROM inventory WHERE batch_id LIKE 'N%' ORDER BY batch_id"
+    ).fetchall() == [("N1", 10, 50.0), ("N5", 4, 10.0)]
+    # прихід проведено в журнал і залишок
+    assert conn.execute(
+        "SELECT COUNT(*) FROM stock_movements WHERE inventory_id IN "
+        "(SELECT id FROM inventory WHERE batch_id LIKE 'N%')"
+    ).fetchone() == (2,)
+
+
+def test_unknown_column_rejects_file(data_dir):
+    path = _csv(data_dir, "N1,ПВХ,10,5.0,2025-01-02,x\n", header=HEADER.rstrip("\n") + ",colour\n")
+    with pytest.raises(IngestError):
+        import_file(path, "inventory")
+
+
+def test_killed_import_keeps_ledger_consistent(data_dir):
+    # процес гине посеред імпорту (os._exit — без finally), після кількох commit
+    path = _csv(data_dir, "".join(f"F{i},Мідний,{i + 1},2.0,2025-03-01\n" for i in range(6)))
+    script = (
+        "import os, ingest\n"
+        "validate, calls = ingest.validate_chunk, []\n"
+        "def killing(*a, **k):\n"
+        "    calls.append(1)\n"
+        "    if len(calls) == 3:\n"
+        "        os._exit(1)\n"
+        "    return validate(*a, **k)\n"
+        "ingest.validate_chunk = killing\n"
+        f"ingest.import_file({path!r}, 'inventory', chunk_rows=2, commit_rows=2)\n"
+    )
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    assert subprocess.run([sys.executable, "-c", script], cwd=data_dir, env=env).returncode == 1
+
+    conn = get_connection("data/warehouse.db")
+    # зафіксовані шматки проведені в журнал, тригери на місці
+    assert conn.execute("SELECT SUM(quantity) FROM inventory WHERE batch_id LIKE 'F%'").fetchone() == (1 + 2 + 3 + 4,)
+    assert conn.execute("SELECT quantity FROM stock_balance WHERE material = 'Мідний'").fetchone() == (10,)
+    triggers = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    assert {"trg_inventory_insert_ledger", "trg_inventory_insert_version"} <= triggers
@@ -1 +1,101 @@
+import math
 
+import numpy as np
+import pandas as pd
+import pytest
+
+from config.settings import CO2_PER_LITER, FUEL_CONSUMPTION, TRUCK_CAPACITY
+from logistics import calculate_logistics_batch, calculate_optimized_logistics, logistics_results
+
+
+def _scalar_reference(distance_km, weight_kg, roll_count):
+    # попередня поштучна формула — пакетний розрахунок має збігатися з нею
+    trips = math.ceil(weight_kg / TRUCK_CAPACITY)
+    fuel_liters = distance_km * FUEL_CONSUMPTION * trips
+    fuel_cost = fuel_liters * 55.0
+    packaging_cost = roll_count * 5.0
+    driver_cost = trips * 500.0
+    efficiency = round(weight_kg / (TRUCK_CAPACITY * trips) * 100, 1)
+    return (trips, fuel_cost, packaging_cost, driver_cost, fuel_cost + packaging_cost + driver_cost,
+            fuel_liters * CO2_PER_LITER, efficiency)
+
+
+def test_batch_matches_scalar_formula():
+    rng = np.random.default_rng(0)
+    distance = rng.integers(1, 1500, 20_000)
+    weight = np.round(rng.uniform(1, 5 * TRUCK_CAPACITY, 20_000), 1)
+    rolls = rng.integers(0, 300, 20_000)
+
+    results = logistics_results(calculate_logistics_batch(distance, weight, rolls))
+
+    for i in range(len(results)):
+        expected = _scalar_reference(int(distance[i]), float(weight[i]), int(rolls[i]))
+        got = results[i]
+        assert (got.trips, got.fuel_cost, got.packaging_cost, got.driver_cost, got.total_cost,
+                got.co2, got.route_efficiency) == expected
+        if i % 10 == 0:
+            assert calculate_optimized_logistics(int(distance[i]), float(weight[i]), int(rolls[i])) == got
+
+
+def test_zero_weight_trips():
+    # рулони без ваги все одно їдуть одним рейсом; порожнє відвантаження — без рейсів
+    result = calculate_optimized_logistics(100, 0, 10)
+    assert (result.trips, result.driver_cost, result.route_efficiency) == (1, 500.0, 0.0)
+    assert calculate_optimized_logistics(100, 0, 0).trips == 0
+    assert calculate_logistics_batch([100, 100], [0, 0], [10, 0])["trips"].tolist() == [1, 0]
+
+
+def test_rejects_negative_weight():
+    with pytest.raises(ValueError):
+        calculate_logistics_batch([100, 200], [10.0, -1.0], [1, 1])
+
+
+def test_consolidation_respects_limits_and_saves_trips():
+    from config.settings import TRUCK_MAX_ROLLS
+    from logistics import plan_consolidation
+
+    rng = np.random.default_rng(1)
+    n = 2_000
+    orders = pd.DataFrame({
+        "route": rng.choice(["Київ", "Львів", "Одеса"], n),
+        "distance_km": rng.integers(50, 800, n),
+        "weight_kg": np.round(rng.uniform(100, 1.5 * TRUCK_CAPACITY, n), 1),
+        "roll_count": rng.integers(1, 300, n),
+    })
+
+    plan = plan_consolidation(orders)
+
+    assert (plan.trucks["weight_kg"] <= TRUCK_CAPACITY + 1e-6).all()
+    assert (plan.trucks["roll_count"] <= TRUCK_MAX_ROLLS).all()
+    assert (plan.trucks["trips"] == 1).all()
+    # кожне замовлення розвезене повністю, вантажівка не змішує напрямки
+    delivered = plan.loads.groupby("order")[["weight_kg", "roll_count"]].sum()
+    assert np.allclose(delivered.loc[orders.index].to_numpy(), orders[["weight_kg", "roll_count"]].to_numpy())
+    truck_route = plan.trucks.set_index("truck")["route"]
+    assert (truck_route[plan.loads["truck"]].to_numpy() == orders["route"][plan.loads["order"]].to_numpy()).all()
+    assert plan.trips_saved == plan.per_order_trips - len(plan.trucks) > 0
+    assert plan.trips <= plan_consolidation(orders, improve=False).trips
+
+
+def test_consolidation_baseline_uses_roll_limit():
+    from logistics import plan_consolidation
+
+    # одне замовлення на 3 вантажівки за рулонами — економії немає, а не «мінус 2 рейси»
+    orders = pd.DataFrame({"distance_km": [100], "weight_kg": [1000.0], "roll_count": [900]})
+    plan = plan_consolidation(orders, max_rolls=400)
+
+    assert plan.per_order_trips == plan.trips == 3
+    assert plan.trips_saved == 0
+    assert plan.cost_saved == pytest.approx(0.0)
+
+
+def test_consolidation_counts_trip_for_rolls_only_order():
+    from logistics import plan_consolidation
+
+    orders = pd.DataFrame({"route": ["A", "B"], "distance_km": [100, 200],
+                           "weight_kg": [0.0, 5000.0], "roll_count": [20, 10]})
+    plan = plan_consolidation(orders)
+
+    assert plan.trucks["trips"].tolist() == [1, 1]
+    assert plan.per_order["trips"].tolist() == [1, 1]
+    assert plan.trips_saved == 0
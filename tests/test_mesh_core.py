@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from mesh_core import (
+    InvalidParameterError, _round_like_python, calculate_warehouse_cost_batch, compute_warehouse_cost,
+)
+
+RESULT_KEYS = ["вага_1м2", "довжина_1м2", "площа", "загальна_вага", "ціна_за_кг", "собівартість"]
+
+
+def test_batch_matches_scalar_on_random_grid():
+    rng = np.random.default_rng(7)
+    n = 3_000
+    params = pd.DataFrame({
+        "cell_size_mm": rng.choice([10, 15, 20, 25, 35, 50, 60.5], n).astype(float),
+        "wire_thickness_mm": rng.choice([1.2, 1.5, 1.8, 2.0, 2.5, 3.0], n),
+        "roll_length_m": np.round(rng.uniform(1, 50, n), 1),
+        "roll_height_m": rng.choice([1.0, 1.2, 1.5, 1.8, 2.0], n),
+        "material": rng.choice(["Оцинкований", "Чорний", "Мідний", "ПВХ", "Невідомий"], n),
+        "custom_price_per_kg": rng.choice([0.0, 0.0, 63.3, 112.5], n),
+    })
+
+    batch = calculate_warehouse_cost_batch(params)
+
+    assert batch["valid"].all()
+    for row, got in zip(params.itertuples(index=False), batch.itertuples(index=False)):
+        # скалярний шлях отримує звичайні float: np.float64 округлюється інакше
+        results, _ = compute_warehouse_cost(
+            float(row.cell_size_mm), float(row.wire_thickness_mm), float(row.roll_length_m),
+            float(row.roll_height_m), str(row.material), float(row.custom_price_per_kg) or None,
+        )
+        assert [getattr(got, key) for key in RESULT_KEYS] == [results[key] for key in RESULT_KEYS]
+
+
+def test_round_like_python_on_half_way_values():
+    for ndigits in (1, 2, 4):
+        # значення виду x.xx5 — саме тут np.round і round() розходяться
+        values = (np.arange(0, 20_000) + 0.5) * 10.0 ** -ndigits
+        expected = [round(v, ndigits) for v in values.tolist()]
+        assert (np.round(values, ndigits) != expected).any()
+        assert _round_like_python(values, ndigits).tolist() == expected
+
+
+def test_invalid_rows_are_flagged_not_raised():
+    batch = calculate_warehouse_cost_batch(
+        cell_size_mm=[25.0, 0.0], wire_thickness_mm=1.8, roll_length_m=10.0, roll_height_m=1.5, material="ПВХ",
+    )
+    assert batch["valid"].tolist() == [True, False]
+    assert np.isnan(batch["собівартість"].iloc[1])
+    with pytest.raises(InvalidParameterError):
+        compute_warehouse_cost(0.0, 1.8, 10.0, 1.5, "ПВХ")
@@ -0,0 +1,25 @@
+from connections import get_connection
+from migrations import migrate
+
+ORDERS_SQL = "SELECT supplier_id, material, quantity, order_date FROM purchase_orders ORDER BY id"
+
+
+def test_identical_user_orders_survive_migrations(data_dir):
+    migrate("suppliers")
+    conn = get_connection("data/suppliers.db")
+    seeded = conn.execute(ORDERS_SQL).fetchall()
+    assert len(seeded) == 2
+    order = (1, "Оцинкований", 100, 75.0, 7500.0, "planned", "2025-10-03", "2025-10-10")
+    with conn:
+        # два однакові замовлення користувача, що збігаються з прикладом у всьому, крім дат
+        conn.executemany(
+            "INSERT INTO purchase_orders (supplier_id, material, quantity, price_per_unit, total_cost, "
+            "status, order_date, delivery_date) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [order, order],
+        )
+        conn.execute("PRAGMA user_version = 0")
+
+    # повторний прогін усіх міграцій: приклади не додаються до непорожньої таблиці, нічого не видаляється
+    migrate("suppliers")
+
+    assert conn.execute(ORDERS_SQL).fetchall() == seeded + [(1, "Оцинкований", 100, "2025-10-03")] * 2
@@ -0,0 +1,31 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from migrations import migrate
+from procurement import get_stock_targets, save_stock_targets
+
+
+def _targets(rows):
+    return pd.DataFrame(rows, columns=["material", "min_stock", "max_stock"])
+
+
+def test_save_stock_targets_replaces_full_set(data_dir):
+    migrate("warehouse")
+    save_stock_targets(_targets([("ПВХ", 10, 50), ("Чорний", 5, None), ("Мідний", 1, 2)]))
+
+    # Мідний видалено в редакторі, у Чорного порожній min_stock — лишається як був
+    save_stock_targets(_targets([("ПВХ", 20, 60), ("Чорний", None, None)]))
+
+    assert get_stock_targets().values.tolist() == [["ПВХ", 20, 60], ["Чорний", 5, 5]]
+
+
+def test_save_stock_targets_check_violation_changes_nothing(data_dir):
+    migrate("warehouse")
+    save_stock_targets(_targets([("ПВХ", 10, 50)]))
+
+    with pytest.raises(sqlite3.IntegrityError):
+        save_stock_targets(_targets([("Чорний", 30, 10)]))
+
+    assert get_stock_targets().values.tolist() == [["ПВХ", 10, 50]]
@@ -0,0 +1,175 @@
+# Регресійна перевірка планів: жоден запит data-модулів не має
+# читати таблицю повним скануванням, якщо це не дозволено явно нижче.
+import re
+import sqlite3
+
+import pytest
+
+import accounting
+import clients
+import crossdomain
+import database
+import fifo
+import finance
+import ingest
+import migrations
+import procurement
+import reports
+import suppliers
+import warehouse
+from config.settings import DATABASES
+from connections import get_attached_connection, get_connection
+from migrations import INDEXES, migrate_all, sync_indexes
+
+MODULES = [
+    accounting, warehouse, clients, suppliers, finance, procurement, crossdomain, database, fifo, reports,
+    migrations, ingest,
+]
+
+# Запити, що за змістом читають усю таблицю (списки для UI, агрегати по всіх рядках);
+# сюди ж — повний прохід у порядку індексу ("SCAN t USING INDEX ...")
+FULL_SCAN_ALLOWED = {
+    "warehouse.INVENTORY_SQL": "усі партії з quantity > 0",
+    "clients.CLIENTS_SQL": "довідник клієнтів",
+    "suppliers.SUPPLIERS_SQL": "довідник постачальників",
+    "suppliers.PURCHASE_ORDERS_SQL": "усі замовлення за id",
+    "database.CLIENTS_LIST_SQL": "довідник клієнтів",
+    "database.SUPPLIERS_LIST_SQL": "довідник постачальників",
+    "database.HISTORY_RECENT_SQL": "останні N за rowid (LIMIT)",
+    "accounting.PL_MONTHLY_SQL": "згортка — один рядок на місяць",
+    "procurement.REORDER_SQL": "усі цільові запаси (склад і замовлення — за індексами)",
+    "procurement.STOCK_TARGETS_SQL": "довідник цільових запасів",
+    "procurement.DELETE_MISSING_STOCK_TARGETS_SQL": "звірка довідника цільових запасів з редактором",
+    "procurement.CURRENT_STOCK_SQL": "stock_balance — рядок на матеріал",
+    "crossdomain.STOCK_POSITION_SQL": "stock_balance — рядок на матеріал",
+    "finance.CASH_FLOW_SQL": "експорт усієї історії руху коштів",
+    "procurement.LAST_BATCH_PRICES_SQL": "остання ціна кожного матеріалу — прохід покриваючого індексу",
+    "procurement.LAST_ORDER_PRICES_SQL": "остання ціна кожного матеріалу — прохід покриваючого індексу",
+    "reports.INVENTORY_VALUATION_SQL": "оцінка всього складу",
+    "reports.REPORTS[cash_flow].По тижнях": "звіт за всю історію",
+    "reports.REPORTS[cash_flow].По категоріях": "звіт за всю історію",
+    "migrations.REBUILD_PL_MONTHLY_SQL": "повний перерахунок згортки",
+    "database.build_history_query[0]": "без фільтрів — перші N у порядку індексу timestamp (LIMIT)",
+}
+
+HISTORY_VARIANTS = [
+    {},
+    {"material": "ПВХ"},
+    {"cell_size": 25},
+    {"date_from": "2025-01-01", "date_to": "2025-12-31"},
+    {"material": "ПВХ", "date_from": "2025-01-01", "cursor": ("2025-06-01 00:00:00", 10)},
+    {"cell_size": 25, "cursor": ("2025-06-01 00:00:00", 10)},
+]
+
+CASH_FLOW_VARIANTS = [
+    {"date_from": "2025-01-01", "date_to": "2025-01-31"},
+    {"type_": "expense", "date_from": "2025-01-01"},
+    {"category": "Матеріали", "date_from": "2025-01-01"},
+    {"date_from": "2025-01-01", "cursor": ("2025-06-01", 10)},
+    {"type_": "income", "cursor": ("2025-06-01", 10)},
+]
+
+CASH_FLOW_SUMMARY_VARIANTS = [
+    {"group_by": "day", "date_from": "2025-01-01", "date_to": "2025-03-31"},
+    {"group_by": "week", "date_from": "2025-01-01"},
+    {"group_by": "category", "type_": "expense", "date_from": "2025-01-01"},
+]
+
+SQL_KEYWORDS = {"where", "join", "left", "inner", "on", "group", "order", "limit", "union", "as"}
+
+
+def _collect_queries():
+    seen = set()
+    for module in MODULES:
+        for name, value in sorted(vars(module).items()):
+            if not (name.endswith("_SQL") and isinstance(value, str)) or value in seen:
+                continue
+            seen.add(value)
+            if "{table}" in value:
+                # шаблон імпорту — для кожної таблиці ingest.TABLES
+                for table in ingest.TABLES:
+                    yield f"{module.__name__}.{name}[{table}]", value.format(table=table)
+            else:
+                yield f"{module.__name__}.{name}", value
+    for report_name, report in reports.REPORTS.items():
+        for sheet in report.sheets:
+            if sheet.sql not in seen:
+                seen.add(sheet.sql)
+                yield f"reports.REPORTS[{report_name}].{sheet.title}", sheet.sql
+    for i, kwargs in enumerate(HISTORY_VARIANTS):
+        sql, _ = database.build_history_query(**kwargs)
+        yield f"database.build_history_query[{i}]", sql
+    for i, kwargs in enumerate(CASH_FLOW_VARIANTS):
+        sql, _ = finance.build_cash_flow_query(**kwargs)
+        yield f"finance.build_cash_flow_query[{i}]", sql
+    for i, kwargs in enumerate(CASH_FLOW_SUMMARY_VARIANTS):
+        sql, _ = finance.build_cash_flow_summary_query(**kwargs)
+        yield f"finance.build_cash_flow_summary_query[{i}]", sql
+
+
+QUERIES = list(_collect_queries())
+
+
+def _table_aliases(sql: str, tables: set) -> set:
+    """Імена, під якими таблиці фігурують у плані (сама назва або псевдонім)."""
+    names = set()
+    for table, alias in re.findall(r"\b(?:FROM|JOIN)\s+(?:\w+\.)?(\w+)(?:\s+(?:AS\s+)?(\w+))?", sql, re.I):
+        if table in tables:
+            names.add(table)
+            if alias and alias.lower() not in SQL_KEYWORDS:
+                names.add(alias)
+    return names
+
+
+# Повне сканування, зокрема в порядку індексу: "SCAN t USING [COVERING] INDEX i" читає всі рядки
+FULL_SCAN_RE = re.compile(r"^SCAN (?:\w+\.)?(\w+)(?: USING (?:COVERING )?INDEX \w+)?$")
+
+
+def full_table_scans(conn: sqlite3.Connection, sql: str) -> list:
+    tables = set()
+    for schema in DATABASES:
+        tables.update(r[0] for r in conn.execute(f"SELECT name FROM {schema}.sqlite_master WHERE type = 'table'"))
+    scanned_names = _table_aliases(sql, tables)
+    plan = conn.execute("EXPLAIN QUERY PLAN " + sql, [None] * sql.count("?")).fetchall()
+    return [
+        detail for *_, detail in plan
+        if (m := FULL_SCAN_RE.match(detail)) and m.group(1) in scanned_names
+    ]
+
+
+@pytest.fixture
+def conn(data_dir):
+    migrate_all()
+    return get_attached_connection()
+
+
+@pytest.mark.parametrize("name, sql", QUERIES, ids=[q[0] for q in QUERIES])
+def test_query_does_not_scan_full_table(conn, name, sql):
+    scans = full_table_scans(conn, sql)
+    if name in FULL_SCAN_ALLOWED:
+        pytest.skip(f"повне сканування дозволено: {FULL_SCAN_ALLOWED[name]}")
+    assert not scans, f"{name}: {scans}"
+
+
+@pytest.mark.parametrize("db_name", list(INDEXES))
+def test_catalog_indexes_exist(data_dir, db_name):
+    migrate_all()
+    conn = get_connection(DATABASES[db_name])
+    names = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_%'")}
+    assert names == set(INDEXES[db_name])
+
+
+def test_sync_indexes_repairs_drift(data_dir):
+    migrate_all()
+    conn = get_connection(DATABASES["finance"])
+    with conn:
+        conn.execute("DROP INDEX idx_cash_flow_date")
+        conn.execute("CREATE INDEX idx_cash_flow_stale ON cash_flow(category)")
+        conn.execute("DROP INDEX idx_cash_flow_type_date")
+        conn.execute("CREATE INDEX idx_cash_flow_type_date ON cash_flow(type)")
+
+    sync_indexes(conn, "finance")
+
+    rows = dict(conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_%'"))
+    assert set(rows) == set(INDEXES["finance"])
+    assert "type, date" in rows["idx_cash_flow_type_date"]
@@ -0,0 +1,66 @@
+import json
+import logging
+import sqlite3
+
+import pytest
+
+import query_stats
+from query_stats import InstrumentedConnection, dump_query_stats, record
+
+
+@pytest.fixture
+def stats(tmp_path, monkeypatch):
+    """Порожня статистика, нульовий поріг і журнал повільних запитів у tmp_path."""
+    monkeypatch.setattr(query_stats, "_stats", {})
+    monkeypatch.setattr(query_stats, "SLOW_QUERY_MS", 0)
+    monkeypatch.setattr(query_stats, "SLOW_QUERY_LOG", str(tmp_path / "slow.log"))
+    monkeypatch.setattr(query_stats, "_slow_logger", None)
+    monkeypatch.setattr(logging.getLogger("meshgrid.slow_query"), "handlers", [])
+    yield tmp_path
+    for handler in logging.getLogger("meshgrid.slow_query").handlers:
+        handler.close()
+
+
+def run_queries(conn):
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT)")
+    conn.executemany("INSERT INTO t (name) VALUES (?)", [("a",), ("b",), ("c",)])
+    for _ in range(3):
+        conn.execute("SELECT id, name FROM t").fetchall()
+    # вимір SELECT закривається і при ітерації до кінця
+    list(conn.execute("SELECT id FROM t WHERE id > ?", (1,)))
+
+
+def test_instrumented_connection_records_calls(stats):
+    conn = sqlite3.connect(":memory:", factory=InstrumentedConnection)
+    run_queries(conn)
+    conn.close()
+
+    df = query_stats.query_stats().set_index("query")
+    select = df.loc["SELECT id, name FROM t"]
+    assert select["calls"] == 3
+    assert select["rows"] == 9
+    assert select["callers"] == f"{__name__}.run_queries"
+    assert select["p50_ms"] <= select["p95_ms"] <= select["p99_ms"] <= select["max_ms"]
+    assert df.loc["SELECT id FROM t WHERE id > ?", "rows"] == 2
+    assert df.loc["INSERT INTO t (name) VALUES (?)", "rows"] == 3
+
+    log = (stats / "slow.log").read_text(encoding="utf-8")
+    assert log.count("sql=SELECT id, name FROM t") == 3
+    assert f"caller={__name__}.run_queries" in log
+
+
+def test_percentiles_and_json_dump(stats):
+    for ms in range(1, 101):
+        record("SELECT  1\n", "tests.fake", float(ms), 1)
+    record("SELECT 2", "tests.other", 500.0, 0)
+
+    df = query_stats.query_stats()
+    assert df["query"].tolist() == ["SELECT 1", "SELECT 2"]
+    first = df.iloc[0]
+    assert (first["calls"], first["rows"], first["total_ms"]) == (100, 100, 5050.0)
+    assert (first["p50_ms"], first["p95_ms"], first["p99_ms"], first["max_ms"]) == (50.5, 95.05, 99.01, 100.0)
+
+    payload = json.loads(open(dump_query_stats(str(stats / "stats.json")), encoding="utf-8").read())
+    assert payload["slow_query_ms"] == 0
+    assert [q["query"] for q in payload["queries"]] == ["SELECT 1", "SELECT 2"]
+    assert payload["queries"][0]["p95_ms"] == 95.05
@@ -0,0 +1,36 @@
+from openpyxl import load_workbook
+
+import query_stats
+import reports
+from connections import get_connection
+from finance import DB_PATH, init_finance
+
+
+def test_build_report_runs_each_sheet_query_once(data_dir, monkeypatch):
+    init_finance()
+    conn = get_connection(DB_PATH)
+    with conn:
+        conn.execute("DELETE FROM cash_flow")
+        conn.executemany(
+            "INSERT INTO cash_flow (type, category, amount, date) VALUES (?, ?, ?, ?)",
+            [("income" if i % 3 else "expense", f"К{i % 2}", float(i), f"2025-01-{1 + i:02d}") for i in range(25)],
+        )
+
+    progress = []
+    monkeypatch.setattr(reports, "_write_progress", lambda path, fraction, stage: progress.append((fraction, stage)))
+    monkeypatch.setattr(reports, "EXPORT_CHUNK_ROWS", 10)
+    monkeypatch.setattr(query_stats, "_stats", {})
+
+    path = reports.build_report("cash_flow", str(data_dir / "data" / "reports" / "cash_flow.xlsx"))
+
+    queries = query_stats.query_stats().set_index("query")
+    assert not any(q.startswith("SELECT COUNT(*) FROM (") for q in queries.index)
+    assert queries.loc[reports.CASH_FLOW_SQL, "calls"] == 1
+
+    fractions = [fraction for fraction, _ in progress]
+    assert fractions == sorted(fractions) and fractions[-1] == 1.0
+    assert "Операції, 20 рядків" in {stage for _, stage in progress}
+
+    workbook = load_workbook(path)
+    assert workbook.sheetnames == ["По тижнях", "По категоріях", "Операції"]
+    assert workbook["Операції"].max_row == 26
@@ -1,9 +1,161 @@
+# utils/export.py — ЕКСПОРТ ТАБЛИЦЬ (CSV / EXCEL)
+"""
+Потоковий запис Excel: openpyxl у write-only режимі пише рядки одразу
+у файл, тож пам'ять не залежить від розміру таблиці. Джерело — DataFrame
+або ітератор DataFrame-шматків (наприклад, pd.read_sql_query з chunksize).
+Ширина колонок рахується векторно по першому шматку, дробові колонки
+отримують формат #,##0.00. Після EXCEL_MAX_ROWS рядків дані переходять
+на наступний аркуш «Назва (2)», «Назва (3)»...
+"""
+import sqlite3
+from io import BytesIO
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Union
+
+import numpy as np
 import pandas as pd
 
+EXCEL_MAX_ROWS = 1_048_576      # рядків на аркуш, разом із заголовком
+MAX_COLUMN_WIDTH = 50
+NUMBER_FORMAT = "#,##0.00"
+EXPORT_CHUNK_ROWS = 50_000
+
+Frames = Union[pd.DataFrame, Iterable[pd.DataFrame]]
+
+
 def export_to_csv(df, path):
     df.to_csv(path, index=False)
     return path
 
 def export_to_excel(df, path):
-    df.to_excel(path, index=False)
+    write_excel({"Sheet1": df}, path)
     return path
+
+
+# ===================================================================
+# ПОТОКОВИЙ EXCEL
+# ===================================================================
+def column_widths(df: pd.DataFrame) -> List[float]:
+    """Ширина кожної колонки: найдовше значення або заголовок + 2, не більше MAX_COLUMN_WIDTH."""
+    widths = []
+    for name, series in df.items():
+        values = series.dropna()
+        if values.empty:
+            longest = 0
+        elif pd.api.types.is_bool_dtype(series):
+            longest = 5
+        elif pd.api.types.is_numeric_dtype(series):
+            # найдовше число — одна з меж; з роздільниками тисяч і 2 знаками
+            extremes = np.array([values.min(), values.max()], dtype=float)
+            longest = max(len(f"{x:,.2f}") for x in extremes)
+        elif pd.api.types.is_datetime64_any_dtype(series):
+            has_time = (values.dt.normalize() != values).any()
+            longest = 19 if has_time else 10
+        else:
+            longest = int(values.astype(str).str.len().max())
+        widths.append(min(max(longest, len(str(name))) + 2, MAX_COLUMN_WIDTH))
+    return widths
+
+
+def _iter_frames(frames: Frames) -> Iterator[pd.DataFrame]:
+    if isinstance(frames, pd.DataFrame):
+        yield frames
+    else:
+        yield from frames
+
+
+def _sheet_title(name: str, part: int) -> str:
+    # Excel: назва аркуша до 31 символу
+    suffix = f" ({part})" if part > 1 else ""
+    return name[:31 - len(suffix)] + suffix
+
+
+def write_excel(
+    sheets: Mapping[str, Frames],
+    output=None,
+    number_formats: Optional[Dict[str, str]] = None,
+    max_rows: int = EXCEL_MAX_ROWS,
+):
+    """
+    Записує аркуші {назва: DataFrame або шматки} у output (шлях або
+    файловий об'єкт; за замовчуванням — новий BytesIO, який і повертається).
+    number_formats — формат для колонок за назвою; дробові колонки без
+    явного формату отримують NUMBER_FORMAT.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.utils import get_column_letter
+
+    if output is None:
+        output = BytesIO()
+    workbook = Workbook(write_only=True)
+    rows_per_sheet = max_rows - 1
+
+    for name, frames in sheets.items():
+        part = 0
+        worksheet = None
+        rows_left = 0
+        columns: Sequence[str] = ()
+        widths: Optional[List[float]] = None
+        templates: List[Optional[WriteOnlyCell]] = []
+        templated = False
+
+        for chunk in _iter_frames(frames):
+            if widths is None:
+                columns = list(chunk.columns)
+                widths = column_widths(chunk)
+                formats = [
+                    (number_formats or {}).get(
+                        col, NUMBER_FORMAT if pd.api.types.is_float_dtype(chunk[col]) else None
+                    )
+                    for col in columns
+                ]
+            values = chunk.astype(object).where(chunk.notna(), None)
+            for row in values.itertuples(index=False, name=None):
+                if rows_left == 0:
+                    part += 1
+                    worksheet = workbook.create_sheet(_sheet_title(name, part))
+                    for i, width in enumerate(widths, 1):
+                        worksheet.column_dimensions[get_column_letter(i)].width = width
+                    worksheet.append([str(col) for col in columns])
+                    # Один стильований шаблон на колонку: рядок серіалізується одразу в append
+                    templates = []
+                    for fmt in formats:
+                        if fmt is None:
+                            templates.append(None)
+                        else:
+                            cell = WriteOnlyCell(worksheet)
+                            cell.number_format = fmt
+                            templates.append(cell)
+                    templated = any(t is not None for t in templates)
+                    rows_left = rows_per_sheet
+                if templated:
+                    row = list(row)
+                    for i, template in enumerate(templates):
+                        if template is not None and row[i] is not None:
+                            template.value = row[i]
+                            row[i] = template
+                worksheet.append(row)
+                rows_left -= 1
+
+        if worksheet is None:
+            # порожні дані — аркуш лише із заголовком
+            worksheet = workbook.create_sheet(_sheet_title(name, 1))
+            worksheet.append([str(col) for col in columns])
+
+    workbook.save(output)
+    if isinstance(output, BytesIO):
+        output.seek(0)
+    return output
+
+
+def export_sql_to_excel(
+    conn: sqlite3.Connection,
+    sql: str,
+    sheet_name: str,
+    params: Sequence = (),
+    output=None,
+    chunk_rows: int = EXPORT_CHUNK_ROWS,
+):
+    """Вивантажує результат запиту в Excel шматками — без завантаження таблиці в пам'ять."""
+    chunks = pd.read_sql_query(sql, conn, params=list(params), chunksize=chunk_rows)
+    return write_excel({sheet_name: chunks}, output)
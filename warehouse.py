@@ -1,34 +1,55 @@
-import streamlit as st
-import sqlite3
 import pandas as pd
-import os
-from datetime import datetime
+from datetime import datetime, timedelta
+
+from connections import get_connection
+from data_cache import cached_loader
+from migrations import migrate
+from utils.export import export_sql_to_excel
 
 DB_PATH = "data/warehouse.db"
 
+INVENTORY_SQL = "SELECT * FROM inventory WHERE quantity > 0"
+
+# Журнал руху (stock_movements) дописують тригери на inventory
+STOCK_MOVEMENTS_SQL = """
+    SELECT created_at, kind, quantity, batch_id, inventory_id
+    FROM stock_movements
+    WHERE material = ? AND created_at >= ?
+    ORDER BY created_at DESC, id DESC
+    LIMIT ?
+"""
+
+CONSUMPTION_SQL = """
+    SELECT material, -SUM(quantity) AS issued, COUNT(*) AS issues
+    FROM stock_movements
+    WHERE kind = 'issue' AND created_at >= ?
+    GROUP BY material
+    ORDER BY issued DESC
+"""
+
 def init_warehouse():
-    os.makedirs("data", exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute("""CREATE TABLE IF NOT EXISTS inventory (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        batch_id TEXT,
-        material TEXT,
-        quantity INTEGER,
-        price_per_unit REAL,
-        total_cost REAL,
-        arrival_date TEXT
-    )""")
-    # Додамо приклади
-    conn.execute("INSERT OR IGNORE INTO inventory (batch_id, material, quantity, price_per_unit, total_cost, arrival_date) VALUES (?, ?, ?, ?, ?, ?)",
-                 ("B001", "Оцинкований", 100, 75.0, 7500.0, "2025-10-01"))
-    conn.execute("INSERT OR IGNORE INTO inventory (batch_id, material, quantity, price_per_unit, total_cost, arrival_date) VALUES (?, ?, ?, ?, ?, ?)",
-                 ("B002", "Чорний", 60, 60.0, 3600.0, "2025-10-05"))
-    conn.commit()
-    conn.close()
-
-@st.cache_data(ttl=300)
+    """Доводить схему warehouse.db до актуальної версії (див. migrations.py)."""
+    migrate("warehouse", DB_PATH)
+
+@cached_loader("inventory", snapshot=True)
 def get_inventory():
-    conn = sqlite3.connect(DB_PATH)
-    df = pd.read_sql_query("SELECT * FROM inventory WHERE quantity > 0", conn)
-    conn.close()
+    conn = get_connection(DB_PATH)
+    df = pd.read_sql_query(INVENTORY_SQL, conn)
+    return df
+
+def export_inventory_to_excel(output=None):
+    """Партії складу в Excel (потоковий запис, шматками з бази)."""
+    return export_sql_to_excel(get_connection(DB_PATH), INVENTORY_SQL, "Склад", output=output)
+
+@cached_loader("inventory")
+def get_stock_movements(material: str, date_from: str = "", limit: int = 1000):
+    """Останні рухи матеріалу (прихід, списання, коригування) від date_from."""
+    conn = get_connection(DB_PATH)
+    return pd.read_sql_query(STOCK_MOVEMENTS_SQL, conn, params=(material, date_from, limit))
+
+def get_consumption(days: int = 30):
+    """Списання по матеріалах за останні days днів; per_day — середнє за день."""
+    date_from = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+    df = pd.read_sql_query(CONSUMPTION_SQL, get_connection(DB_PATH), params=(date_from,))
+    df["per_day"] = df["issued"] / days
     return df